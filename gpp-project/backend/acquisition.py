@@ -0,0 +1,538 @@
+# acquisition.py
+"""
+In-process acquisition API: the radar measurement without a subprocess.
+
+vitalsigns.py (CLI + live plot) and the Flask apps both drive the radar through
+this module, so there is no interpreter start-up per request and no stdout
+scraping - callers get a SessionStats object back.
+
+Usage:
+    stats = run_measurement("user@example.com", 0)          # blocking, DURATION seconds
+    print(stats.stats_text, stats.to_dict())
+
+    acq = Acquisition(get_session(USER_PORT, DATA_PORT), "user@example.com", 0)
+    acq.start()
+    for sample in acq.stream():        # Samples as they are accepted
+        ...
+    stats = acq.stop()
+
+Pandas and matplotlib are never imported here.
+"""
+
+import datetime
+import os
+import queue
+import threading
+import time
+
+from frame_reader import FrameReader
+from tlv_decoder import decode_frame, RangeCandidates, RANGE_WINDOW
+from acquisition_pipeline import Pipeline, Sample, BLOCK, DROP_OLDEST
+from raw_capture import CaptureWriter
+from waveform_archive import ArchiveWriter
+from tlv_registry import TLVRegistry
+from frame_clock import FrameClock, frame_period_from_cfg
+from radar_config import read_cfg_lines
+from csv_sink import CsvSink, FLUSH_INTERVAL, FLUSH_ROWS
+from radar_session import get_session
+from streaming_stats import RollingMedian, SessionAggregator, Welford
+
+# -----------------------------
+# Defaults (same values vitalsigns.py has always used)
+# -----------------------------
+FRONT_CFG = r"C:\ti\mmwave_industrial_toolbox_4_12_1\labs\Vital_Signs\68xx_vital_signs\gui\profiles\xwr68xx_profile_VitalSigns_20fps_Front.cfg"
+BACK_CFG  = r"C:\ti\mmwave_industrial_toolbox_4_12_1\labs\Vital_Signs\68xx_vital_signs\gui\profiles\xwr68xx_profile_VitalSigns_20fps_Front.cfg"
+
+# VITALS_USER_PORT / VITALS_DATA_PORT override these, e.g. with the ptys printed by virtual_radar.py
+USER_PORT = os.environ.get("VITALS_USER_PORT", 'COM5')
+DATA_PORT = os.environ.get("VITALS_DATA_PORT", 'COM6')
+USER_BAUD = 115200
+DATA_BAUD = 921600
+
+DURATION = 30  # seconds
+CSV_DIR = r"C:\Users\Nikhil\Downloads\SSN\College Files\Grand Project\RespirationHealth\gpp-project\backend"
+MASTER_CSV = os.path.join(CSV_DIR, "vital_signs_data_new.csv")
+SESSION_STATE_FILE = os.path.join(CSV_DIR, ".radar_session.json")
+CAPTURE_DIR = os.path.join(CSV_DIR, "captures")
+ARCHIVE_DIR = os.path.join(CSV_DIR, "archives")
+
+CSV_HEADER = [
+    "Timestamp", "User", "Configuration", "SessionTime",
+    "HeartRate_BPM", "RespirationRate_BPM", "Range_m",
+    "HeartWaveform", "BreathWaveform", "HeartRate_FFT", "BreathRate_FFT"
+]
+
+# Thresholds
+HR_CHANGE_THRESHOLD = 2.0  # BPM
+RR_CHANGE_THRESHOLD = 1.0  # BPM
+RANGE_CHANGE_THRESHOLD = 0.05  # meters (5 cm)
+
+RANGE_MEDIAN_WINDOW = 9   # frames in the range median filter
+METHOD_SCORE_WINDOW = 30  # values per range method kept for method selection
+
+
+def cfg_for(config_type):
+    """CFG file for 0=front / 1=back (VITALS_CFG_FILE overrides both)."""
+    cfg = FRONT_CFG if config_type == 0 else BACK_CFG
+    return os.environ.get("VITALS_CFG_FILE", cfg)
+
+
+# -----------------------------
+# Frame -> Sample: range selection, validation, change detection
+# -----------------------------
+class VitalsProcessor:
+    def __init__(self, hr_threshold=HR_CHANGE_THRESHOLD, rr_threshold=RR_CHANGE_THRESHOLD,
+                 range_threshold=RANGE_CHANGE_THRESHOLD, range_window=RANGE_WINDOW, log=print):
+        self.hr_threshold = hr_threshold
+        self.rr_threshold = rr_threshold
+        self.range_threshold = range_threshold
+        self.log = log
+        self.candidates = RangeCandidates(range_window)   # plausible range (m) for a candidate
+
+        self.data_saved = 0
+        self.data_skipped = 0
+
+        self.last_valid_hr = None
+        self.last_valid_rr = None
+        self.last_saved_hr = None
+        self.last_saved_rr = None
+        self.last_saved_range = None
+
+        self.range_median = RollingMedian(RANGE_MEDIAN_WINDOW)
+        self.range_method_scores = {}   # candidate slot -> Welford over its last METHOD_SCORE_WINDOW values
+        self.debug_sample_count = 0
+        self.best_range_method = None   # candidate slot (see tlv_decoder.CANDIDATE_SLOTS)
+
+    def _select_range(self, vitals):
+        candidates = self.candidates
+
+        # Debug prints (first 3)
+        if self.debug_sample_count < 3 and self.log:
+            plausible = candidates.plausible(vitals)
+            self.log("")
+            self.log("DEBUG PACKET #{}".format(self.debug_sample_count + 1))
+            self.log("Range candidates found: {}".format(len(plausible)))
+            for slot in plausible[:5]:
+                method, param = candidates.slots[slot]
+                self.log("  {} (param={}): {:.3f} m".format(method, param, candidates.value(vitals, slot)))
+            self.debug_sample_count += 1
+
+        range_m = None
+        if self.best_range_method is None and len(self.range_median) > 20:
+            method_variances = {}
+            for key, scores in self.range_method_scores.items():
+                if len(scores) > 15:
+                    method_variances[key] = scores.variance()
+            if method_variances:
+                self.best_range_method = min(method_variances, key=method_variances.get)
+                if self.log:
+                    self.log("Selected range method: {}".format(candidates.key(self.best_range_method)))
+
+        if self.best_range_method is not None:
+            range_m = candidates.value(vitals, self.best_range_method)
+
+        if range_m is None:
+            slot = candidates.first(vitals)
+            if slot >= 0:
+                range_m = candidates.value(vitals, slot)
+                scores = self.range_method_scores.get(slot)
+                if scores is None:
+                    scores = self.range_method_scores[slot] = Welford(METHOD_SCORE_WINDOW)
+                scores.add(range_m)
+
+        if range_m is None or range_m < 0.1 or range_m > 3.0:
+            range_m = 0.6
+
+        # smooth range
+        self.range_median.add(range_m)
+        if len(self.range_median) >= 5:
+            return self.range_median.median()
+        return range_m
+
+    def process(self, vitals, ts, wall_time, frame_num):
+        """Returns a Sample for a valid HR/RR frame, else None."""
+        smoothed_range = self._select_range(vitals)
+
+        # Validate HR/RR
+        heart_rate = vitals.heart_rate_fft
+        breath_rate = vitals.breath_rate_fft
+        hr_valid = 30 <= heart_rate <= 200
+        rr_valid = 5 <= breath_rate <= 50
+
+        if not hr_valid and self.last_valid_hr is not None:
+            heart_rate = self.last_valid_hr
+            hr_valid = True
+        if not rr_valid and self.last_valid_rr is not None:
+            breath_rate = self.last_valid_rr
+            rr_valid = True
+
+        if not (hr_valid and rr_valid):
+            return None
+        self.last_valid_hr = heart_rate
+        self.last_valid_rr = breath_rate
+
+        # decide whether to save
+        if self.last_saved_hr is None:
+            should_save = True
+        else:
+            should_save = (abs(heart_rate - self.last_saved_hr) >= self.hr_threshold
+                           or abs(breath_rate - self.last_saved_rr) >= self.rr_threshold
+                           or abs(smoothed_range - self.last_saved_range) >= self.range_threshold)
+
+        if should_save:
+            self.data_saved += 1
+            self.last_saved_hr = heart_rate
+            self.last_saved_rr = breath_rate
+            self.last_saved_range = smoothed_range
+        else:
+            self.data_skipped += 1
+
+        return Sample(
+            ts, wall_time, frame_num,
+            heart_rate, breath_rate, smoothed_range,
+            vitals.heart_waveform, vitals.breath_waveform,
+            vitals.heart_rate_fft, vitals.breath_rate_fft,
+            should_save
+        )
+
+
+# -----------------------------
+# Structured result
+# -----------------------------
+class SessionStats:
+    """What a measurement produced; to_dict() is JSON-ready for the Flask apps."""
+
+    FIELDS = ("user_email", "config_type", "start_mode", "prepare_ms", "duration",
+              "packets", "frames_saved", "frames_skipped", "save_ratio",
+              "avg_hr", "avg_rr", "avg_range", "range_std",
+              "link", "stages", "storage", "csv_path", "capture_path", "capture_frames",
+              "archive_path", "archive_frames", "timing", "tlvs", "summary", "stats_text")
+
+    def __init__(self, **kwargs):
+        for name in self.FIELDS:
+            setattr(self, name, kwargs.get(name))
+
+    @property
+    def has_vitals(self):
+        return self.avg_hr is not None
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+
+def format_stats_text(avg_hr, avg_rr, avg_range, range_std):
+    """The VITAL SIGNS SUMMARY block shown by the RunSensor page."""
+    if avg_hr is None:
+        return "No valid HR/RR frames were saved."
+    text = "\nVITAL SIGNS SUMMARY\n" \
+        + ("-" * 40) + "\n" \
+        + "Average Heart Rate  : {:.1f} bpm\n".format(avg_hr) \
+        + "Average Resp Rate   : {:.1f} bpm\n".format(avg_rr) \
+        + "Average Distance    : {:.3f} m ({:.0f} cm)\n".format(avg_range, avg_range * 100.0)
+    if range_std is not None:
+        text += "Distance Std Dev    : {:.3f} m ({:.0f} cm)\n".format(range_std, range_std * 100.0)
+    return text
+
+
+# -----------------------------
+# One measurement on a RadarSession
+# -----------------------------
+class Acquisition:
+    def __init__(self, radar, user_email, config_type=0, cfg_file=None, master_csv=MASTER_CSV,
+                 duration=DURATION, raw_capture=False, capture_dir=CAPTURE_DIR,
+                 archive=True, archive_dir=ARCHIVE_DIR, keep_streaming=True, durable=False, flush_interval=FLUSH_INTERVAL,
+                 flush_rows=FLUSH_ROWS, range_window=RANGE_WINDOW, log=print, verbose=True):
+        self.radar = radar
+        self.user_email = user_email
+        self.config_type = config_type
+        self.cfg_file = cfg_file or cfg_for(config_type)
+        self.master_csv = master_csv
+        self.duration = duration
+        self.raw_capture = raw_capture
+        self.capture_dir = capture_dir
+        self.archive = archive              # every vitals frame, lossless (waveform_archive.py)
+        self.archive_dir = archive_dir
+        self.keep_streaming = keep_streaming
+        self.durable = durable              # fsync every CSV commit
+        self.flush_interval = flush_interval
+        self.flush_rows = flush_rows
+        self.log = log if verbose else None
+
+        self.processor = VitalsProcessor(range_window=range_window, log=self.log)
+        self.pipeline = Pipeline()
+        self.start_mode = None
+        self.start_time = None
+        self.end_time = None
+        self.packet_count = 0
+        self.reader = None
+        self.clock = FrameClock()   # device session time + lost / duplicate frame counters
+        self.capture = None
+        self.archive_writer = None
+        self.tlvs = TLVRegistry()   # extra TLV types (point cloud, range profile, ...) on demand
+
+        self.sink = None
+        self.aggregate = SessionAggregator()   # hr / rr / range of every accepted sample
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._locked = False
+        self._stopped = False
+        self._stats = None
+
+        # storage is lossless (reader waits if it falls behind); console drops oldest
+        self.pipeline.add_stage("storage", self._store_sample, maxsize=1024, policy=BLOCK,
+                                on_stop=self._commit_csv)
+        if self.log:
+            self.pipeline.add_stage("console", self._log_sample, maxsize=64, policy=DROP_OLDEST)
+
+    # -----------------------------
+    # Extra consumers (plot, streaming clients)
+    # -----------------------------
+    def add_stage(self, name, handler, maxsize=256, policy=DROP_OLDEST, threaded=True, on_stop=None):
+        """Register a consumer before start(); see acquisition_pipeline.Stage."""
+        return self.pipeline.add_stage(name, handler, maxsize=maxsize, policy=policy,
+                                       threaded=threaded, on_stop=on_stop)
+
+    def subscribe_tlv(self, tlv_type, handler, decoder=None):
+        """
+        handler(header, tlv) for every TLV of this type (see tlv_registry.py); runs on the
+        reader thread, so keep it short. Frames are only walked for TLVs once something
+        is subscribed.
+        """
+        return self.tlvs.subscribe(tlv_type, handler, decoder)
+
+    def stream(self, maxsize=256, poll=0.2):
+        """
+        Iterator of Samples while the measurement runs (drop-oldest if the caller is slow).
+        Registers immediately, so call it right before or after start(); ends once reading has
+        stopped and the samples still queued have been yielded.
+        """
+        stage = self.add_stage("stream-{}".format(len(self.pipeline.stages)), None,
+                               maxsize=maxsize, policy=DROP_OLDEST, threaded=False)
+
+        def samples():
+            while True:
+                try:
+                    yield stage.queue.get(timeout=poll)
+                except queue.Empty:
+                    if self._stop_event.is_set():
+                        return
+
+        return samples()
+
+    # -----------------------------
+    # Lifecycle
+    # -----------------------------
+    def start(self):
+        """Open/prepare the radar (warm, restart or cold) and start reading. Returns self."""
+        if not self.radar.busy.acquire(blocking=False):
+            raise RuntimeError("Radar {} is busy with another measurement".format(self.radar.user_port))
+        self._locked = True
+        try:
+            self.start_mode = self.radar.prepare(self.cfg_file, verbose=self.log is not None)
+            try:
+                self.clock = FrameClock(frame_period_from_cfg(read_cfg_lines(self.cfg_file)))
+            except OSError:
+                pass
+            self.sink = CsvSink(self.master_csv, CSV_HEADER, flush_interval=self.flush_interval,
+                                flush_rows=self.flush_rows, durable=self.durable)
+            stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            if self.raw_capture:
+                name = "{}_cfg{}.vscap".format(stamp, self.config_type)
+                self.capture = CaptureWriter(os.path.join(self.capture_dir, name))
+            if self.archive:
+                name = "{}_cfg{}.vsarc".format(stamp, self.config_type)
+                self.archive_writer = ArchiveWriter(os.path.join(self.archive_dir, name), info={
+                    "user": self.user_email, "config": self.config_type, "cfg_file": self.cfg_file})
+            self.reader = FrameReader(self.radar.data_ser)
+        except Exception:
+            if self.sink is not None:
+                self.sink.close()
+            if self.archive_writer is not None:
+                self.archive_writer.close()
+            if self.capture is not None:
+                self.capture.close()
+            self._release()
+            raise
+
+        self.start_time = time.time()
+        self.pipeline.start()
+        self._thread = threading.Thread(target=self._reader_loop, name="serial-reader", daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def elapsed(self):
+        if self.start_time is None:
+            return 0.0
+        return (self.end_time or time.time()) - self.start_time
+
+    @property
+    def progress(self):
+        """Fraction of DURATION done (0..1); 1 once reading has stopped."""
+        if self.start_time is None:
+            return 0.0
+        if self.end_time is not None:
+            return 1.0
+        return min(1.0, self.elapsed / self.duration) if self.duration else 1.0
+
+    def wait(self, timeout=None):
+        """Block until DURATION has elapsed (or stop() was called). True if finished."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return not self.running
+
+    def stop(self):
+        """Stop reading, flush every stage, release the radar. Returns SessionStats."""
+        if self._stopped:
+            return self._stats
+        self._stopped = True
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(5)
+        self.end_time = self.end_time or time.time()
+        self.pipeline.stop()
+        if self.capture is not None:
+            self.capture.close()
+        if self.archive_writer is not None:
+            self.archive_writer.close()
+        if self.sink is not None:
+            self.sink.close()       # before _release() -> sensorStop
+        self._stats = self.stats()
+        self._release()
+        return self._stats
+
+    def run(self):
+        """start() + wait() + stop() in one call."""
+        self.start()
+        try:
+            self.wait()
+        finally:
+            stats = self.stop()
+        return stats
+
+    def _release(self):
+        # --keep-streaming leaves the sensor running so the next session starts warm
+        try:
+            self.radar.finish(keep_streaming=self.keep_streaming)
+        finally:
+            if self._locked:
+                self._locked = False
+                self.radar.busy.release()
+
+    # -----------------------------
+    # Reader thread (producer)
+    # -----------------------------
+    def _reader_loop(self):
+        """Reads + decodes frames and publishes Samples; never touches the CSV itself."""
+        reader = self.reader
+        processor = self.processor
+        try:
+            while time.time() - self.start_time < self.duration and not self._stop_event.is_set():
+                # complete frame (header + payload), already synced and length-checked
+                frame = reader.read_frame()
+                if frame is None:
+                    continue
+
+                if self.packet_count == 0 and self.log:
+                    self.log("Found first valid packet sync word.")
+
+                try:
+                    header, vitals = decode_frame(frame)
+                    wall_time = time.time()
+                    if self.capture is not None:
+                        self.capture.write(frame, header.frame_num, wall_time)
+                    self.packet_count += 1
+                    # device time since the first frame; None for a duplicate / stale frame
+                    ts = self.clock.update(header.frame_num, header.time_cpu)
+                    if ts is None:
+                        continue
+                    if self.tlvs.subscribed:
+                        self.tlvs.dispatch(frame, header)
+                    if vitals is None:
+                        continue
+                    if self.archive_writer is not None:
+                        self.archive_writer.append(header.frame_num, header.time_cpu, wall_time, vitals.words)
+                    sample = processor.process(vitals, ts, wall_time, header.frame_num)
+                    if sample is None:
+                        continue
+                    self.aggregate.add(sample.heart_rate, sample.breath_rate, sample.range_m)
+                    self.pipeline.publish(sample)
+                except Exception as e:
+                    if self.packet_count < 10 and self.log:
+                        self.log("Error parsing packet: {}".format(e))
+        finally:
+            self.end_time = time.time()
+            self._stop_event.set()
+
+    # -----------------------------
+    # Built-in stages
+    # -----------------------------
+    def _commit_csv(self):
+        if self.sink is not None:
+            self.sink.commit()
+
+    def _store_sample(self, sample):
+        if sample.saved:
+            self.sink.write_sample(sample, self.user_email, self.config_type)
+
+    def _log_sample(self, sample):
+        if sample.saved:
+            self.log("[{:.1f}s] SAVED HR: {:.1f} | RR: {:.1f} | Range: {:.3f} m".format(
+                sample.ts, sample.heart_rate, sample.breath_rate, sample.range_m))
+
+    # -----------------------------
+    # Results
+    # -----------------------------
+    def stats(self):
+        # whole session (every accepted sample), not just what the live plot still shows
+        summary = self.aggregate.summary()
+        avg_hr = summary["hr"]["mean"]
+        avg_rr = summary["rr"]["mean"]
+        avg_range = summary["range"]["mean"]
+        range_std = summary["range"]["std"]
+
+        saved = self.processor.data_saved
+        skipped = self.processor.data_skipped
+        total = saved + skipped
+        return SessionStats(
+            user_email=self.user_email,
+            config_type=self.config_type,
+            start_mode=self.start_mode,
+            prepare_ms=self.radar.last_prepare_ms,
+            duration=self.elapsed,
+            packets=self.packet_count,
+            frames_saved=saved,
+            frames_skipped=skipped,
+            save_ratio=saved / total * 100.0 if total else None,
+            avg_hr=avg_hr,
+            avg_rr=avg_rr,
+            avg_range=avg_range,
+            range_std=range_std,
+            link=self.reader.stats() if self.reader is not None else None,
+            stages=self.pipeline.stats(),
+            storage=self.sink.stats() if self.sink is not None else None,
+            csv_path=self.master_csv,
+            capture_path=self.capture.path if self.capture is not None else None,
+            capture_frames=self.capture.frames if self.capture is not None else 0,
+            archive_path=self.archive_writer.path if self.archive_writer is not None else None,
+            archive_frames=self.archive_writer.frames if self.archive_writer is not None else 0,
+            timing=self.clock.stats(self.elapsed),
+            tlvs=self.tlvs.stats() if self.tlvs.subscribed else None,
+            summary=summary,
+            stats_text=format_stats_text(avg_hr, avg_rr, avg_range, range_std),
+        )
+
+
+def open_radar(user_port=USER_PORT, data_port=DATA_PORT):
+    """The process-wide RadarSession for these ports (kept open between measurements)."""
+    return get_session(user_port, data_port, user_baud=USER_BAUD, data_baud=DATA_BAUD,
+                       state_file=SESSION_STATE_FILE)
+
+
+def run_measurement(user_email, config_type=0, duration=DURATION, **kwargs):
+    """Blocking measurement on the shared radar session. Returns SessionStats."""
+    return Acquisition(open_radar(), user_email, config_type, duration=duration, **kwargs).run()
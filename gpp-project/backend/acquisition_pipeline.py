@@ -0,0 +1,169 @@
+# acquisition_pipeline.py
+"""
+Producer/consumer plumbing for the acquisition scripts.
+
+The serial reader thread only reads + decodes frames and publishes a Sample to
+every stage. Each stage owns a bounded queue and a backpressure policy:
+
+    BLOCK        lossless - the publisher waits for room (use for storage)
+    DROP_OLDEST  the oldest queued item is thrown away to make room (plot, console)
+
+Stages either run on their own thread (start()) or are drained by the caller
+(drain()), which is what the live plot does because matplotlib must stay on
+the main thread. A stage without a handler is a plain queue that its owner reads
+itself (Acquisition.stream()); stop() leaves whatever is still queued for it.
+"""
+
+import queue
+import threading
+
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+
+_STOP = object()
+
+
+class Sample:
+    """One accepted vital-signs frame as produced by the reader thread."""
+    __slots__ = ("ts", "wall_time", "frame_num", "heart_rate", "breath_rate", "range_m",
+                 "heart_waveform", "breath_waveform", "heart_rate_fft",
+                 "breath_rate_fft", "saved")
+
+    def __init__(self, ts, wall_time, frame_num, heart_rate, breath_rate, range_m,
+                 heart_waveform, breath_waveform, heart_rate_fft,
+                 breath_rate_fft, saved):
+        self.ts = ts                # seconds since the session's first frame (device clock)
+        self.wall_time = wall_time  # time.time() when the frame was read
+        self.frame_num = frame_num
+        self.heart_rate = heart_rate
+        self.breath_rate = breath_rate
+        self.range_m = range_m
+        self.heart_waveform = heart_waveform
+        self.breath_waveform = breath_waveform
+        self.heart_rate_fft = heart_rate_fft
+        self.breath_rate_fft = breath_rate_fft
+        self.saved = saved      # passed change-detection -> goes to the CSV
+
+
+class Stage:
+    def __init__(self, name, handler, maxsize=256, policy=BLOCK, threaded=True, on_stop=None):
+        self.name = name
+        self.handler = handler
+        self.policy = policy
+        self.threaded = threaded
+        self.on_stop = on_stop
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self._thread = None
+
+    # -----------------------------
+    # Producer side
+    # -----------------------------
+    def offer(self, item):
+        if self.policy == BLOCK:
+            self.queue.put(item)
+            return
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    # -----------------------------
+    # Consumer side
+    # -----------------------------
+    def _handle(self, item):
+        try:
+            self.handler(item)
+        except Exception as e:
+            self.errors += 1
+            if self.errors <= 5:
+                print("[{}] stage error: {}".format(self.name, e))
+        self.processed += 1
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+            self._handle(item)
+        if self.on_stop:
+            self.on_stop()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stage-" + self.name, daemon=True)
+        self._thread.start()
+
+    def drain(self, max_items=None):
+        """Process queued items on the calling thread. Returns how many were handled."""
+        n = 0
+        while max_items is None or n < max_items:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                break
+            self._handle(item)
+            n += 1
+        return n
+
+    def stop(self, timeout=5.0):
+        if self._thread is None:
+            if self.handler is not None:
+                self.drain()
+            if self.on_stop:
+                self.on_stop()
+            return
+        # the stop marker must never be dropped, so bypass the drop policy
+        self.queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            "policy": self.policy,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "queued": self.queue.qsize(),
+            "errors": self.errors,
+        }
+
+
+class Pipeline:
+    """Fan-out of Samples from one producer to several stages."""
+
+    def __init__(self):
+        self.stages = []
+        self.published = 0
+
+    def add_stage(self, name, handler, maxsize=256, policy=BLOCK, threaded=True, on_stop=None):
+        stage = Stage(name, handler, maxsize=maxsize, policy=policy, threaded=threaded, on_stop=on_stop)
+        self.stages.append(stage)
+        return stage
+
+    def start(self):
+        for stage in self.stages:
+            if stage.threaded:
+                stage.start()
+
+    def publish(self, item):
+        self.published += 1
+        for stage in self.stages:
+            stage.offer(item)
+
+    def stop(self):
+        for stage in self.stages:
+            stage.stop()
+
+    def stats(self):
+        return {stage.name: stage.stats() for stage in self.stages}
+
+    def dropped(self):
+        return {stage.name: stage.dropped for stage in self.stages}
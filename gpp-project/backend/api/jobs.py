@@ -0,0 +1,137 @@
+# jobs.py
+"""
+Background measurement jobs for the pipeline API.
+
+POST /run-sensor enqueues a Job and returns its id straight away; a worker thread
+runs the measurement (configuring -> acquiring -> cleaning -> predicting) and keeps
+job.phase / job.percent current so the client can poll /jobs/<id>.
+
+Finished jobs stay in a bounded cache (oldest evicted first) so a page that was
+reloaded can still fetch /jobs/<id>/result.
+"""
+
+import collections
+import queue
+import threading
+import time
+import traceback
+import uuid
+
+QUEUED = "queued"
+CONFIGURING = "configuring"
+ACQUIRING = "acquiring"
+CLEANING = "cleaning"
+PREDICTING = "predicting"
+DONE = "done"
+FAILED = "failed"
+
+FINISHED = (DONE, FAILED)
+
+
+class QueueFull(RuntimeError):
+    pass
+
+
+class Job:
+    def __init__(self, func, args, kwargs, meta=None, live=None):
+        self.id = uuid.uuid4().hex
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.meta = meta or {}
+        self.phase = QUEUED
+        self.percent = 0.0
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.trace = None
+        self.live = live                # optional LiveFeed while the job runs (live_stream.py)
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.done_event = threading.Event()
+
+    @property
+    def is_finished(self):
+        return self.phase in FINISHED
+
+    def update(self, phase=None, percent=None, message=None):
+        """Called by the job function to report progress."""
+        if phase is not None:
+            self.phase = phase
+        if percent is not None:
+            self.percent = max(self.percent, min(100.0, float(percent)))
+        if message is not None:
+            self.message = message
+
+    def status(self):
+        end = self.finished or time.time()
+        return {
+            "job_id": self.id,
+            "phase": self.phase,
+            "percent": round(self.percent, 1),
+            "message": self.message,
+            "error": self.error,
+            "queued_sec": round((self.started or end) - self.created, 2),
+            "elapsed_sec": round(end - self.started, 2) if self.started else 0.0,
+            **self.meta,
+        }
+
+
+class JobManager:
+    """
+    Runs jobs on `workers` threads (one is right for a single radar: measurements
+    serialise on the port anyway). At most `max_pending` jobs wait in line and at
+    most `cache_size` finished jobs are remembered.
+    """
+
+    def __init__(self, workers=1, max_pending=8, cache_size=32):
+        self.cache_size = cache_size
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._jobs = collections.OrderedDict()
+        self._lock = threading.Lock()
+        for i in range(workers):
+            threading.Thread(target=self._worker, name="job-worker-{}".format(i), daemon=True).start()
+
+    def submit(self, func, *args, meta=None, live=None, **kwargs):
+        """func(job, *args, **kwargs) runs on a worker; its return value becomes job.result."""
+        job = Job(func, args, kwargs, meta, live)
+        with self._lock:
+            try:
+                self._pending.put_nowait(job)
+            except queue.Full:
+                raise QueueFull("Too many measurements waiting ({})".format(self._pending.maxsize))
+            self._jobs[job.id] = job
+            self._evict()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _evict(self):
+        finished = [jid for jid, j in self._jobs.items() if j.is_finished]
+        for jid in finished[:max(0, len(finished) - self.cache_size)]:
+            del self._jobs[jid]
+
+    def _worker(self):
+        while True:
+            job = self._pending.get()
+            job.started = time.time()
+            try:
+                job.result = job.func(job, *job.args, **job.kwargs)
+                job.update(DONE, 100.0)
+            except Exception as e:
+                job.error = str(e)
+                job.trace = traceback.format_exc()
+                job.phase = FAILED
+            job.finished = time.time()
+            if job.live is not None:
+                job.live.close()
+            job.done_event.set()
+            with self._lock:
+                self._evict()
@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import pandas as pd
 import subprocess
@@ -7,7 +7,20 @@ import io
 import csv
 import os
 import traceback
-import json
+
+# acquisition.py lives one level up (gpp-project/backend)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from acquisition import Acquisition, open_radar
+from multi_radar import MultiAcquisition, load_devices
+from live_stream import LiveFeed, sse_format
+from figure_worker import FigureWorker, render_combined
+from jobs import (JobManager, QueueFull, CONFIGURING, ACQUIRING, CLEANING,
+                  PREDICTING, DONE, FAILED)
+
+# the models stay loaded in this process (data_analysis/inference_service.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                "data_analysis"))
+from inference_service import get_service
 
 # Fix UTF-8 for printing
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
@@ -23,8 +36,26 @@ BASE_DIR = r"C:\Users\Nikhil\Downloads\SSN\College Files\Grand Project\Respirati
 MASTER_FILE = os.path.join(BASE_DIR, "backend", "vital_signs_new_data.csv")
 USERS_FILE = os.path.join(BASE_DIR, "backend", "users.csv")
 
+FIGURE_DIR = os.path.join(BASE_DIR, "backend", "figures")
+
 CLEAN_SCRIPT = os.path.join(BASE_DIR, "data_analysis", "cleaning_data.py")
-MODEL_SCRIPT = os.path.join(BASE_DIR, "data_analysis", "predict_with_model.py")
+
+# one worker: measurements share the radar; finished results are kept for polling/reconnects
+jobs = JobManager(workers=1, max_pending=8, cache_size=32)
+
+# percent-complete budget per phase
+ACQUIRE_START = 5.0
+CLEAN_START = 80.0
+PREDICT_START = 90.0
+
+# live SSE view of a running measurement: server-side cap on events/sec per client
+LIVE_MAX_RATE = 5.0
+
+# post-session figures are rendered off-screen (Agg, no windows) behind the job
+figures = FigureWorker()
+
+# loads the four models + encodings on first use, reloads them when a .joblib changes
+inference = get_service()
 
 
 # ------------------------------------------------------------
@@ -63,8 +94,48 @@ def upload_csv():
 
 
 # ------------------------------------------------------------
-# 2️⃣ RUN SENSOR → SAVE DATA → RUN PIPELINE
+# 2️⃣ RUN SENSOR → SAVE DATA → RUN PIPELINE (background job)
 # ------------------------------------------------------------
+def measurement_job(job, user_email, config_number):
+    job.update(CONFIGURING, 0, "Starting sensor...")
+    acq = Acquisition(open_radar(), user_email, config_number, keep_streaming=True)
+    job.live.attach(acq)
+    acq.start()
+
+    # sensor left streaming: back-to-back runs with the same CFG start warm
+    job.update(ACQUIRING, ACQUIRE_START, "Collecting data ({} start)...".format(acq.start_mode))
+    try:
+        while not acq.wait(0.5):
+            job.update(percent=ACQUIRE_START + (CLEAN_START - ACQUIRE_START) * acq.progress)
+    finally:
+        stats = acq.stop()
+        job.live.close()    # ends the SSE stream; cleaning/predicting are reported by /jobs/<id>
+
+    os.makedirs(FIGURE_DIR, exist_ok=True)
+    figure_path = os.path.join(FIGURE_DIR, "{}_combined.png".format(job.id))
+    figures.submit(render_combined, figure_path, stats.csv_path, user_email, config_number)
+
+    # -------------------------------------------------------
+    # RUN CLEANING (includes calibration internally now)
+    # -------------------------------------------------------
+    job.update(CLEANING, CLEAN_START, "Cleaning and calibrating...")
+    subprocess.run([sys.executable, CLEAN_SCRIPT], check=True)
+
+    # -------------------------------------------------------
+    # RUN ML MODEL
+    # -------------------------------------------------------
+    job.update(PREDICTING, PREDICT_START, "Analysing data...")
+    ml_results = inference.predict_latest()
+
+    return {
+        "success": True,
+        "stats_text": stats.stats_text,
+        "stats": stats.to_dict(),
+        "figure": figure_path,
+        "ml_results": ml_results
+    }
+
+
 @app.post("/run-sensor")
 def run_sensor():
     try:
@@ -78,65 +149,126 @@ def run_sensor():
         if not user_exists(user_email):
             return jsonify({"success": False, "error": "User does not exist. Please sign up first."})
 
-        VITALSIGNS_SCRIPT = os.path.join(BASE_DIR, "backend", "vitalsigns.py")
-
-        # RUN SENSOR SCRIPT
-        process = subprocess.Popen(
-            [sys.executable, VITALSIGNS_SCRIPT, user_email, str(config_number)],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-
-        stdout, stderr = process.communicate()
-
-        if process.returncode != 0:
-            return jsonify({"success": False, "error": stderr or stdout})
-
-        # EXTRACT STATS BLOCK
-        stats_text = "No stats returned."
-        collecting = False
-        json_buffer = ""
-
-        for line in stdout.splitlines():
-            if "STATS_BEGIN" in line:
-                collecting = True
-                continue
-            if "STATS_END" in line:
-                break
-            if collecting:
-                json_buffer += line
-
-        try:
-            stats_text = json.loads(json_buffer).get("stats_text", "No stats found.")
-        except:
-            pass
-
-        # -------------------------------------------------------
-        # RUN CLEANING (includes calibration internally now)
-        # -------------------------------------------------------
-        subprocess.run([sys.executable, CLEAN_SCRIPT], check=True)
+        job = jobs.submit(measurement_job, user_email, int(config_number),
+                          meta={"user": user_email, "configuration": int(config_number)},
+                          live=LiveFeed(max_rate=LIVE_MAX_RATE))
 
-        # -------------------------------------------------------
-        # RUN ML MODEL
-        # -------------------------------------------------------
-        raw_output = subprocess.check_output([sys.executable, MODEL_SCRIPT], text=True).strip()
+        return jsonify({
+            "success": True,
+            "job_id": job.id,
+            "status_url": "/jobs/{}".format(job.id),
+            "result_url": "/jobs/{}/result".format(job.id),
+            "live_url": "/jobs/{}/live".format(job.id)
+        }), 202
 
-        try:
-            ml_results = json.loads(raw_output)
-        except:
-            ml_results = {"raw_output": raw_output}
+    except QueueFull as e:
+        return jsonify({"success": False, "error": str(e)}), 429
 
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)})
+
+
+# ------------------------------------------------------------
+# 2️⃣b RUN SEVERAL RADARS (one per bed) → per-device partitions
+# ------------------------------------------------------------
+def multi_measurement_job(job, devices):
+    job.update(CONFIGURING, 0, "Starting {} sensors...".format(len(devices)))
+    multi = MultiAcquisition(devices, keep_streaming=True, verbose=False)
+    multi.start()
+
+    job.update(ACQUIRING, ACQUIRE_START, "Collecting data from {} sensors...".format(len(multi.acquisitions)))
+    try:
+        while not multi.wait(0.5):
+            job.update(percent=ACQUIRE_START + (100.0 - ACQUIRE_START) * multi.progress)
+    finally:
+        results = multi.stop()
+
+    # cleaning / prediction read the single master file, so they are not run per bed here
+    return {
+        "success": not multi.errors,
+        "devices": {name: stats.to_dict() for name, stats in results.items()},
+        "stats_text": {name: stats.stats_text for name, stats in results.items()},
+        "errors": multi.errors,
+        "throughput": multi.throughput(),
+    }
+
+
+@app.post("/run-sensors")
+def run_sensors():
+    """{"devices": ["bed1", ...] (default: all in radars.json), "userEmails": {"bed1": "a@x"}}"""
+    try:
+        data = request.get_json() or {}
+        devices = load_devices()
+        wanted = data.get("devices")
+        if wanted:
+            devices = [d for d in devices if d.name in wanted]
+        if not devices:
+            return jsonify({"success": False, "error": "No matching radar devices"})
+
+        emails = data.get("userEmails") or {}
+        for d in devices:
+            d.user_email = emails.get(d.name, d.user_email)
+            if not d.user_email or not user_exists(d.user_email):
+                return jsonify({"success": False,
+                                "error": "Unknown user for {}. Please sign up first.".format(d.name)})
+
+        job = jobs.submit(multi_measurement_job, devices,
+                          meta={"devices": [d.name for d in devices]})
         return jsonify({
             "success": True,
-            "stats_text": stats_text,
-            "ml_results": ml_results
-        })
+            "job_id": job.id,
+            "status_url": "/jobs/{}".format(job.id),
+            "result_url": "/jobs/{}/result".format(job.id)
+        }), 202
+
+    except QueueFull as e:
+        return jsonify({"success": False, "error": str(e)}), 429
 
     except Exception as e:
         return jsonify({"success": False, "error": str(e)})
 
 
+@app.get("/jobs/<job_id>")
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Unknown or expired job"}), 404
+    return jsonify(job.status())
+
+
+@app.get("/jobs/<job_id>/live")
+def job_live(job_id):
+    """
+    Server-sent events while the job acquires: {"t", "frame", "hr", "rr", "range", "sqi",
+    "coalesced"} at most ?max_rate= per second, then one "end" event.
+    """
+    job = jobs.get(job_id)
+    if job is None or job.live is None:
+        return jsonify({"success": False, "error": "Unknown or expired job"}), 404
+
+    max_rate = request.args.get("max_rate", type=float)
+
+    def stream():
+        for event in job.live.events(max_rate=max_rate):
+            yield sse_format(event)
+        yield sse_format({"phase": job.phase}, name="end")
+
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.get("/jobs/<job_id>/result")
+def job_result(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Unknown or expired job"}), 404
+    if job.phase == FAILED:
+        return jsonify({"success": False, "error": job.error, "trace": job.trace})
+    if job.phase != DONE:
+        return jsonify(job.status()), 202
+    return jsonify(job.result)
+
+
 # ------------------------------------------------------------
 # 3️⃣ MANUAL PIPELINE RUN
 # ------------------------------------------------------------
@@ -146,12 +278,7 @@ def run_pipeline():
         # Run cleaning (this now includes calibration logic)
         subprocess.run([sys.executable, CLEAN_SCRIPT], check=True)
 
-        raw_output = subprocess.check_output([sys.executable, MODEL_SCRIPT], text=True).strip()
-
-        try:
-            ml_output = json.loads(raw_output)
-        except:
-            ml_output = {"raw_output": raw_output}
+        ml_output = inference.predict_latest()
 
         return jsonify({
             "message": "Pipeline completed",
@@ -165,6 +292,67 @@ def run_pipeline():
             "trace": traceback.format_exc()
         })
 
+    except Exception as e:
+        return jsonify({
+            "error": "Prediction error",
+            "details": str(e),
+            "trace": traceback.format_exc()
+        })
+
+
+# ------------------------------------------------------------
+# 4️⃣ PREDICT (resident models, no subprocess)
+# ------------------------------------------------------------
+@app.post("/predict")
+def predict():
+    """{"features": [10 values in FEATURES order] or {name: value}} or {"run": <Run>}; neither = latest run."""
+    try:
+        data = request.get_json(silent=True) or {}
+        if data.get("features") is not None:
+            result = inference.predict(data["features"])
+        elif data.get("run") is not None:
+            result = inference.predict_run(data["run"])
+        else:
+            result = inference.predict_latest()
+        return jsonify({"success": True, "ml_results": result})
+
+    except KeyError as e:
+        return jsonify({"success": False, "error": str(e.args[0])}), 404
+
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e), "trace": traceback.format_exc()})
+
+
+@app.post("/predict/batch")
+def predict_batch():
+    """
+    {"runs": [...]} or {"since": <Run>} or {} (runs not scored yet), "all": true to re-score
+    everything, "write": false to skip updating final_run_stats_predictions.csv.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        result = inference.predict_batch(runs=data.get("runs"), since=data.get("since"),
+                                         new_only=not data.get("all", False),
+                                         write=data.get("write", True))
+        return jsonify({"success": True, **result})
+
+    except KeyError as e:
+        return jsonify({"success": False, "error": str(e.args[0])}), 404
+
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e), "trace": traceback.format_exc()})
+
+
+@app.get("/predict/status")
+def predict_status():
+    return jsonify(inference.status())
+
 
 # ------------------------------------------------------------
 # HEALTH CHECK
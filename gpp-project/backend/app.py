@@ -1,11 +1,12 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import subprocess
 import sys
 import io
 import csv
 import os
 
+from acquisition import run_measurement
+
 # UTF-8 output
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
@@ -56,21 +57,10 @@ def run_sensor():
                 "error": "User does not exist in users.csv. Please sign up first."
             })
 
-        # Run your Python sensor script
-        process = subprocess.Popen(
-            [sys.executable, "vst.py", user_email, str(config_number)],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-
-        stdout, stderr = process.communicate()
-
-        if process.returncode != 0:
-            print("Error running vst.py:", stderr)
-            return jsonify({"success": False, "error": stderr})
+        # Run the measurement in-process (no interpreter start-up, typed results)
+        stats = run_measurement(user_email, int(config_number))
 
-        return jsonify({"success": True, "output": stdout})
+        return jsonify({"success": True, "output": stats.stats_text, "stats": stats.to_dict()})
 
     except Exception as e:
         print("Backend Error:", str(e))
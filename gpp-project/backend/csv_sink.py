@@ -0,0 +1,197 @@
+# csv_sink.py
+"""
+Group-commit CSV writer for the master vital-signs file.
+
+Rows are formatted with one precompiled template and buffered; the buffer is
+written (one write + flush) when it holds `flush_rows` rows or its oldest row is
+`flush_interval` seconds old, whichever comes first. A small timer thread
+handles the time threshold when rows stop arriving. durable=True also fsyncs
+every commit.
+
+commit() / close() write whatever is pending; Acquisition.stop() calls them
+before the radar session sends sensorStop, and vitalsigns.py reaches stop()
+from its finally block, so Ctrl+C loses nothing that was handed to the sink.
+
+Usage:
+    sink = CsvSink(MASTER_CSV, CSV_HEADER, flush_interval=0.25, flush_rows=100)
+    sink.write_sample(sample, user_email, config_type)
+    sink.close()
+"""
+
+import csv
+import datetime
+import io
+import os
+import threading
+import time
+
+FLUSH_INTERVAL = 0.25   # seconds
+FLUSH_ROWS = 100
+
+# Timestamp, User, Configuration, SessionTime, HR, RR, Range, HeartWF, BreathWF, HR_FFT, RR_FFT
+ROW_FORMAT = "{},{},{},{:.2f},{:.2f},{:.2f},{:.3f},{:.4f},{:.4f},{:.2f},{:.2f}\r\n"
+
+
+def csv_field(value):
+    """One field quoted exactly like csv.writer would (done once per session, not per row)."""
+    buf = io.StringIO()
+    csv.writer(buf).writerow([value])
+    return buf.getvalue()[:-2]
+
+
+class CsvSink:
+    def __init__(self, path, header=None, flush_interval=FLUSH_INTERVAL, flush_rows=FLUSH_ROWS,
+                 durable=False):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_rows = flush_rows
+        self.durable = durable
+
+        self.rows = 0
+        self.commits = 0
+        self.max_commit_ms = 0.0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._f = open(path, "a", newline="")
+        self._buf = []
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._second = None
+        self._second_str = None
+        self._fields = {}
+        if new_file and header:
+            # flushed directly: the header is not a row commit and stays out of the counters
+            self._f.write(",".join(csv_field(h) for h in header) + "\r\n")
+            self._f.flush()
+            if durable:
+                os.fsync(self._f.fileno())
+
+        self._closed = threading.Event()
+        self._timer = threading.Thread(target=self._timer_loop, name="csv-sink-timer", daemon=True)
+        self._timer.start()
+
+    # -----------------------------
+    # Row formatting
+    # -----------------------------
+    def _timestamp(self, wall_time):
+        # local time to the millisecond; the date/time part is formatted once per second
+        now = datetime.datetime.fromtimestamp(wall_time)
+        second = now.replace(microsecond=0)
+        if second != self._second:
+            self._second = second
+            self._second_str = second.strftime("%Y-%m-%d %H:%M:%S")
+        return "{}.{:03d}".format(self._second_str, now.microsecond // 1000)
+
+    def _field(self, value):
+        field = self._fields.get(value)
+        if field is None:
+            field = self._fields[value] = csv_field(value)
+        return field
+
+    def write_sample(self, sample, user_email, config_type):
+        self.write_line(ROW_FORMAT.format(
+            self._timestamp(sample.wall_time), self._field(user_email), config_type,
+            sample.ts, sample.heart_rate, sample.breath_rate, sample.range_m,
+            sample.heart_waveform, sample.breath_waveform,
+            sample.heart_rate_fft, sample.breath_rate_fft))
+
+    # -----------------------------
+    # Buffering / commits
+    # -----------------------------
+    def write_line(self, line):
+        with self._lock:
+            if not self._buf:
+                self._oldest = time.monotonic()
+            self._buf.append(line)
+            self.rows += 1
+            if len(self._buf) >= self.flush_rows or time.monotonic() - self._oldest >= self.flush_interval:
+                self._commit_locked()
+
+    def _commit_locked(self):
+        t0 = time.perf_counter()
+        if self._buf:
+            self._f.write("".join(self._buf))
+            self._buf = []
+        self._f.flush()
+        if self.durable:
+            os.fsync(self._f.fileno())
+        self.commits += 1
+        self.max_commit_ms = max(self.max_commit_ms, (time.perf_counter() - t0) * 1000.0)
+
+    def commit(self):
+        with self._lock:
+            if self._buf and not self._f.closed:
+                self._commit_locked()
+
+    def _timer_loop(self):
+        while not self._closed.wait(self.flush_interval / 2):
+            with self._lock:
+                if self._buf and time.monotonic() - self._oldest >= self.flush_interval:
+                    self._commit_locked()
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            if self._f.closed:
+                return
+            if self._buf:
+                self._commit_locked()
+            elif self.durable:
+                os.fsync(self._f.fileno())
+            self._f.close()
+
+    def stats(self):
+        return {
+            "rows": self.rows,
+            "commits": self.commits,
+            "rows_per_commit": self.rows / self.commits if self.commits else 0.0,
+            "max_commit_ms": self.max_commit_ms,
+            "durable": self.durable,
+        }
+
+
+# -----------------------------
+# Benchmark: per-row flush (old) vs group commit
+# -----------------------------
+if __name__ == "__main__":
+    import tempfile
+    from acquisition_pipeline import Sample
+
+    N = 20000
+    samples = [Sample(i * 0.05, time.time() + i * 0.05, i, 72.0 + i % 7, 14.0 + i % 3, 0.8 + (i % 11) * 0.01,
+                      0.1 * (i % 13), -0.2 * (i % 5), 72.5, 14.5, True) for i in range(N)]
+    tmp = tempfile.mkdtemp()
+
+    # old path: csv.writer + str.format per field + flush per row
+    t0 = time.perf_counter()
+    with open(os.path.join(tmp, "old.csv"), "a", newline="") as f:
+        w = csv.writer(f)
+        for s in samples:
+            now = datetime.datetime.fromtimestamp(s.wall_time)
+            w.writerow([now.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3], "user@example.com", 0,
+                        "{:.2f}".format(s.ts), "{:.2f}".format(s.heart_rate), "{:.2f}".format(s.breath_rate),
+                        "{:.3f}".format(s.range_m), "{:.4f}".format(s.heart_waveform),
+                        "{:.4f}".format(s.breath_waveform), "{:.2f}".format(s.heart_rate_fft),
+                        "{:.2f}".format(s.breath_rate_fft)])
+            f.flush()
+    old = time.perf_counter() - t0
+
+    results = []
+    for durable in (False, True):
+        path = os.path.join(tmp, "new_{}.csv".format(durable))
+        t0 = time.perf_counter()
+        sink = CsvSink(path, durable=durable)
+        for s in samples:
+            sink.write_sample(s, "user@example.com", 0)
+        sink.close()
+        results.append((durable, time.perf_counter() - t0, sink.stats()))
+
+    with open(os.path.join(tmp, "old.csv")) as a, open(os.path.join(tmp, "new_False.csv")) as b:
+        same = a.read() == b.read()
+    print("rows                 : {}".format(N))
+    print("per-row flush        : {:8.1f} ms".format(old * 1000))
+    for durable, elapsed, st in results:
+        print("group commit{:9}: {:8.1f} ms  ({} commits, {:.0f} rows/commit)".format(
+            " + fsync" if durable else "", elapsed * 1000, st["commits"], st["rows_per_commit"]))
+    print("identical output     : {}".format(same))
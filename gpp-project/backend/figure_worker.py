@@ -0,0 +1,172 @@
+# figure_worker.py
+"""
+Off-screen post-session figures, rendered on a background thread.
+
+Headless runs (vitalsigns.py --headless, the Flask API) must never open a window,
+so figures are drawn with matplotlib's object API (matplotlib.figure.Figure, Agg
+canvas) straight to PNG files. pyplot and the Tk backend are never imported, and
+matplotlib itself is only imported by the worker thread when the first figure is
+rendered.
+
+Usage:
+    worker = FigureWorker()
+    worker.submit(render_trends, "trends.png", times, hr, rr, ranges)
+    worker.submit(render_combined, "combined.png", MASTER_CSV, user_email, config_type)
+    ...                                   # keep working (ML script etc.)
+    paths = worker.close()                # wait for the PNGs
+"""
+
+import csv
+import queue
+import threading
+
+_STOP = object()
+
+
+# -----------------------------
+# Data helpers (shared with the interactive TI graph in vitalsigns.py)
+# -----------------------------
+def normalize(arr):
+    amin, amax = min(arr), max(arr)
+    if abs(amax - amin) < 1e-6:
+        return [0.0] * len(arr)
+    return [((v - amin) / (amax - amin)) * 2.0 - 1.0 for v in arr]
+
+
+def combined_waveform(heart_wf, breath_wf, hr_fft, rr_fft):
+    """TI-style weighted mix of the four normalised signals, normalised again."""
+    nh = normalize(heart_wf)
+    nb = normalize(breath_wf)
+    nhf = normalize(hr_fft)
+    nrf = normalize(rr_fft)
+    combined = []
+    for i in range(len(nh)):
+        b = nb[i] if i < len(nb) else 0
+        hf = nhf[i] if i < len(nhf) else 0
+        rf = nrf[i] if i < len(nrf) else 0
+        combined.append(0.45 * nh[i] + 0.35 * b + 0.10 * hf + 0.10 * rf)
+    return normalize(combined)
+
+
+def load_waveforms(csv_path, user_email, config_type):
+    """HeartWaveform / BreathWaveform / HeartRate_FFT / BreathRate_FFT rows for user + config."""
+    cols = ("HeartWaveform", "BreathWaveform", "HeartRate_FFT", "BreathRate_FFT")
+    out = {c: [] for c in cols}
+    with open(csv_path, newline="") as f:
+        for row in csv.DictReader(f):
+            if row.get("User") != user_email or str(row.get("Configuration")) != str(config_type):
+                continue
+            try:
+                values = [float(row[c]) for c in cols]
+            except (KeyError, TypeError, ValueError):
+                continue
+            for c, v in zip(cols, values):
+                out[c].append(v)
+    return out
+
+
+# -----------------------------
+# Renderers (Agg only, one Figure per call)
+# -----------------------------
+def render_trends(path, times, hr_values, rr_values, range_values=None, title=None):
+    """HR / RR (/ range) over the session, like the live plot."""
+    from matplotlib.figure import Figure
+
+    rows = 3 if range_values else 2
+    fig = Figure(figsize=(10, 2.7 * rows))
+    axes = fig.subplots(rows, 1, sharex=True)
+    axes[0].plot(times, hr_values, '-', linewidth=1.5)
+    axes[0].set_ylabel("Heart Rate (BPM)")
+    axes[1].plot(times, rr_values, '-', linewidth=1.5)
+    axes[1].set_ylabel("Respiration Rate (BPM)")
+    if range_values:
+        axes[2].plot(times, range_values, '-', linewidth=1.5)
+        axes[2].set_ylabel("Range (m)")
+    axes[-1].set_xlabel("Time (s)")
+    for a in axes:
+        a.grid(True, alpha=0.3)
+    if title:
+        fig.suptitle(title)
+    fig.tight_layout()
+    fig.savefig(path, dpi=120)
+    return path
+
+
+def render_combined(path, csv_path, user_email, config_type):
+    """Off-screen version of the TI combined-waveform window. Returns None if no rows."""
+    data = load_waveforms(csv_path, user_email, config_type)
+    heart_wf = data["HeartWaveform"]
+    if not heart_wf:
+        return None
+    breath_wf = data["BreathWaveform"]
+    hr_fft = data["HeartRate_FFT"]
+    combined = combined_waveform(heart_wf, breath_wf, hr_fft, data["BreathRate_FFT"])
+
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(12, 8))
+    axs = fig.subplots(4, 1, sharex=True)
+    x = list(range(len(combined)))
+    for ax, y, label, width in ((axs[0], heart_wf, "HeartWaveform", 1),
+                                (axs[1], breath_wf, "BreathWaveform", 1),
+                                (axs[2], hr_fft, "HR_FFT", 1),
+                                (axs[3], combined, "COMBINED", 2)):
+        ax.plot(x, y, linewidth=width, label=label)
+        ax.legend(loc="upper right")
+        ax.grid(alpha=0.2)
+    axs[0].set_ylabel("HeartWF")
+    axs[1].set_ylabel("BreathWF")
+    axs[2].set_ylabel("HR_FFT")
+    axs[3].set_ylabel("Combined")
+    fig.suptitle("Combined Vital Signs Waveform - user: {} config: {}".format(user_email, config_type))
+    fig.tight_layout(rect=[0, 0, 1, 0.96])
+    fig.savefig(path, dpi=180)
+    return path
+
+
+# -----------------------------
+# Background worker
+# -----------------------------
+class FigureWorker:
+    """One daemon thread rendering submitted figures in order."""
+
+    def __init__(self):
+        self.outputs = []
+        self.errors = []
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def submit(self, render, *args, **kwargs):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="figure-worker", daemon=True)
+            self._thread.start()
+        self._queue.put((render, args, kwargs))
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is _STOP:
+                break
+            render, args, kwargs = job
+            try:
+                path = render(*args, **kwargs)
+                if path:
+                    self.outputs.append(path)
+            except Exception as e:
+                self.errors.append("{}: {}".format(render.__name__, e))
+            finally:
+                self._queue.task_done()
+
+    def wait(self):
+        """Block until everything submitted so far is on disk (worker keeps running)."""
+        if self._thread is not None:
+            self._queue.join()
+        return list(self.outputs)
+
+    def close(self, timeout=60):
+        """Finish pending figures and stop the thread. Returns the written paths."""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            self._thread = None
+        return list(self.outputs)
@@ -0,0 +1,161 @@
+# frame_clock.py
+"""
+Device-side timing for the frame stream: session time from the radar's own
+frame_num / time_cpu header fields, plus link-health counters.
+
+Each frame is classified by its frame-number step (mod 2^32) from the last one:
+    1               in sequence
+    0               duplicate (same frame delivered twice)  -> skip it
+    2..MAX_GAP      frames lost in between (step - 1 of them)
+    anything else   frame number went backwards: a sensor restart if it starts
+                    near 0 again, otherwise an out-of-order frame -> skip it
+
+Session time is taken from time_cpu (the R4F cycle counter, CPU_CLOCK_HZ) once it
+is seen to advance; 32-bit wraps are unwrapped using the frame-number step, so a
+long gap still lands on the right wrap. Until then (or with firmware that leaves
+time_cpu at 0) it is frame steps x the frameCfg periodicity.
+
+Usage:
+    clock = FrameClock(frame_period=frame_period_from_cfg(lines))
+    ts = clock.update(header.frame_num, header.time_cpu)   # None -> duplicate / stale
+    clock.stats()                                            # for the session summary
+"""
+
+CPU_CLOCK_HZ = 200e6        # xWR68xx MSS (R4F) clock that time_cpu counts
+FRAME_PERIOD = 0.05         # 20 fps profiles, used when the cfg does not say
+MAX_GAP = 1 << 20           # larger forward steps are treated as a restart
+RESTART_FRAME = 16          # frame numbers at or below this after a step back = restart
+
+_WRAP = 1 << 32
+
+
+def frame_period_from_cfg(lines, default=FRAME_PERIOD):
+    """Frame periodicity (seconds) from the frameCfg line of a TI cfg."""
+    for line in lines:
+        parts = line.split()
+        if parts and parts[0] == "frameCfg" and len(parts) > 5:
+            try:
+                return float(parts[5]) / 1000.0
+            except ValueError:
+                break
+    return default
+
+
+class FrameClock:
+    def __init__(self, frame_period=FRAME_PERIOD, cpu_hz=CPU_CLOCK_HZ):
+        self.frame_period = frame_period
+        self.cpu_hz = cpu_hz
+
+        self.frames = 0             # accepted (in sequence or after a gap/restart)
+        self.lost = 0
+        self.duplicates = 0
+        self.out_of_order = 0
+        self.restarts = 0
+        self.gaps = 0               # number of gap events
+        self.max_gap = 0
+        self.source = "frame"       # "cpu" once time_cpu is seen advancing
+
+        self._last_frame = None
+        self._last_cpu = None
+        self._ts = 0.0
+
+    def update(self, frame_num, time_cpu):
+        """Device session time (s) of this frame, or None if it is a duplicate / stale frame."""
+        if self._last_frame is None:
+            self._accept(frame_num, time_cpu)
+            return self._ts
+
+        step = (frame_num - self._last_frame) % _WRAP
+        if step == 0:
+            self.duplicates += 1
+            return None
+        if step > MAX_GAP:
+            if frame_num <= RESTART_FRAME:
+                # sensor restarted: keep the session clock running from here
+                self.restarts += 1
+                self._ts += self.frame_period
+                self._accept(frame_num, time_cpu)
+                return self._ts
+            self.out_of_order += 1
+            return None
+
+        if step > 1:
+            self.gaps += 1
+            self.lost += step - 1
+            self.max_gap = max(self.max_gap, step - 1)
+
+        elapsed = step * self.frame_period
+        if self._last_cpu is not None and time_cpu != self._last_cpu:
+            ticks = (time_cpu - self._last_cpu) % _WRAP
+            # add back the wraps a long gap hides (nearest to what the frame step predicts)
+            expected = elapsed * self.cpu_hz
+            ticks += round((expected - ticks) / _WRAP) * _WRAP
+            elapsed = ticks / self.cpu_hz
+            self.source = "cpu"
+        self._ts += elapsed
+        self._accept(frame_num, time_cpu)
+        return self._ts
+
+    def _accept(self, frame_num, time_cpu):
+        self.frames += 1
+        self._last_frame = frame_num
+        self._last_cpu = time_cpu
+
+    @property
+    def device_time(self):
+        return self._ts
+
+    def stats(self, host_elapsed=None):
+        expected = self.frames + self.lost
+        out = {
+            "frames": self.frames,
+            "lost": self.lost,
+            "duplicates": self.duplicates,
+            "out_of_order": self.out_of_order,
+            "restarts": self.restarts,
+            "gaps": self.gaps,
+            "max_gap": self.max_gap,
+            "loss_pct": self.lost / expected * 100.0 if expected else 0.0,
+            "clock": self.source,
+            "device_sec": self._ts,
+        }
+        if host_elapsed:
+            out["host_sec"] = host_elapsed
+        return out
+
+
+# -----------------------------
+# Self-check: python frame_clock.py
+# -----------------------------
+if __name__ == "__main__":
+    import random
+
+    rng = random.Random(17)
+    clock = FrameClock(frame_period=0.05)
+    sent_lost, sent_dup = 0, 0
+    frame, cpu = 5, 4000000000          # time_cpu wraps within the first second
+    t0, worst = None, 0.0
+    true_t = 0.0
+    for _ in range(20000):
+        r = rng.random()
+        step = 1
+        if r < 0.01:
+            step = rng.randint(2, 40)
+            sent_lost += step - 1
+        elif r < 0.02:
+            step = 0
+            sent_dup += 1
+        frame = (frame + step) % _WRAP
+        if step:
+            true_t += step * 0.05
+            cpu = (cpu + int(step * 0.05 * CPU_CLOCK_HZ)) % _WRAP
+        ts = clock.update(frame, cpu)
+        if t0 is None:
+            t0 = true_t                 # device time counts from the first frame
+        if ts is not None:
+            worst = max(worst, abs(ts - (true_t - t0)))
+    st = clock.stats()
+    print("lost       : {} (expected {})".format(st["lost"], sent_lost))
+    print("duplicates : {} (expected {})".format(st["duplicates"], sent_dup))
+    print("clock      : {}, max error {:.2e} s over {:.0f} s".format(st["clock"], worst, true_t))
+    assert st["lost"] == sent_lost and st["duplicates"] == sent_dup and worst < 1e-6
@@ -0,0 +1,131 @@
+# frame_reader.py
+"""
+Buffered frame reader for the mmWave DATA port.
+
+Instead of calling data_ser.read(1) for every byte until the magic word shows up,
+the reader drains everything waiting on the port in one read, keeps it in a
+growing/compacting buffer and finds the sync word with bytearray.find (a single
+C-level search). Complete frames (40-byte header + payload) are handed back as
+bytes objects.
+
+Usage:
+    reader = FrameReader(data_ser)
+    frame = reader.read_frame()      # None if the port timed out
+    print(reader.stats())            # bytes/sec, frames, resyncs
+"""
+
+import struct
+import time
+
+MAGIC_WORD = b'\x02\x01\x04\x03\x06\x05\x08\x07'
+HEADER_LEN = 40          # magic(8) + 8 x uint32
+MAX_PACKET_LEN = 65536
+
+# total packet length sits right after magic + version
+_TOTAL_LEN = struct.Struct('<I')
+_TOTAL_LEN_OFFSET = 12
+
+
+class FrameReader:
+    """Reads complete radar frames from a serial-like object (needs read() and in_waiting)."""
+
+    def __init__(self, ser, compact_threshold=65536):
+        self.ser = ser
+        self.compact_threshold = compact_threshold
+
+        self._buf = bytearray()
+        self._pos = 0            # start of unconsumed data in _buf
+
+        self.start_time = time.time()
+        self.bytes_read = 0
+        self.bytes_discarded = 0 # bytes thrown away while looking for sync
+        self.resyncs = 0         # times the stream had to be re-aligned
+        self.frames = 0
+
+    # -----------------------------
+    # Port I/O
+    # -----------------------------
+    def _fill(self):
+        """Drain whatever is waiting on the port (blocks up to the port timeout for 1 byte)."""
+        waiting = self.ser.in_waiting
+        if waiting:
+            data = self.ser.read(waiting)
+        else:
+            data = self.ser.read(1)
+            # woke up on the first byte; grab anything that arrived with it
+            if data and self.ser.in_waiting:
+                data += self.ser.read(self.ser.in_waiting)
+        if not data:
+            return 0
+        self._buf += data
+        self.bytes_read += len(data)
+        return len(data)
+
+    def _compact(self):
+        if self._pos and (self._pos >= self.compact_threshold or self._pos * 2 >= len(self._buf)):
+            del self._buf[:self._pos]
+            self._pos = 0
+
+    # -----------------------------
+    # Frame extraction
+    # -----------------------------
+    def _next_from_buffer(self):
+        """Return one complete frame from the buffer, or None if more bytes are needed."""
+        buf = self._buf
+        while True:
+            idx = buf.find(MAGIC_WORD, self._pos)
+            if idx < 0:
+                # keep the last 7 bytes: they may be the start of a split magic word
+                keep_from = max(self._pos, len(buf) - (len(MAGIC_WORD) - 1))
+                if keep_from > self._pos:
+                    self.bytes_discarded += keep_from - self._pos
+                    self._pos = keep_from
+                return None
+
+            if idx > self._pos:
+                self.bytes_discarded += idx - self._pos
+                self.resyncs += 1
+                self._pos = idx
+
+            if len(buf) - idx < HEADER_LEN:
+                return None
+
+            total_len = _TOTAL_LEN.unpack_from(buf, idx + _TOTAL_LEN_OFFSET)[0]
+            if total_len < HEADER_LEN or total_len > MAX_PACKET_LEN:
+                # corrupt header: skip this magic word and search again
+                self.resyncs += 1
+                self.bytes_discarded += 1
+                self._pos = idx + 1
+                continue
+
+            if len(buf) - idx < total_len:
+                return None
+
+            frame = bytes(buf[idx:idx + total_len])
+            self._pos = idx + total_len
+            self.frames += 1
+            return frame
+
+    def read_frame(self):
+        """Return the next complete frame as bytes, or None when the port had nothing to give."""
+        while True:
+            frame = self._next_from_buffer()
+            self._compact()
+            if frame is not None:
+                return frame
+            if self._fill() == 0:
+                return None
+
+    # -----------------------------
+    # Stats
+    # -----------------------------
+    def stats(self):
+        elapsed = max(time.time() - self.start_time, 1e-9)
+        return {
+            "bytes_read": self.bytes_read,
+            "bytes_per_sec": self.bytes_read / elapsed,
+            "frames": self.frames,
+            "frames_per_sec": self.frames / elapsed,
+            "resyncs": self.resyncs,
+            "bytes_discarded": self.bytes_discarded,
+        }
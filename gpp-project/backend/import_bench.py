@@ -0,0 +1,173 @@
+# import_bench.py
+"""
+Start-up import cost of the acquisition / pipeline entry points, baseline vs now.
+
+For every entry point the module-level imports (what is paid before the script does
+any work; imports inside functions are not counted) are collected with `ast`, once
+from the working tree and once from a git revision. Each set is imported in a fresh
+interpreter under `python -X importtime` and the top-level cumulative times are summed.
+
+Usage:
+    python import_bench.py [--rev <git revision>] [--repeat 3] [--top 5]
+
+--rev defaults to the repository's first commit. Modules that are not installed are
+listed as missing and excluded from both totals, so the comparison stays fair; run
+it where pandas / matplotlib / scipy are installed to see what the lazy imports save.
+"""
+
+import ast
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PROJECT = os.path.dirname(HERE)
+
+ENTRY_POINTS = [
+    "backend/vitalsigns.py",
+    "backend/api/pipeline.py",
+    "backend/app.py",
+    "data_analysis/predict_with_model.py",
+    "data_analysis/cleaning_data.py",
+]
+
+
+def module_level_imports(source):
+    """Top-level module names imported outside any function/class body, in order."""
+    found = []
+
+    def visit(nodes):
+        for node in nodes:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                continue
+            if isinstance(node, ast.Import):
+                names = [a.name for a in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                names = [node.module]
+            else:
+                names = []
+            for name in names:
+                if name not in found:
+                    found.append(name)
+            for field in ("body", "orelse", "finalbody", "handlers"):
+                visit(getattr(node, field, []) or [])
+
+    visit(ast.parse(source).body)
+    return found
+
+
+def git_source(rev, relpath):
+    repo_path = os.path.relpath(os.path.join(PROJECT, relpath), git_root())
+    try:
+        return subprocess.check_output(["git", "show", "{}:{}".format(rev, repo_path.replace(os.sep, "/"))],
+                                       cwd=PROJECT, stderr=subprocess.DEVNULL, text=True)
+    except subprocess.CalledProcessError:
+        return None
+
+
+def git_root():
+    return subprocess.check_output(["git", "rev-parse", "--show-toplevel"], cwd=PROJECT, text=True).strip()
+
+
+def first_commit():
+    return subprocess.check_output(["git", "rev-list", "--max-parents=0", "HEAD"], cwd=PROJECT,
+                                   text=True).split()[0]
+
+
+_startup = None
+
+
+def _interpreter_startup():
+    """Modules -X importtime reports for an empty program."""
+    global _startup
+    if _startup is None:
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "pass"], capture_output=True, text=True)
+        _startup = {line.split("|")[2].strip() for line in proc.stderr.splitlines()
+                    if line.startswith("import time:") and line.count("|") == 2}
+    return _startup
+
+
+def measure(modules, script_dir, repeat=3):
+    """
+    Import `modules` in a fresh interpreter with -X importtime.
+    Returns (best total microseconds, {module: us} for that run, missing modules).
+    """
+    code = ("import sys\n"
+            "sys.path.insert(0, {!r})\n"
+            "sys.path.insert(0, {!r})\n"
+            "for m in {!r}:\n"
+            "    try:\n"
+            "        __import__(m)\n"
+            "    except Exception:\n"
+            "        print(m)\n").format(HERE, script_dir, modules)
+    startup = _interpreter_startup()
+    best = None
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                              capture_output=True, text=True, cwd=script_dir)
+        missing = proc.stdout.split()
+        per_module = {}
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            parts = line.split("|")
+            name = parts[2]
+            # top level = one space; site/encodings etc. are paid by every interpreter
+            if name.startswith(" ") and not name.startswith("  ") and name.strip() not in startup:
+                try:
+                    per_module[name.strip()] = int(parts[1])
+                except ValueError:
+                    pass
+        total = sum(per_module.values())
+        if best is None or total < best[0]:
+            best = (total, per_module, missing)
+    return best
+
+
+def report(rev, repeat, top):
+    print("Baseline revision: {}".format(rev))
+    print("{:<40} {:>12} {:>12} {:>8}".format("entry point", "baseline ms", "now ms", "saved"))
+    details = []
+    for rel in ENTRY_POINTS:
+        path = os.path.join(PROJECT, rel)
+        if not os.path.exists(path):
+            continue
+        script_dir = os.path.dirname(path)
+        with open(path, encoding="utf-8") as f:
+            now_mods = module_level_imports(f.read())
+        old_src = git_source(rev, rel)
+        old_mods = module_level_imports(old_src) if old_src else []
+
+        # measure both with the same set of installed modules
+        _, _, missing_now = measure(now_mods, script_dir, 1)
+        _, _, missing_old = measure(old_mods, script_dir, 1)
+        missing = set(missing_now) | set(missing_old)
+        now_total, now_per, _ = measure([m for m in now_mods if m not in missing], script_dir, repeat)
+        old_total, old_per, _ = measure([m for m in old_mods if m not in missing], script_dir, repeat)
+
+        saved = (1 - now_total / old_total) * 100.0 if old_total else 0.0
+        print("{:<40} {:>12.1f} {:>12.1f} {:>7.0f}%".format(rel, old_total / 1000.0, now_total / 1000.0, saved))
+        details.append((rel, old_mods, now_mods, old_per, now_per, sorted(missing)))
+
+    for rel, old_mods, now_mods, old_per, now_per, missing in details:
+        print("\n" + rel)
+        dropped = [m for m in old_mods if m not in now_mods]
+        added = [m for m in now_mods if m not in old_mods]
+        if dropped:
+            print("  no longer imported at start-up: " + ", ".join(dropped))
+        if added:
+            print("  new start-up imports          : " + ", ".join(added))
+        if missing:
+            print("  not installed (excluded)      : " + ", ".join(missing))
+        for name, us in sorted(now_per.items(), key=lambda kv: kv[1], reverse=True)[:top]:
+            print("  {:<30} {:8.1f} ms".format(name, us / 1000.0))
+
+
+def _arg(name, default, cast=str):
+    if name in sys.argv:
+        return cast(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+
+if __name__ == "__main__":
+    report(_arg("--rev", None) or first_commit(), _arg("--repeat", 3, int), _arg("--top", 5, int))
@@ -0,0 +1,113 @@
+# live_stream.py
+"""
+Rate-limited live view of a running acquisition (feeds the /jobs/<id>/live SSE endpoint).
+
+A LiveFeed is one more drop-oldest stage on the Acquisition pipeline. Its handler
+only overwrites a "latest sample" slot, so however slow a client is, the reader
+thread never waits on it. Every client gets at most `max_rate` events per second,
+each carrying the newest sample plus how many samples were coalesced into it.
+
+Signal quality uses the SQI definition from cleaning_data.py (1 / range SD),
+over the last `quality_window` accepted samples.
+
+Usage:
+    feed = LiveFeed(max_rate=5)
+    feed.attach(acq)                  # before acq.start()
+    for event in feed.events():       # dicts, or None as a keep-alive tick
+        ...
+    feed.close()                      # after acq.stop(); ends every events() loop
+"""
+
+import json
+import threading
+import time
+
+from acquisition_pipeline import DROP_OLDEST
+from streaming_stats import Welford
+
+MAX_RATE = 5.0          # events / second per client
+QUALITY_WINDOW = 20     # samples in the live SQI
+SQI_MAX = 1000.0        # SQI when the range is perfectly steady
+KEEPALIVE_SEC = 15.0
+
+
+class LiveFeed:
+    def __init__(self, max_rate=MAX_RATE, quality_window=QUALITY_WINDOW):
+        self.max_rate = max_rate
+        self.quality_window = quality_window
+        self.latest = None
+        self.seq = 0
+        self.closed = False
+        self._ranges = Welford(quality_window)
+        self._cond = threading.Condition()
+
+    # -----------------------------
+    # Producer side (stage handler on the acquisition pipeline)
+    # -----------------------------
+    def attach(self, acquisition):
+        return acquisition.add_stage("live", self._on_sample, maxsize=64, policy=DROP_OLDEST)
+
+    def _quality(self, range_m):
+        self._ranges.add(range_m)
+        if len(self._ranges) < 3:
+            return None
+        sd = self._ranges.pstdev()
+        return SQI_MAX if sd < 1.0 / SQI_MAX else 1.0 / sd
+
+    def _on_sample(self, sample):
+        event = {
+            "t": round(sample.ts, 2),
+            "frame": sample.frame_num,
+            "hr": round(sample.heart_rate, 2),
+            "rr": round(sample.breath_rate, 2),
+            "range": round(sample.range_m, 3),
+            "sqi": self._quality(sample.range_m),
+        }
+        with self._cond:
+            self.latest = event
+            self.seq += 1
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    # -----------------------------
+    # Consumer side (one generator per client)
+    # -----------------------------
+    def events(self, max_rate=None, keepalive=KEEPALIVE_SEC):
+        """
+        Yields the newest sample at most max_rate times a second, None when nothing
+        arrived for `keepalive` seconds; stops on close(). A max_rate outside
+        (0, feed's max_rate] (missing, negative, NaN, too high) gets the feed's max_rate.
+        """
+        rate = max_rate if max_rate is not None and 0 < max_rate <= self.max_rate else self.max_rate
+        interval = 1.0 / rate if rate > 0 else 0.0
+        seen = 0
+        while True:
+            with self._cond:
+                if self.seq == seen and not self.closed:
+                    self._cond.wait(keepalive)
+                if self.seq == seen:
+                    if self.closed:
+                        return
+                    event = None
+                else:
+                    event = dict(self.latest, coalesced=self.seq - seen)
+                    seen = self.seq
+            sent_at = time.monotonic()
+            yield event
+            if event is not None and interval:
+                # rate limit: whatever arrives meanwhile is coalesced into the next event
+                delay = sent_at + interval - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+
+def sse_format(event, name=None):
+    """One server-sent-event frame; None becomes a comment line (keeps proxies from timing out)."""
+    if event is None:
+        return ": keepalive\n\n"
+    head = "event: {}\n".format(name) if name else ""
+    return head + "data: " + json.dumps(event) + "\n\n"
@@ -0,0 +1,284 @@
+# multi_radar.py
+"""
+Several radars (one per bed) measured concurrently in one process.
+
+Each device gets its own RadarSession, Acquisition (reader thread, FrameClock,
+VitalsProcessor with its own range-method selection, pipeline stages) and its own
+output partition:
+
+    <output_dir>/<device name>/vital_signs_data_new.csv
+    <output_dir>/<device name>/archives/*.vsarc
+    <output_dir>/<device name>/.radar_session.json
+
+Radar configuration uploads (the slow part of a cold start) run in parallel, so N
+radars start in about the time of one. A radar that fails to open or configure is
+reported in `errors` and the others carry on.
+
+Devices come from a JSON list (DEVICES_FILE, or VITALS_DEVICES_FILE):
+    [{"name": "bed1", "user_port": "COM5", "data_port": "COM6", "config_type": 0,
+      "cfg_file": null, "user_email": "a@x"}, ...]
+
+Usage:
+    multi = MultiAcquisition(load_devices(), duration=30)
+    results = multi.run()                     # {name: SessionStats}
+    print(multi.throughput())
+
+Benchmark against N virtual radars (Linux / macOS):
+    python multi_radar.py --bench 1 2 4 8 [--seconds 5] [--fps 20]
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+from acquisition import (Acquisition, cfg_for, CSV_DIR, DURATION, USER_BAUD, DATA_BAUD)
+from radar_session import get_session
+
+DEVICES_FILE = os.environ.get("VITALS_DEVICES_FILE", os.path.join(CSV_DIR, "radars.json"))
+PARTITION_DIR = os.path.join(CSV_DIR, "beds")
+
+
+class RadarDevice:
+    def __init__(self, name, user_port, data_port, config_type=0, cfg_file=None, user_email=None):
+        self.name = name
+        self.user_port = user_port
+        self.data_port = data_port
+        self.config_type = config_type
+        self.cfg_file = cfg_file or cfg_for(config_type)
+        self.user_email = user_email
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["name"], d["user_port"], d["data_port"], int(d.get("config_type", 0)),
+                   d.get("cfg_file"), d.get("user_email"))
+
+    def to_dict(self):
+        return {"name": self.name, "user_port": self.user_port, "data_port": self.data_port,
+                "config_type": self.config_type, "cfg_file": self.cfg_file, "user_email": self.user_email}
+
+
+def load_devices(path=DEVICES_FILE):
+    with open(path, "r") as f:
+        return [RadarDevice.from_dict(d) for d in json.load(f)]
+
+
+class MultiAcquisition:
+    def __init__(self, devices, user_email=None, duration=DURATION, output_dir=PARTITION_DIR,
+                 session_factory=None, verbose=True, **acquisition_kwargs):
+        """
+        user_email is used for devices that do not name their own. session_factory(device,
+        state_file) returns the RadarSession to use (default: the process-wide get_session).
+        Other keyword arguments go to every Acquisition (archive=, durable=, ...).
+        """
+        names = [d.name for d in devices]
+        if len(set(names)) != len(names):
+            raise ValueError("Device names must be unique: {}".format(names))
+        self.devices = list(devices)
+        self.user_email = user_email
+        self.duration = duration
+        self.output_dir = output_dir
+        self.session_factory = session_factory or self._default_session
+        self.verbose = verbose
+        self.acquisition_kwargs = acquisition_kwargs
+
+        self.acquisitions = {}      # name -> Acquisition (started)
+        self.errors = {}            # name -> error text (open / configure / stop)
+        self.results = {}           # name -> SessionStats
+        self.start_sec = None
+
+    # -----------------------------
+    # Per-device setup
+    # -----------------------------
+    def partition(self, device):
+        path = os.path.join(self.output_dir, device.name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @staticmethod
+    def _default_session(device, state_file):
+        return get_session(device.user_port, device.data_port, user_baud=USER_BAUD,
+                           data_baud=DATA_BAUD, state_file=state_file)
+
+    def _log_for(self, device):
+        if not self.verbose:
+            return None
+        return lambda msg: print("[{}] {}".format(device.name, msg))
+
+    def _start_one(self, device):
+        session = None
+        try:
+            part = self.partition(device)
+            session = self.session_factory(device, os.path.join(part, ".radar_session.json"))
+            session.open()
+            log = self._log_for(device)
+            acq = Acquisition(session, device.user_email or self.user_email, device.config_type,
+                              cfg_file=device.cfg_file,
+                              master_csv=os.path.join(part, "vital_signs_data_new.csv"),
+                              archive_dir=os.path.join(part, "archives"),
+                              capture_dir=os.path.join(part, "captures"),
+                              duration=self.duration, log=log or print, verbose=log is not None,
+                              **self.acquisition_kwargs)
+            acq.start()
+            self.acquisitions[device.name] = acq
+        except Exception as e:
+            self.errors[device.name] = "start: {}".format(e)
+            if session is not None:
+                session.close()     # don't keep the ports of a radar that never started
+
+    # -----------------------------
+    # Lifecycle
+    # -----------------------------
+    def start(self):
+        """Open + configure every radar in parallel and start reading. Returns self."""
+        t0 = time.perf_counter()
+        threads = [threading.Thread(target=self._start_one, args=(d,), name="start-" + d.name, daemon=True)
+                   for d in self.devices]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.start_sec = time.perf_counter() - t0
+        if not self.acquisitions:
+            raise RuntimeError("No radar could be started: {}".format(self.errors))
+        return self
+
+    @property
+    def progress(self):
+        if not self.acquisitions:
+            return 0.0
+        return min(acq.progress for acq in self.acquisitions.values())
+
+    def wait(self, timeout=None):
+        """Block until every device finished (or timeout). True if all finished."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for acq in self.acquisitions.values():
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not acq.wait(remaining):
+                return False
+        return True
+
+    def stop(self):
+        """Stop every device (in parallel: each flushes its own CSV). Returns {name: SessionStats}."""
+        def stop_one(name, acq):
+            try:
+                self.results[name] = acq.stop()
+            except Exception as e:
+                self.errors[name] = "stop: {}".format(e)
+
+        threads = [threading.Thread(target=stop_one, args=item, daemon=True)
+                   for item in self.acquisitions.items()]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return dict(self.results)
+
+    def run(self):
+        self.start()
+        try:
+            self.wait()
+        finally:
+            results = self.stop()
+        return results
+
+    # -----------------------------
+    # Metrics
+    # -----------------------------
+    def throughput(self):
+        """Per-device and total link / frame rates of the finished (or running) devices."""
+        devices = {}
+        for name, acq in self.acquisitions.items():
+            elapsed = acq.elapsed or 1e-9
+            link = acq.reader.stats() if acq.reader is not None else {}
+            timing = acq.clock.stats()
+            devices[name] = {
+                "packets": acq.packet_count,
+                "frames_per_sec": acq.packet_count / elapsed,
+                "bytes_per_sec": link.get("bytes_read", 0) / elapsed,
+                "resyncs": link.get("resyncs", 0),
+                "lost": timing["lost"],
+                "loss_pct": timing["loss_pct"],
+                "saved": acq.processor.data_saved,
+                "stage_drops": sum(st["dropped"] for st in acq.pipeline.stats().values()),
+            }
+        total = {
+            "devices": len(devices),
+            "failed": len(self.errors),
+            "start_sec": self.start_sec,
+        }
+        for key in ("packets", "frames_per_sec", "bytes_per_sec", "resyncs", "lost", "saved", "stage_drops"):
+            total[key] = sum(d[key] for d in devices.values())
+        return {"devices": devices, "total": total}
+
+
+# -----------------------------
+# Benchmark: N virtual radars in one process
+# -----------------------------
+def bench(n, seconds=5.0, fps=20.0):
+    import tempfile
+    from radar_session import RadarSession
+    from virtual_radar import VirtualRadar, PtyPort
+
+    tmp = tempfile.mkdtemp()
+    cfg = os.path.join(tmp, "bench.cfg")
+    with open(cfg, "w") as f:
+        f.write("sensorStop\nframeCfg 0 1 16 0 {:.0f} 1 0\nsensorStart\n".format(1000.0 / fps))
+
+    radars = [VirtualRadar(fps=fps, seed=i).start() for i in range(n)]
+    devices = [RadarDevice("bed{}".format(i + 1), r.user_port, r.data_port, cfg_file=cfg,
+                           user_email="bed{}@bench".format(i + 1)) for i, r in enumerate(radars)]
+
+    def session(device, state_file):
+        return RadarSession(device.user_port, device.data_port, state_file=state_file,
+                            serial_factory=lambda p, b, timeout: PtyPort(p, b, timeout), settle=0)
+
+    cpu0 = os.times()
+    multi = MultiAcquisition(devices, duration=seconds, output_dir=tmp, session_factory=session,
+                             verbose=False, archive=True)
+    multi.run()
+    cpu1 = os.times()
+    for r in radars:
+        r.stop()
+    result = multi.throughput()
+    result["total"]["cpu_sec"] = (cpu1.user + cpu1.system) - (cpu0.user + cpu0.system)
+    result["total"]["sent"] = sum(r.frames_sent for r in radars)
+    result["errors"] = multi.errors
+    return result
+
+
+def _arg(name, default, cast=float):
+    if name in sys.argv:
+        return cast(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        counts = []
+        for a in sys.argv[sys.argv.index("--bench") + 1:]:
+            if a.startswith("--"):
+                break
+            counts.append(int(a))
+        seconds = _arg("--seconds", 5.0)
+        fps = _arg("--fps", 20.0)
+        print("{:>7} {:>8} {:>8} {:>10} {:>12} {:>6} {:>8} {:>9} {:>8}".format(
+            "radars", "sent", "frames", "frames/s", "bytes/s", "lost", "resyncs", "start s", "cpu %"))
+        for n in counts or [1, 2, 4, 8]:
+            r = bench(n, seconds, fps)
+            t = r["total"]
+            print("{:>7} {:>8} {:>8} {:>10.1f} {:>12.0f} {:>6} {:>8} {:>9.2f} {:>7.1f}%".format(
+                n, t["sent"], t["packets"], t["frames_per_sec"], t["bytes_per_sec"], t["lost"],
+                t["resyncs"], t["start_sec"], t["cpu_sec"] / seconds * 100.0))
+            if r["errors"]:
+                print("   errors:", r["errors"])
+        sys.exit(0)
+
+    multi = MultiAcquisition(load_devices(), duration=_arg("--duration", DURATION))
+    multi.run()
+    for name, stats in sorted(multi.results.items()):
+        print("\n[{}] {}".format(name, stats.stats_text.strip()))
+    for name, err in sorted(multi.errors.items()):
+        print("[{}] ERROR {}".format(name, err))
+    print(json.dumps(multi.throughput(), indent=2))
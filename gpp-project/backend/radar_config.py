@@ -0,0 +1,120 @@
+# radar_config.py
+"""
+Acknowledgement-driven config upload for the radar CLI (USER) port.
+
+Instead of fixed sleeps after every line, each command is written and the port is
+polled until the CLI answers: the "mmwDemo:/>" prompt, or a "Done" / "Error" line if
+the prompt never shows up. Each command has its own timeout (sensorStart gets a
+longer one), its latency is recorded, and an error response stops the upload
+immediately (fail fast).
+
+Usage:
+    results = send_config(user_ser, read_cfg_lines(CFG_FILE))
+    print_config_report(results)
+"""
+
+import time
+
+PROMPT = b"mmwDemo:/>"
+COMMAND_TIMEOUT = 1.0        # seconds to wait for an ack
+START_TIMEOUT = 5.0          # sensorStart does calibration before answering
+POLL_INTERVAL = 0.001
+
+
+class ConfigError(RuntimeError):
+    def __init__(self, command, response):
+        super().__init__("Radar rejected '{}': {}".format(command, response.strip()))
+        self.command = command
+        self.response = response
+
+
+def read_cfg_lines(cfg_file):
+    """CLI commands from a TI .cfg file (comments and blank lines removed)."""
+    lines = []
+    with open(cfg_file, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('%'):
+                lines.append(line)
+    return lines
+
+
+def _classify(text):
+    low = text.lower()
+    if "error" in low or "invalid" in low or "not recognized" in low:
+        return "error"
+    if "done" in low or "ignored" in low:
+        return "done"
+    return None
+
+
+def send_command(user_ser, command, timeout=COMMAND_TIMEOUT):
+    """
+    Write one command and wait for its acknowledgement.
+    Returns dict(command, status, latency_ms, response); status is done / error / timeout.
+    """
+    t0 = time.perf_counter()
+    user_ser.write((command + '\n').encode())
+
+    buf = bytearray()
+    status = None
+    deadline = t0 + timeout
+    while time.perf_counter() < deadline:
+        waiting = user_ser.in_waiting
+        if waiting:
+            buf += user_ser.read(waiting)
+            while buf.startswith(PROMPT):
+                del buf[:len(PROMPT)]       # prompt that followed the previous command's Done
+            # answered once a complete Done / Error line or the prompt is in
+            status = _classify(buf[:buf.rfind(b"\n") + 1].decode('utf-8', errors='ignore'))
+            if status or PROMPT in buf:
+                break
+        else:
+            time.sleep(POLL_INTERVAL)
+    latency_ms = (time.perf_counter() - t0) * 1000.0
+
+    text = buf.decode('utf-8', errors='ignore')
+    status = status or _classify(text)
+    if status is None:
+        # prompt with no Done/Error text counts as accepted; silence is a timeout
+        status = "done" if PROMPT in buf else "timeout"
+    return {
+        "command": command,
+        "status": status,
+        "latency_ms": latency_ms,
+        "response": text.replace(PROMPT.decode(), "").strip(),
+    }
+
+
+def stop_sensor(user_ser, timeout=COMMAND_TIMEOUT):
+    """sensorStop before configuring; never fails (the sensor may already be stopped)."""
+    user_ser.reset_input_buffer()
+    return send_command(user_ser, "sensorStop", timeout)
+
+
+def send_config(user_ser, lines, timeout=COMMAND_TIMEOUT, start_timeout=START_TIMEOUT,
+                fail_fast=True, log=None):
+    """
+    Stream CFG lines one by one, waiting only as long as each command needs.
+    Raises ConfigError on the first error response when fail_fast is set.
+    """
+    results = []
+    for line in lines:
+        cmd_timeout = start_timeout if line.startswith('sensorStart') else timeout
+        res = send_command(user_ser, line, cmd_timeout)
+        results.append(res)
+        if log:
+            log("  [{:2d}] {:<40} {:>7} {:7.1f} ms".format(len(results), line[:40], res["status"], res["latency_ms"]))
+        if res["status"] == "error" and fail_fast:
+            raise ConfigError(line, res["response"])
+    return results
+
+
+def print_config_report(results, top=3):
+    if not results:
+        return
+    total = sum(r["latency_ms"] for r in results)
+    timeouts = sum(1 for r in results if r["status"] == "timeout")
+    print("Config upload: {} commands in {:.0f} ms ({} without ack)".format(len(results), total, timeouts))
+    for r in sorted(results, key=lambda r: r["latency_ms"], reverse=True)[:top]:
+        print("  slowest: {:<30} {:7.1f} ms".format(r["command"][:30], r["latency_ms"]))
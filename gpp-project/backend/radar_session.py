@@ -0,0 +1,198 @@
+# radar_session.py
+"""
+Long-lived radar session: owns the USER/DATA ports and remembers which CFG is loaded.
+
+prepare(cfg_file) picks the cheapest way to get frames flowing for that CFG:
+    "warm"     same CFG hash and the sensor is still streaming -> just flush the data port
+    "restart"  same CFG hash but the sensor was stopped        -> "sensorStart 0" (no reconfig)
+    "cold"     different/unknown CFG, or the warm paths got no data -> sensorStop + full CFG upload
+
+The CFG hash and streaming flag are also written to a small state file so a new
+process attached to the same radar can take the warm/restart path too. If the
+radar was power-cycled in between, no data shows up and we fall back to "cold".
+
+Usage:
+    session = get_session(USER_PORT, DATA_PORT, state_file=...)
+    mode = session.prepare(CFG_FILE)
+    ... read session.data_ser ...
+    session.finish(keep_streaming=True)   # leave the sensor running for the next user
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from radar_config import (read_cfg_lines, send_command, send_config, stop_sensor,
+                          print_config_report, START_TIMEOUT)
+
+DATA_CHECK_TIMEOUT = 1.5     # seconds to wait for frames on the warm/restart paths
+
+
+def cfg_hash(lines):
+    return hashlib.sha1("\n".join(lines).encode()).hexdigest()
+
+
+class RadarSession:
+    def __init__(self, user_port, data_port, user_baud=115200, data_baud=921600,
+                 state_file=None, serial_factory=None, settle=1.0):
+        self.user_port = user_port
+        self.data_port = data_port
+        self.user_baud = user_baud
+        self.data_baud = data_baud
+        self.state_file = state_file
+        self.serial_factory = serial_factory
+        self.settle = settle             # seconds to let freshly opened ports settle
+
+        self.user_ser = None
+        self.data_ser = None
+        self.cfg_hash = None
+        self.streaming = False
+        self.last_mode = None
+        self.last_prepare_ms = None
+        self.lock = threading.RLock()    # serialises port/sensor control
+        self.busy = threading.Lock()     # held for a whole measurement (any thread may release)
+        self._load_state()
+
+    # -----------------------------
+    # State file
+    # -----------------------------
+    def _load_state(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file) as f:
+                state = json.load(f)
+        except Exception:
+            return
+        if state.get("user_port") == self.user_port and state.get("data_port") == self.data_port:
+            self.cfg_hash = state.get("cfg_hash")
+            self.streaming = bool(state.get("streaming"))
+
+    def _save_state(self):
+        if not self.state_file:
+            return
+        try:
+            with open(self.state_file, "w") as f:
+                json.dump({
+                    "user_port": self.user_port,
+                    "data_port": self.data_port,
+                    "cfg_hash": self.cfg_hash,
+                    "streaming": self.streaming,
+                    "updated": time.time(),
+                }, f)
+        except Exception as e:
+            print("Warning: could not save radar session state:", e)
+
+    # -----------------------------
+    # Ports
+    # -----------------------------
+    @property
+    def is_open(self):
+        return self.user_ser is not None and self.data_ser is not None
+
+    def open(self):
+        if self.is_open:
+            return
+        factory = self.serial_factory
+        if factory is None:
+            import serial
+            factory = serial.Serial
+        self.user_ser = factory(self.user_port, self.user_baud, timeout=2)
+        try:
+            self.data_ser = factory(self.data_port, self.data_baud, timeout=2)
+        except Exception:
+            self.user_ser.close()
+            self.user_ser = None
+            raise
+        if self.settle:
+            time.sleep(self.settle)
+        self.user_ser.reset_input_buffer()
+
+    def close(self):
+        """Close the ports; the sensor keeps whatever state finish() left it in."""
+        for ser in (self.user_ser, self.data_ser):
+            try:
+                if ser is not None:
+                    ser.close()
+            except Exception:
+                pass
+        self.user_ser = None
+        self.data_ser = None
+
+    # -----------------------------
+    # Sensor control
+    # -----------------------------
+    def _data_flowing(self, timeout=DATA_CHECK_TIMEOUT):
+        self.data_ser.reset_input_buffer()
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.data_ser.in_waiting:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def prepare(self, cfg_file, verbose=True):
+        """Get frames flowing for cfg_file. Returns "warm", "restart" or "cold"."""
+        with self.lock:
+            self.open()
+            t0 = time.perf_counter()
+            lines = read_cfg_lines(cfg_file)
+            wanted = cfg_hash(lines)
+            mode = None
+
+            if wanted == self.cfg_hash:
+                if self.streaming and self._data_flowing():
+                    mode = "warm"
+                else:
+                    res = send_command(self.user_ser, "sensorStart 0", START_TIMEOUT)
+                    if res["status"] == "done" and self._data_flowing():
+                        mode = "restart"
+
+            if mode is None:
+                stop_sensor(self.user_ser)
+                self.streaming = False
+                self.cfg_hash = None
+                results = send_config(self.user_ser, lines)
+                if verbose:
+                    print_config_report(results)
+                self.cfg_hash = wanted
+                mode = "cold"
+
+            self.data_ser.reset_input_buffer()
+            self.streaming = True
+            self.last_mode = mode
+            self.last_prepare_ms = (time.perf_counter() - t0) * 1000.0
+            self._save_state()
+            return mode
+
+    def finish(self, keep_streaming=False):
+        """End a measurement; optionally leave the sensor running for the next one."""
+        with self.lock:
+            if not keep_streaming and self.user_ser is not None:
+                try:
+                    stop_sensor(self.user_ser)
+                except Exception:
+                    pass
+                self.streaming = False
+            self._save_state()
+
+    def shutdown(self):
+        self.finish(keep_streaming=False)
+        self.close()
+
+
+# -----------------------------
+# Process-wide registry: one session per port pair
+# -----------------------------
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(user_port, data_port, **kwargs):
+    with _sessions_lock:
+        key = (user_port, data_port)
+        if key not in _sessions:
+            _sessions[key] = RadarSession(user_port, data_port, **kwargs)
+        return _sessions[key]
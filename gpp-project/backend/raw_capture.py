@@ -0,0 +1,200 @@
+# raw_capture.py
+"""
+Append-only binary capture of raw radar frames + memory-mapped replay.
+
+Capture file (.vscap):
+    file header : b"VSCAP001"
+    records     : <d wall_time> <I frame_num> <I length> <frame bytes (header + TLVs)>
+
+Index file (.vscap.idx), one entry per record:
+    <Q file offset of the record> <d wall_time> <I frame_num>
+
+Replay memory-maps the capture and yields frames as memoryviews (no copies), either
+as fast as possible or paced at `speed` x real-time.
+
+Usage:
+    python raw_capture.py <file.vscap> [--speed 50]
+    -> decodes every frame with tlv_decoder and prints frames/sec + HR/RR summary
+"""
+
+import bisect
+import mmap
+import os
+import struct
+import sys
+import time
+
+FILE_MAGIC = b"VSCAP001"
+RECORD_HEADER = struct.Struct('<dII')
+INDEX_ENTRY = struct.Struct('<QdI')
+
+
+def index_path(path):
+    return path + ".idx"
+
+
+class CaptureWriter:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._f = open(path, "ab")
+        self._idx = open(index_path(path), "ab")
+        if new_file:
+            self._f.write(FILE_MAGIC)
+        self._offset = self._f.tell()
+        self.frames = 0
+        self.bytes_written = 0
+
+    def write(self, frame, frame_num, wall_time=None):
+        if wall_time is None:
+            wall_time = time.time()
+        self._idx.write(INDEX_ENTRY.pack(self._offset, wall_time, frame_num))
+        self._f.write(RECORD_HEADER.pack(wall_time, frame_num, len(frame)))
+        self._f.write(frame)
+        size = RECORD_HEADER.size + len(frame)
+        self._offset += size
+        self.frames += 1
+        self.bytes_written += size
+
+    def flush(self):
+        self._f.flush()
+        self._idx.flush()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._f.close()
+            self._idx.close()
+
+
+class CaptureReader:
+    """Memory-mapped view of a capture file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._f = open(path, "rb")
+        size = os.fstat(self._f.fileno()).st_size
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        if size and self._mm[:len(FILE_MAGIC)] != FILE_MAGIC:
+            raise ValueError("Not a vital-signs capture file: {}".format(path))
+        self._view = memoryview(self._mm)
+        self._load_index()
+
+    def _load_index(self):
+        self.offsets, self.times, self.frame_nums = [], [], []
+        idx = index_path(self.path)
+        if os.path.exists(idx):
+            with open(idx, "rb") as f:
+                data = f.read()
+            usable = len(data) - len(data) % INDEX_ENTRY.size
+            for offset, wall_time, frame_num in INDEX_ENTRY.iter_unpack(data[:usable]):
+                self.offsets.append(offset)
+                self.times.append(wall_time)
+                self.frame_nums.append(frame_num)
+            # drop index entries whose record never made it fully to disk
+            while self.offsets and not self._complete(self.offsets[-1]):
+                self.offsets.pop(); self.times.pop(); self.frame_nums.pop()
+        else:
+            # no index -> rebuild it by walking the record headers
+            for offset, wall_time, frame_num, _ in self._scan():
+                self.offsets.append(offset)
+                self.times.append(wall_time)
+                self.frame_nums.append(frame_num)
+
+    def _complete(self, pos):
+        end = len(self._view)
+        if pos + RECORD_HEADER.size > end:
+            return False
+        length = RECORD_HEADER.unpack_from(self._view, pos)[2]
+        return pos + RECORD_HEADER.size + length <= end
+
+    def _scan(self):
+        pos = len(FILE_MAGIC)
+        end = len(self._view)
+        while pos + RECORD_HEADER.size <= end:
+            wall_time, frame_num, length = RECORD_HEADER.unpack_from(self._view, pos)
+            if pos + RECORD_HEADER.size + length > end:
+                break  # truncated tail (capture was cut off mid-write)
+            yield pos, wall_time, frame_num, length
+            pos += RECORD_HEADER.size + length
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def frame(self, i):
+        """Returns (wall_time, frame_num, memoryview of the frame)."""
+        pos = self.offsets[i]
+        wall_time, frame_num, length = RECORD_HEADER.unpack_from(self._view, pos)
+        start = pos + RECORD_HEADER.size
+        return wall_time, frame_num, self._view[start:start + length]
+
+    def index_at_time(self, wall_time):
+        return bisect.bisect_left(self.times, wall_time)
+
+    def replay(self, speed=None, start=0, stop=None):
+        """
+        Yield (wall_time, frame_num, frame) in capture order.
+        speed=None replays as fast as possible; speed=50 paces at 50x real-time.
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        t0_capture = None
+        t0_replay = time.perf_counter()
+        for i in range(start, stop):
+            wall_time, frame_num, frame = self.frame(i)
+            if speed:
+                if t0_capture is None:
+                    t0_capture = wall_time
+                delay = (wall_time - t0_capture) / speed - (time.perf_counter() - t0_replay)
+                if delay > 0:
+                    time.sleep(delay)
+            yield wall_time, frame_num, frame
+
+    def close(self):
+        try:
+            self._view.release()
+            if isinstance(self._mm, mmap.mmap):
+                self._mm.close()
+        except BufferError:
+            pass  # a caller still holds a frame view; the map goes away with it
+        self._f.close()
+
+
+# -----------------------------
+# CLI: replay a capture through the shared parser
+# -----------------------------
+if __name__ == "__main__":
+    from tlv_decoder import decode_frame, extract_range_candidates
+
+    if len(sys.argv) < 2:
+        print("Usage: python raw_capture.py <file.vscap> [--speed N]")
+        sys.exit(1)
+
+    speed = None
+    if "--speed" in sys.argv:
+        speed = float(sys.argv[sys.argv.index("--speed") + 1])
+
+    cap = CaptureReader(sys.argv[1])
+    t0 = time.perf_counter()
+    n = vitals_frames = 0
+    hr_sum = rr_sum = 0.0
+    for wall_time, frame_num, frame in cap.replay(speed=speed):
+        header, vitals = decode_frame(frame)
+        n += 1
+        if vitals is not None:
+            extract_range_candidates(vitals)
+            vitals_frames += 1
+            hr_sum += vitals.heart_rate_fft
+            rr_sum += vitals.breath_rate_fft
+    elapsed = time.perf_counter() - t0
+
+    print("Frames replayed     : {} ({} with vital signs)".format(n, vitals_frames))
+    if n and len(cap) > 1:
+        span = cap.times[-1] - cap.times[0]
+        print("Captured span (sec) : {:.1f}".format(span))
+        print("Replay time (sec)   : {:.2f} ({:.0f}x real-time)".format(elapsed, span / max(elapsed, 1e-9)))
+    print("Frames/sec          : {:.0f}".format(n / max(elapsed, 1e-9)))
+    if vitals_frames:
+        print("Mean HR_FFT / RR_FFT: {:.1f} / {:.1f}".format(hr_sum / vitals_frames, rr_sum / vitals_frames))
+    cap.close()
@@ -0,0 +1,473 @@
+# streaming_stats.py
+"""
+Streaming estimators for the per-frame smoothing in the acquisition scripts.
+
+Replaces the list.append / pop(0) + statistics.* pattern that recomputed every
+statistic from scratch on each frame:
+
+    RollingMedian(window)    sorted list kept with bisect: O(log n) search plus an O(n)
+                             list insert / delete per add (a memmove, cheap for the
+                             9-sample windows here), no re-sort
+    RollingMean(window)      running sum over the window; O(1)
+    Welford(window=None)     mean / variance / stdev; O(1) add and (windowed) remove
+    RollingMinMax(window)    monotonic deques; O(1) amortised min() and max()
+
+and, for whole-session summaries in constant memory:
+
+    QuantileSketch()         log-bucket histogram; percentiles within 1% relative error
+    RunningSummary()         count, mean, std, min, max + a QuantileSketch
+    SessionAggregator()      one RunningSummary per field (hr, rr, range)
+
+All of the windowed ones take window=None for "everything since reset". median(), mean(),
+variance() ... follow the statistics module: median of an even count is the mean of
+the two middle values, variance() is the sample variance, pvariance() the
+population one, and too few values raise statistics.StatisticsError.
+
+How close they are to the list + statistics code they replaced (checked, with these
+tolerances, by running this file directly, which also times both per frame):
+    median, min / max        identical
+    mean                     within MEAN_ATOL (identical at the 3 dp the CSV keeps)
+    variance / stdev         within VARIANCE_RTOL relative: the windowed Welford update
+                             rounds differently, ~1e-10 on range data, so not bit-identical
+    percentiles              within the sketch's relative accuracy (1%)
+"""
+
+import bisect
+import math
+import statistics
+from collections import deque
+
+# tolerances of the self-check below (see the module docstring)
+MEAN_ATOL = 1e-12
+VARIANCE_RTOL = 1e-8
+
+
+class RollingMedian:
+    """Median of the last `window` values; exact (same result as statistics.median)."""
+
+    def __init__(self, window=None):
+        self.window = window
+        self._values = deque()
+        self._sorted = []
+
+    def __len__(self):
+        return len(self._values)
+
+    def add(self, value):
+        self._values.append(value)
+        bisect.insort(self._sorted, value)
+        if self.window is not None and len(self._values) > self.window:
+            old = self._values.popleft()
+            del self._sorted[bisect.bisect_left(self._sorted, old)]
+
+    def median(self):
+        n = len(self._sorted)
+        if n == 0:
+            raise statistics.StatisticsError("no median for empty data")
+        mid = n // 2
+        if n % 2:
+            return self._sorted[mid]
+        return (self._sorted[mid - 1] + self._sorted[mid]) / 2
+
+    def reset(self):
+        self._values.clear()
+        self._sorted = []
+
+
+class RollingMean:
+    """Mean of the last `window` values (compensated running sum, so it does not drift)."""
+
+    def __init__(self, window=None):
+        self.window = window
+        self._values = deque()
+        self._sum = 0.0
+        self._comp = 0.0
+
+    def __len__(self):
+        return len(self._values)
+
+    def _accumulate(self, x):
+        # Neumaier summation
+        t = self._sum + x
+        if abs(self._sum) >= abs(x):
+            self._comp += (self._sum - t) + x
+        else:
+            self._comp += (x - t) + self._sum
+        self._sum = t
+
+    def add(self, value):
+        self._values.append(value)
+        self._accumulate(value)
+        if self.window is not None and len(self._values) > self.window:
+            self._accumulate(-self._values.popleft())
+
+    def mean(self):
+        if not self._values:
+            raise statistics.StatisticsError("mean requires at least one data point")
+        return (self._sum + self._comp) / len(self._values)
+
+    def values(self):
+        return list(self._values)
+
+    def reset(self):
+        self._values.clear()
+        self._sum = self._comp = 0.0
+
+
+class Welford:
+    """Welford mean / variance; with a window, the oldest value is removed as each new one arrives."""
+
+    def __init__(self, window=None):
+        self.window = window
+        self._values = deque() if window is not None else None
+        self.n = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def __len__(self):
+        return self.n
+
+    def add(self, value):
+        self.n += 1
+        delta = value - self._mean
+        self._mean += delta / self.n
+        self._m2 += delta * (value - self._mean)
+        if self._values is not None:
+            self._values.append(value)
+            if len(self._values) > self.window:
+                self._remove(self._values.popleft())
+
+    def _remove(self, value):
+        if self.n <= 1:
+            self.n, self._mean, self._m2 = 0, 0.0, 0.0
+            return
+        self.n -= 1
+        delta = value - self._mean
+        self._mean -= delta / self.n
+        self._m2 -= delta * (value - self._mean)
+        if self._m2 < 0.0:
+            self._m2 = 0.0          # rounding when the window is (nearly) constant
+
+    def mean(self):
+        if self.n == 0:
+            raise statistics.StatisticsError("mean requires at least one data point")
+        return self._mean
+
+    def variance(self):
+        if self.n < 2:
+            raise statistics.StatisticsError("variance requires at least two data points")
+        return self._m2 / (self.n - 1)
+
+    def pvariance(self):
+        if self.n < 1:
+            raise statistics.StatisticsError("pvariance requires at least one data point")
+        return self._m2 / self.n
+
+    def stdev(self):
+        return math.sqrt(self.variance())
+
+    def pstdev(self):
+        return math.sqrt(self.pvariance())
+
+    def reset(self):
+        if self._values is not None:
+            self._values.clear()
+        self.n, self._mean, self._m2 = 0, 0.0, 0.0
+
+
+class RollingMinMax:
+    def __init__(self, window=None):
+        self.window = window
+        self._count = 0
+        self._min = deque()     # (index, value), values increasing
+        self._max = deque()     # (index, value), values decreasing
+
+    def __len__(self):
+        return min(self._count, self.window) if self.window is not None else self._count
+
+    def add(self, value):
+        i = self._count
+        self._count += 1
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((i, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((i, value))
+        if self.window is not None:
+            oldest = self._count - self.window
+            if self._min[0][0] < oldest:
+                self._min.popleft()
+            if self._max[0][0] < oldest:
+                self._max.popleft()
+
+    def min(self):
+        if not self._min:
+            raise ValueError("min() of empty window")
+        return self._min[0][1]
+
+    def max(self):
+        if not self._max:
+            raise ValueError("max() of empty window")
+        return self._max[0][1]
+
+    def reset(self):
+        self._count = 0
+        self._min.clear()
+        self._max.clear()
+
+
+class QuantileSketch:
+    """
+    Percentiles in bounded memory: values go into logarithmic buckets
+    (gamma = (1 + a) / (1 - a)), so any quantile is within `relative_accuracy` of a
+    value actually seen. Bucket count grows with log(max / min), not with the
+    number of values (a few hundred for a whole HR / RR / range session).
+    """
+
+    def __init__(self, relative_accuracy=0.01, min_value=1e-6):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.count = 0
+        self._pos = {}          # bucket -> count, values >= min_value
+        self._neg = {}          # bucket -> count, values <= -min_value
+        self._zero = 0
+
+    def _key(self, value):
+        return int(math.ceil(math.log(value) / self._log_gamma))
+
+    def _value(self, key):
+        # midpoint of the bucket (gamma^(k-1), gamma^k], relative error <= relative_accuracy
+        return 2.0 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value):
+        self.count += 1
+        if value >= self.min_value:
+            k = self._key(value)
+            self._pos[k] = self._pos.get(k, 0) + 1
+        elif value <= -self.min_value:
+            k = self._key(-value)
+            self._neg[k] = self._neg.get(k, 0) + 1
+        else:
+            self._zero += 1
+
+    def quantile(self, q):
+        if self.count == 0:
+            raise statistics.StatisticsError("quantile of an empty sketch")
+        rank = q * (self.count - 1)
+        seen = 0
+        for k in sorted(self._neg, reverse=True):
+            seen += self._neg[k]
+            if seen > rank:
+                return -self._value(k)
+        seen += self._zero
+        if seen > rank:
+            return 0.0
+        for k in sorted(self._pos):
+            seen += self._pos[k]
+            if seen > rank:
+                return self._value(k)
+        return self._value(max(self._pos))
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def buckets(self):
+        return len(self._pos) + len(self._neg) + (1 if self._zero else 0)
+
+
+class RunningSummary:
+    """count / mean / std / min / max and percentiles of everything added, in O(1) memory."""
+
+    PERCENTILES = (5, 25, 50, 75, 95)
+
+    def __init__(self, relative_accuracy=0.01):
+        self.moments = Welford()
+        self.sketch = QuantileSketch(relative_accuracy)
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.moments.add(value)
+        self.sketch.add(value)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def __len__(self):
+        return len(self.moments)
+
+    def summary(self):
+        n = len(self.moments)
+        out = {"count": n, "mean": None, "std": None, "min": self.min, "max": self.max}
+        if n:
+            out["mean"] = self.moments.mean()
+            for p in self.PERCENTILES:
+                # bucket midpoints can land just outside the data; the exact extremes bound them
+                out["p{}".format(p)] = min(max(self.sketch.quantile(p / 100.0), self.min), self.max)
+        if n > 1:
+            out["std"] = self.moments.stdev()
+        return out
+
+
+class SessionAggregator:
+    """One RunningSummary per field, updated with every accepted frame."""
+
+    FIELDS = ("hr", "rr", "range")
+
+    def __init__(self, fields=FIELDS, relative_accuracy=0.01):
+        self.fields = tuple(fields)
+        self._summaries = [RunningSummary(relative_accuracy) for _ in self.fields]
+
+    def add(self, *values):
+        for summary, value in zip(self._summaries, values):
+            summary.add(value)
+
+    def __len__(self):
+        return len(self._summaries[0]) if self._summaries else 0
+
+    def __getitem__(self, field):
+        return self._summaries[self.fields.index(field)]
+
+    def summary(self):
+        return {field: s.summary() for field, s in zip(self.fields, self._summaries)}
+
+
+# -----------------------------
+# Equivalence check + timing: python streaming_stats.py [frames]
+# -----------------------------
+if __name__ == "__main__":
+    import random
+    import sys
+    import time
+
+    N = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = random.Random(6)
+    # range-like data: plateaus, jitter, repeated values and jumps
+    data = []
+    level = 0.8
+    for i in range(N):
+        if rng.random() < 0.01:
+            level = rng.uniform(0.3, 2.2)
+        data.append(round(level + rng.gauss(0, 0.02), rng.choice((2, 3, 6))))
+
+    failures = []
+
+    # windowed median (vitalsigns / acquisition: last 9, median once >= 5)
+    hist, med = [], RollingMedian(9)
+    for i, v in enumerate(data):
+        hist.append(v)
+        if len(hist) > 9:
+            hist.pop(0)
+        med.add(v)
+        if len(hist) >= 5 and statistics.median(hist) != med.median():
+            failures.append(("median", i))
+
+    # windowed mean (vital_signs_tracker: last 15)
+    hist, mean = [], RollingMean(15)
+    worst_mean = 0.0
+    for i, v in enumerate(data):
+        hist.append(v)
+        if len(hist) > 15:
+            hist.pop(0)
+        mean.add(v)
+        old = sum(hist) / len(hist)
+        worst_mean = max(worst_mean, abs(old - mean.mean()))
+        if abs(old - mean.mean()) > MEAN_ATOL or "{:.3f}".format(old) != "{:.3f}".format(mean.mean()):
+            failures.append(("mean", i))
+
+    # windowed variance (range method scores: last 30) and pstdev (live SQI: last 20)
+    for window, old_fn, new_fn in ((30, statistics.variance, Welford.variance),
+                                   (20, statistics.pstdev, Welford.pstdev)):
+        hist, w = [], Welford(window)
+        worst = 0.0
+        for i, v in enumerate(data):
+            hist.append(v)
+            if len(hist) > window:
+                hist.pop(0)
+            w.add(v)
+            if len(hist) > 1:
+                old, new = old_fn(hist), new_fn(w)
+                worst = max(worst, abs(old - new) / max(abs(old), 1e-12))
+        if worst > VARIANCE_RTOL:
+            failures.append((old_fn.__name__, worst))
+        print("{:<18}: max relative error {:.2e} (tolerance {:.0e})".format(
+            old_fn.__name__ + "/{}".format(window), worst, VARIANCE_RTOL))
+
+    # windowed min/max (live plot y-limits: last 20)
+    hist, mm = [], RollingMinMax(20)
+    for i, v in enumerate(data):
+        hist.append(v)
+        if len(hist) > 20:
+            hist.pop(0)
+        mm.add(v)
+        if (min(hist), max(hist)) != (mm.min(), mm.max()):
+            failures.append(("minmax", i))
+
+    # method selection: same winner as statistics.variance over the last 30 per method
+    methods = ["offset_{}".format(o) for o in range(64, 128, 4)]
+    lists, wels = {}, {}
+    for i, v in enumerate(data):
+        key = methods[i % len(methods)] if rng.random() < 0.5 else methods[0]
+        lists.setdefault(key, []).append(v + (i % 7) * 0.001)
+        if len(lists[key]) > 30:
+            lists[key].pop(0)
+        wels.setdefault(key, Welford(30)).add(v + (i % 7) * 0.001)
+        if i % 25 == 0:
+            old = {k: statistics.variance(x) for k, x in lists.items() if len(x) > 15}
+            new = {k: w.variance() for k, w in wels.items() if len(w) > 15}
+            if old and min(old, key=old.get) != min(new, key=new.get):
+                failures.append(("selection", i))
+
+    print("median (exact)    : {}".format(not any(f[0] == "median" for f in failures)))
+    print("mean/15           : max abs error {:.2e} (tolerance {:.0e}), same at 3 dp: {}".format(
+        worst_mean, MEAN_ATOL, not any(f[0] == "mean" for f in failures)))
+    print("min/max (exact)   : {}".format(not any(f[0] == "minmax" for f in failures)))
+    print("method selection  : {}".format(not any(f[0] == "selection" for f in failures)))
+
+    # per-frame cost of the old and new range smoothing + score upkeep
+    t0 = time.perf_counter()
+    hist, scores = [], []
+    for v in data:
+        hist.append(v)
+        if len(hist) > 9:
+            hist.pop(0)
+        statistics.median(hist)
+        scores.append(v)
+        if len(scores) > 30:
+            scores.pop(0)
+        if len(scores) > 1:
+            statistics.variance(scores)
+    old_t = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    med, w = RollingMedian(9), Welford(30)
+    for v in data:
+        med.add(v)
+        med.median()
+        w.add(v)
+        if len(w) > 1:
+            w.variance()
+    new_t = time.perf_counter() - t0
+    print("per frame         : {:.2f} us (lists + statistics) -> {:.2f} us (streaming)".format(
+        old_t / N * 1e6, new_t / N * 1e6))
+    # session aggregator: whole-session moments exact, percentiles within the sketch accuracy
+    agg = SessionAggregator()
+    for i, v in enumerate(data):
+        agg.add(70.0 + 20.0 * v, 12.0 + v, v)
+    got = agg.summary()["range"]
+    srt = sorted(data)
+    worst_q = max(abs(got["p{}".format(p)] - srt[int(p / 100.0 * (N - 1))]) / srt[int(p / 100.0 * (N - 1))]
+                  for p in RunningSummary.PERCENTILES)
+    if (abs(got["mean"] - statistics.fmean(data)) > 1e-9 or abs(got["std"] - statistics.stdev(data)) > 1e-9
+            or (got["min"], got["max"]) != (srt[0], srt[-1]) or worst_q > 0.01):
+        failures.append(("aggregator", worst_q))
+    print("aggregator        : {} values, {} sketch buckets, percentile error {:.2%}".format(
+        N, agg["range"].sketch.buckets, worst_q))
+
+    if failures:
+        print("FAILED:", failures[:10])
+        sys.exit(1)
@@ -0,0 +1,343 @@
+# tlv_decoder.py
+"""
+Precompiled decoder for mmWave vital-signs frames.
+
+A frame from FrameReader is: magic(8) + 8 x uint32 header + TLVs.
+The header is decoded with ONE precompiled struct, and the first 128 bytes of the
+vital-signs TLV (type 6) are decoded with ONE more, straight out of the frame
+buffer (unpack_from with an offset, no payload/TLV slicing).
+
+Type-6 layout as used by the acquisition scripts (byte offsets inside the TLV):
+    4   uint32  range bin index
+    28  float   breath waveform
+    32  float   heart waveform
+    36  float   heart rate (FFT)
+    52  float   breath rate (FFT)
+    64..124     floats scanned for a range estimate
+
+Range candidates are fixed "slots" (see RangeCandidates): the 16 float words at
+offsets 64..124, range_idx times each of RANGE_BIN_SIZES, then the legacy
+"specific" offsets. Per frame, RangeCandidates.first() / value() work on slot
+numbers, so no candidate tuples are built; RangeCandidates.batch() evaluates every
+slot of many frames at once with NumPy, straight from the TLV bytes.
+
+Run this file directly for a frames/sec micro-benchmark (old vs new parsing).
+"""
+
+import struct
+
+HEADER_LEN = 40
+VITALS_TLV_TYPE = 6
+VITALS_MIN_LEN = 128
+
+# magic, version, total_len, platform, frame_num, time_cpu, num_objs, num_tlvs, subframe
+FRAME_HEADER = struct.Struct('<Q8I')
+TLV_HEADER = struct.Struct('<II')
+# first 128 bytes of TLV type 6: two uint32 words then 30 float32 words (offset = index * 4)
+VITALS_STRUCT = struct.Struct('<2I30f')
+
+RANGE_SCAN_OFFSETS = tuple(range(64, 128, 4))
+RANGE_SPECIFIC_OFFSETS = (64, 68, 72, 76, 80, 84, 88, 92, 96, 100, 104, 108)
+RANGE_BIN_SIZES = (0.044, 0.04, 0.048, 0.05)
+RANGE_WINDOW = (0.2, 2.5)         # plausible range in metres (exclusive)
+RANGE_IDX_LIMITS = (1, 100)       # plausible range bin index (exclusive)
+
+# candidate slots, in the order extract_range_multi_method produced them
+CANDIDATE_SLOTS = (tuple(('float_scan', o) for o in RANGE_SCAN_OFFSETS)
+                   + tuple(('range_idx', b) for b in RANGE_BIN_SIZES)
+                   + tuple(('specific', o) for o in RANGE_SPECIFIC_OFFSETS))
+
+
+class FrameHeader:
+    __slots__ = ("version", "total_len", "platform", "frame_num",
+                 "time_cpu", "num_objs", "num_tlvs", "subframe")
+
+    def __init__(self, version, total_len, platform, frame_num,
+                 time_cpu, num_objs, num_tlvs, subframe):
+        self.version = version
+        self.total_len = total_len
+        self.platform = platform
+        self.frame_num = frame_num
+        self.time_cpu = time_cpu
+        self.num_objs = num_objs
+        self.num_tlvs = num_tlvs
+        self.subframe = subframe
+
+
+class VitalsRecord:
+    """Decoded TLV type 6. `words` holds all 32 words; float_at(offset) reads any float offset >= 8."""
+    __slots__ = ("words", "range_idx", "breath_waveform", "heart_waveform",
+                 "heart_rate_fft", "breath_rate_fft")
+
+    def __init__(self, words):
+        self.words = words
+        self.range_idx = words[1]
+        self.breath_waveform = words[7]
+        self.heart_waveform = words[8]
+        self.heart_rate_fft = words[9]
+        self.breath_rate_fft = words[13]
+
+    def float_at(self, offset):
+        return self.words[offset >> 2]
+
+
+def decode_header(frame):
+    """Decode the 40-byte frame header in one unpack."""
+    return FrameHeader(*FRAME_HEADER.unpack_from(frame, 0)[1:])
+
+
+def decode_frame(frame):
+    """
+    Returns (FrameHeader, VitalsRecord or None).
+    TLVs other than type 6 are skipped by length without being copied.
+    """
+    header = decode_header(frame)
+    vitals = None
+
+    end = len(frame)
+    offset = HEADER_LEN
+    while offset + 8 <= end:
+        tlv_type, tlv_length = TLV_HEADER.unpack_from(frame, offset)
+        offset += 8
+        if offset + tlv_length > end:
+            break
+        if tlv_type == VITALS_TLV_TYPE and tlv_length >= VITALS_MIN_LEN and vitals is None:
+            vitals = VitalsRecord(VITALS_STRUCT.unpack_from(frame, offset))
+        offset += tlv_length
+
+    return header, vitals
+
+
+class RangeCandidates:
+    """
+    Range candidates of a type-6 TLV as slot numbers (indexes into CANDIDATE_SLOTS).
+
+    window is the (low, high) plausibility window in metres, exclusive at both ends.
+    A slot is plausible when its value is inside the window (range_idx slots also
+    need RANGE_IDX_LIMITS[0] < range_idx < RANGE_IDX_LIMITS[1]).
+    """
+
+    def __init__(self, window=RANGE_WINDOW):
+        self.low, self.high = window
+        self.slots = CANDIDATE_SLOTS
+        # word index of each float slot, -1 for range_idx slots
+        self._word = tuple(p >> 2 if m != 'range_idx' else -1 for m, p in CANDIDATE_SLOTS)
+        self._bin = tuple(p if m == 'range_idx' else 0.0 for m, p in CANDIDATE_SLOTS)
+        self._scan_words = tuple(o >> 2 for o in RANGE_SCAN_OFFSETS)
+        self._first_bin_slot = len(RANGE_SCAN_OFFSETS)
+
+    def key(self, slot):
+        """'float_scan_80' style name of a slot (the keys the scripts log)."""
+        method, param = self.slots[slot]
+        return "{}_{}".format(method, param)
+
+    def value(self, vitals, slot):
+        """Value of one slot, or None if it is outside the window."""
+        word = self._word[slot]
+        if word >= 0:
+            val = vitals.words[word]
+        else:
+            range_idx = vitals.range_idx
+            if not RANGE_IDX_LIMITS[0] < range_idx < RANGE_IDX_LIMITS[1]:
+                return None
+            val = range_idx * self._bin[slot]
+        return val if self.low < val < self.high else None
+
+    def first(self, vitals):
+        """First plausible slot, or -1. (The "specific" slots repeat scan offsets, so
+        they can never come first.)"""
+        words = vitals.words
+        low, high = self.low, self.high
+        for i, word in enumerate(self._scan_words):
+            if low < words[word] < high:
+                return i
+        range_idx = vitals.range_idx
+        if RANGE_IDX_LIMITS[0] < range_idx < RANGE_IDX_LIMITS[1]:
+            for j, bin_size in enumerate(RANGE_BIN_SIZES):
+                if low < range_idx * bin_size < high:
+                    return self._first_bin_slot + j
+        return -1
+
+    def plausible(self, vitals):
+        """Every plausible slot, in order."""
+        return [slot for slot in range(len(self.slots)) if self.value(vitals, slot) is not None]
+
+    def batch(self, words):
+        """
+        Every slot of N frames in one pass. `words` is an (N, 32) uint32 array of type-6
+        words (or anything np.asarray turns into one), e.g. a strided view over the TLV bytes:
+            np.ndarray((n, 32), '<u4', buffer=frames, offset=tlv_offset, strides=(frame_len, 4))
+        Returns (values float64 (N, n_slots), plausible bool (N, n_slots)).
+        """
+        import numpy as np
+
+        words = np.asarray(words, dtype='<u4').reshape(-1, 32)
+        floats = words.view('<f4').astype(np.float64)
+        float_words = [w for w in self._word if w >= 0]
+        range_idx = words[:, 1].astype(np.float64)
+
+        values = np.empty((len(words), len(self.slots)), dtype=np.float64)
+        float_cols = np.array([i for i, w in enumerate(self._word) if w >= 0])
+        bin_cols = np.array([i for i, w in enumerate(self._word) if w < 0])
+        values[:, float_cols] = floats[:, float_words]
+        values[:, bin_cols] = range_idx[:, None] * np.array([self._bin[i] for i in bin_cols])
+
+        plausible = (values > self.low) & (values < self.high)
+        idx_ok = (range_idx > RANGE_IDX_LIMITS[0]) & (range_idx < RANGE_IDX_LIMITS[1])
+        plausible[:, bin_cols] &= idx_ok[:, None]
+        return values, plausible
+
+
+_DEFAULT_CANDIDATES = RangeCandidates()
+
+
+def extract_range_candidates(vitals, candidates=None):
+    """
+    Same candidates (and order) as the old extract_range_multi_method:
+    ('float_scan', offset, val), ('range_idx', bin_size, val), ('specific', offset, val)
+    Pass a RangeCandidates to use another plausibility window.
+    """
+    rc = candidates or _DEFAULT_CANDIDATES
+    low, high = rc.low, rc.high
+    words = vitals.words
+    out = []
+    for offset in RANGE_SCAN_OFFSETS:
+        val = words[offset >> 2]
+        if low < val < high:
+            out.append(('float_scan', offset, val))
+
+    range_idx = vitals.range_idx
+    if RANGE_IDX_LIMITS[0] < range_idx < RANGE_IDX_LIMITS[1]:
+        for bin_size in RANGE_BIN_SIZES:
+            range_val = range_idx * bin_size
+            if low < range_val < high:
+                out.append(('range_idx', bin_size, range_val))
+
+    for offset in RANGE_SPECIFIC_OFFSETS:
+        val = words[offset >> 2]
+        if low < val < high:
+            out.append(('specific', offset, val))
+    return out
+
+
+# -----------------------------
+# Micro-benchmark: python tlv_decoder.py
+# -----------------------------
+def _legacy_parse(frame):
+    """The per-frame parsing the acquisition scripts did before this module."""
+    header = frame[8:40]
+    struct.unpack('<I', header[4:8])[0]
+    struct.unpack('<I', header[12:16])[0]
+    payload = frame[40:]
+    out = None
+    offset = 0
+    while offset + 8 <= len(payload):
+        tlv_type, tlv_length = struct.unpack_from('<II', payload, offset)
+        offset += 8
+        if offset + tlv_length > len(payload):
+            break
+        if tlv_type == 6 and tlv_length >= 128:
+            tlv_data = payload[offset:offset + tlv_length]
+            bw = struct.unpack_from('<f', tlv_data, 28)[0]
+            hw = struct.unpack_from('<f', tlv_data, 32)[0]
+            hr = struct.unpack_from('<f', tlv_data, 36)[0]
+            br = struct.unpack_from('<f', tlv_data, 52)[0]
+            candidates = []
+            for o in range(64, min(128, len(tlv_data)), 4):
+                val = struct.unpack_from('<f', tlv_data, o)[0]
+                if 0.2 < val < 2.5:
+                    candidates.append(('float_scan', o, val))
+            range_idx = struct.unpack_from('<I', tlv_data, 4)[0]
+            if 1 < range_idx < 100:
+                for bin_size in RANGE_BIN_SIZES:
+                    range_val = range_idx * bin_size
+                    if 0.2 < range_val < 2.5:
+                        candidates.append(('range_idx', bin_size, range_val))
+            for o in RANGE_SPECIFIC_OFFSETS:
+                val = struct.unpack_from('<f', tlv_data, o)[0]
+                if 0.2 < val < 2.5:
+                    candidates.append(('specific', o, val))
+            out = (bw, hw, hr, br, candidates)
+        offset += tlv_length
+    return out
+
+
+def _new_parse(frame):
+    header, v = decode_frame(frame)
+    return (v.breath_waveform, v.heart_waveform, v.heart_rate_fft,
+            v.breath_rate_fft, extract_range_candidates(v))
+
+
+def make_test_frame(frame_num=1, heart_rate=72.0, breath_rate=14.0, range_m=0.8, time_cpu=0,
+                    points=None, range_bins=0):
+    """
+    Synthetic frame with a 136-byte type-6 TLV, optionally preceded by a point cloud
+    (type 1, (x, y, z, doppler) tuples) and a range profile of `range_bins` bins (type 2).
+    """
+    tlv = bytearray(VITALS_STRUCT.pack(0, 18, *([0.0] * 30)) + bytes(8))
+    struct.pack_into('<f', tlv, 28, 0.5)
+    struct.pack_into('<f', tlv, 32, 0.25)
+    struct.pack_into('<f', tlv, 36, heart_rate)
+    struct.pack_into('<f', tlv, 52, breath_rate)
+    struct.pack_into('<f', tlv, 80, range_m)
+    payload = b""
+    num_tlvs = 1
+    if points:
+        cloud = b"".join(struct.pack('<4f', *p) for p in points)
+        payload += TLV_HEADER.pack(1, len(cloud)) + cloud
+        num_tlvs += 1
+    if range_bins:
+        profile = struct.pack('<{}H'.format(range_bins), *((i * 37) & 0xFFFF for i in range(range_bins)))
+        payload += TLV_HEADER.pack(2, len(profile)) + profile
+        num_tlvs += 1
+    payload += TLV_HEADER.pack(VITALS_TLV_TYPE, len(tlv)) + bytes(tlv)
+    total_len = HEADER_LEN + len(payload)
+    return FRAME_HEADER.pack(0x0708050603040102, 0x03050004, total_len, 0x6843,
+                             frame_num, time_cpu, len(points or ()), num_tlvs, 0) + payload
+
+
+if __name__ == "__main__":
+    import timeit
+
+    frame = make_test_frame()
+    assert _legacy_parse(frame) == _new_parse(frame)
+
+    n = 50000
+    t_old = timeit.timeit(lambda: _legacy_parse(frame), number=n)
+    t_new = timeit.timeit(lambda: _new_parse(frame), number=n)
+    print("legacy parser : {:>10.0f} frames/sec".format(n / t_old))
+    print("tlv_decoder   : {:>10.0f} frames/sec".format(n / t_new))
+    print("speed-up      : {:.2f}x".format(t_old / t_new))
+
+    # range candidate search: old tuple list vs slot numbers (+ NumPy batch if installed)
+    import random
+    rng = random.Random(16)
+    rc = RangeCandidates()
+    records = []
+    for k in range(2000):
+        tlv = bytearray(VITALS_STRUCT.pack(0, rng.choice((0, 1, 18, 40, 99, 120)),
+                                           *[rng.choice((0.0, 0.1, rng.uniform(-1, 4))) for _ in range(30)]))
+        records.append(VitalsRecord(VITALS_STRUCT.unpack_from(tlv)))
+    for v in records:
+        legacy = _legacy_parse(FRAME_HEADER.pack(0x0708050603040102, 0, 0, 0, 0, 0, 0, 1, 0)
+                               + TLV_HEADER.pack(6, 128) + VITALS_STRUCT.pack(*v.words))[4]
+        assert legacy == extract_range_candidates(v)
+        first = rc.first(v)
+        assert (first == -1) == (not legacy)
+        if legacy:
+            assert rc.slots[first] == legacy[0][:2] and rc.value(v, first) == legacy[0][2]
+    t_list = timeit.timeit(lambda: [extract_range_candidates(v) for v in records], number=20)
+    t_slot = timeit.timeit(lambda: [rc.first(v) for v in records], number=20)
+    print("candidates    : {:.2f} us/frame (tuple list) -> {:.2f} us/frame (first slot)".format(
+        t_list / 20 / len(records) * 1e6, t_slot / 20 / len(records) * 1e6))
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    if np is not None:
+        words = np.frombuffer(b"".join(VITALS_STRUCT.pack(*v.words) for v in records), dtype='<u4').reshape(-1, 32)
+        values, ok = rc.batch(words)
+        for v, row_v, row_ok in zip(records, values, ok):
+            assert [(rc.slots[i] + (row_v[i],)) for i in np.flatnonzero(row_ok)] == extract_range_candidates(v)
+        t_np = timeit.timeit(lambda: rc.batch(words), number=20)
+        print("NumPy batch   : {:.3f} us/frame".format(t_np / 20 / len(records) * 1e6))
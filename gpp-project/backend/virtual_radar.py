@@ -0,0 +1,346 @@
+# virtual_radar.py
+"""
+Virtual IWR6843 vital-signs radar for hardware-free testing (Linux / macOS, uses ptys).
+
+Exposes two pseudo-terminals that behave like the radar UARTs:
+  - CLI/config port : echoes each command, answers "Done" (or "Error" for commands
+                      listed in error_commands) followed by the "mmwDemo:/>" prompt;
+                      sensorStart / sensorStop switch the data stream on and off
+  - data port       : emits TLV type-6 frames at `fps`, synthetic or replayed from a
+                      .vscap capture, with optional jitter, corruption and dropped bytes;
+                      synthetic frames can also carry a point cloud (type 1) of
+                      `points` points and a range profile (type 2) of `range_bins` bins
+
+Run standalone and point the acquisition script at the printed ports:
+    python virtual_radar.py --fps 20 [--jitter 0.005] [--corrupt 0.01] [--drop 0.01]
+                            [--capture session.vscap] [--autostart] [--points 32] [--range-bins 256]
+    VITALS_USER_PORT=/dev/pts/5 VITALS_DATA_PORT=/dev/pts/6 python vitalsigns.py user@x 0
+
+Parser throughput benchmark (virtual device + FrameReader + tlv_decoder in one process):
+    python virtual_radar.py --bench 20 50 100 --seconds 10
+"""
+
+import errno
+import fcntl
+import math
+import os
+import random
+import select
+import struct
+import sys
+import termios
+import threading
+import time
+import tty
+
+from tlv_decoder import make_test_frame
+from frame_clock import CPU_CLOCK_HZ
+
+PROMPT = b"mmwDemo:/>"
+
+
+def _open_pty():
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    return master, slave, os.ttyname(slave)
+
+
+class PtyPort:
+    """Minimal serial.Serial stand-in over a tty path (read/write/in_waiting/timeout)."""
+
+    def __init__(self, path, baudrate=None, timeout=2):
+        self.port = path
+        self.timeout = timeout
+        self.fd = os.open(path, os.O_RDWR | os.O_NOCTTY)
+        tty.setraw(self.fd)
+
+    @property
+    def in_waiting(self):
+        buf = fcntl.ioctl(self.fd, termios.FIONREAD, b"\0\0\0\0")
+        return struct.unpack("I", buf)[0]
+
+    def read(self, size=1):
+        out = bytearray()
+        deadline = time.monotonic() + (self.timeout or 0)
+        while len(out) < size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 and self.timeout is not None:
+                break
+            r, _, _ = select.select([self.fd], [], [], max(remaining, 0) if self.timeout is not None else None)
+            if not r:
+                break
+            chunk = os.read(self.fd, size - len(out))
+            if not chunk:
+                break
+            out += chunk
+        return bytes(out)
+
+    def write(self, data):
+        return os.write(self.fd, data)
+
+    def reset_input_buffer(self):
+        termios.tcflush(self.fd, termios.TCIFLUSH)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class VirtualRadar:
+    def __init__(self, fps=20.0, jitter=0.0, corrupt_rate=0.0, drop_rate=0.0,
+                 capture=None, error_commands=(), autostart=False, seed=None, points=0, range_bins=0):
+        self.fps = fps
+        self.jitter = jitter                # seconds of random +/- delay per frame
+        self.corrupt_rate = corrupt_rate    # probability a frame gets one flipped byte
+        self.drop_rate = drop_rate          # probability a frame loses a run of bytes
+        self.capture = capture              # path to a .vscap to loop instead of synthetic frames
+        self.points = points                # detected points per synthetic frame (TLV type 1)
+        self.range_bins = range_bins        # range profile bins per synthetic frame (TLV type 2)
+        self.error_commands = tuple(error_commands)
+        self.streaming = autostart
+        self.rng = random.Random(seed)
+
+        self.commands = 0
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.frames_corrupted = 0
+        self.frames_truncated = 0
+        self.frames_overflowed = 0          # nobody reading -> pty buffer full, frame skipped
+        self._pending = b""                 # unwritten tail of the frame being sent
+
+        self._stop = threading.Event()
+        self._threads = []
+        self._replay = None
+
+    # -----------------------------
+    # Lifecycle
+    # -----------------------------
+    def start(self):
+        if self.capture:
+            from raw_capture import CaptureReader
+            self._replay = CaptureReader(self.capture)
+            if not len(self._replay):
+                # looping a capture without frames would spin the data thread
+                self._replay.close()
+                raise ValueError("No frames in capture: {}".format(self.capture))
+        self._cli_master, self._cli_slave, self.user_port = _open_pty()
+        self._data_master, self._data_slave, self.data_port = _open_pty()
+        fl = fcntl.fcntl(self._data_master, fcntl.F_GETFL)
+        fcntl.fcntl(self._data_master, fcntl.F_SETFL, fl | os.O_NONBLOCK)
+        for target, name in ((self._cli_loop, "vradar-cli"), (self._data_loop, "vradar-data")):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for t in self._threads:
+            t.join(2)
+        for fd in (self._cli_master, self._cli_slave, self._data_master, self._data_slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def stats(self):
+        return {
+            "commands": self.commands,
+            "frames_sent": self.frames_sent,
+            "bytes_sent": self.bytes_sent,
+            "frames_corrupted": self.frames_corrupted,
+            "frames_truncated": self.frames_truncated,
+            "frames_overflowed": self.frames_overflowed,
+        }
+
+    # -----------------------------
+    # CLI port
+    # -----------------------------
+    def _reply(self, line):
+        self.commands += 1
+        if line.startswith("sensorStart"):
+            self.streaming = True
+        elif line.startswith("sensorStop"):
+            self.streaming = False
+        if any(line.startswith(c) for c in self.error_commands):
+            body = b"Error -1"
+        else:
+            body = b"Done"
+        os.write(self._cli_master, line.encode() + b"\r\n" + body + b"\r\n" + PROMPT)
+
+    def _cli_loop(self):
+        pending = b""
+        while not self._stop.is_set():
+            r, _, _ = select.select([self._cli_master], [], [], 0.2)
+            if not r:
+                continue
+            try:
+                pending += os.read(self._cli_master, 4096)
+            except OSError:
+                break
+            while b"\n" in pending:
+                raw, pending = pending.split(b"\n", 1)
+                line = raw.decode("utf-8", errors="ignore").strip()
+                if line:
+                    self._reply(line)
+
+    # -----------------------------
+    # Data port
+    # -----------------------------
+    def _frames(self):
+        if self._replay is not None:
+            while not self._stop.is_set():
+                for _, _, frame in self._replay.replay():
+                    yield bytes(frame)
+        frame_num = 0
+        while True:
+            t = frame_num / self.fps
+            yield make_test_frame(
+                frame_num,
+                heart_rate=72.0 + 6.0 * math.sin(t / 20.0),
+                breath_rate=14.0 + 2.0 * math.sin(t / 35.0),
+                range_m=0.8 + 0.03 * math.sin(t / 50.0),
+                time_cpu=int(t * CPU_CLOCK_HZ) & 0xFFFFFFFF,
+                points=[(0.1 * math.sin(t + i), 0.8 + 0.01 * i, 0.0, 0.05 * math.cos(t))
+                        for i in range(self.points)],
+                range_bins=self.range_bins,
+            )
+            frame_num = (frame_num + 1) & 0xFFFFFFFF
+
+    def _impair(self, frame):
+        if self.corrupt_rate and self.rng.random() < self.corrupt_rate:
+            buf = bytearray(frame)
+            buf[self.rng.randrange(len(buf))] ^= 0xFF
+            frame = bytes(buf)
+            self.frames_corrupted += 1
+        if self.drop_rate and self.rng.random() < self.drop_rate:
+            start = self.rng.randrange(len(frame))
+            frame = frame[:start] + frame[start + self.rng.randint(1, 16):]
+            self.frames_truncated += 1
+        return frame
+
+    def _send(self):
+        """Write as much of the pending frame as the pty takes. True once none of it is left."""
+        if not self._pending:
+            return True
+        while self._pending:
+            try:
+                n = os.write(self._data_master, self._pending)
+            except OSError as e:
+                if e.errno != errno.EAGAIN:
+                    raise
+                return False
+            self.bytes_sent += n
+            self._pending = self._pending[n:]
+        self.frames_sent += 1
+        return True
+
+    def _data_loop(self):
+        frames = self._frames()
+        period = 1.0 / self.fps
+        next_t = time.perf_counter()
+        while not self._stop.is_set():
+            if not self.streaming:
+                time.sleep(0.05)
+                next_t = time.perf_counter()
+                continue
+            frame = self._impair(next(frames))
+            try:
+                # a short write leaves a tail that goes out before any later frame
+                if not self._send():
+                    self.frames_overflowed += 1
+                else:
+                    self._pending = memoryview(frame)
+                    if not self._send() and len(self._pending) == len(frame):
+                        self._pending = b""
+                        self.frames_overflowed += 1
+            except OSError:
+                break
+            next_t += period
+            delay = next_t - time.perf_counter()
+            if self.jitter:
+                delay += self.rng.uniform(-self.jitter, self.jitter)
+            if delay > 0:
+                time.sleep(delay)
+
+
+# -----------------------------
+# Benchmark: parser throughput against the virtual device
+# -----------------------------
+def bench(fps, seconds=10.0, **kwargs):
+    from frame_reader import FrameReader
+    from tlv_decoder import decode_frame, extract_range_candidates
+
+    radar = VirtualRadar(fps=fps, autostart=True, **kwargs).start()
+    port = PtyPort(radar.data_port, timeout=0.5)
+    reader = FrameReader(port)
+    decoded = 0
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        frame = reader.read_frame()
+        if frame is None:
+            continue
+        header, vitals = decode_frame(frame)
+        if vitals is not None:
+            extract_range_candidates(vitals)
+            decoded += 1
+    elapsed = time.perf_counter() - t0
+    radar.stop()
+    port.close()
+    link = reader.stats()
+    return {
+        "fps_target": fps,
+        "frames_sent": radar.frames_sent,
+        "frames_decoded": decoded,
+        "decoded_per_sec": decoded / elapsed,
+        "resyncs": link["resyncs"],
+        "bytes_per_sec": link["bytes_per_sec"],
+    }
+
+
+def _arg(name, default, cast=float):
+    if name in sys.argv:
+        return cast(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+
+if __name__ == "__main__":
+    impairments = dict(
+        jitter=_arg("--jitter", 0.0),
+        corrupt_rate=_arg("--corrupt", 0.0),
+        drop_rate=_arg("--drop", 0.0),
+    )
+
+    if "--bench" in sys.argv:
+        rates = []
+        for a in sys.argv[sys.argv.index("--bench") + 1:]:
+            if a.startswith("--"):
+                break
+            rates.append(float(a))
+        seconds = _arg("--seconds", 10.0)
+        print("{:>6} {:>8} {:>8} {:>10} {:>8} {:>12}".format("fps", "sent", "decoded", "decoded/s", "resyncs", "bytes/s"))
+        for fps in rates or [20.0, 50.0, 100.0]:
+            r = bench(fps, seconds, **impairments)
+            print("{fps_target:>6.0f} {frames_sent:>8} {frames_decoded:>8} {decoded_per_sec:>10.1f} {resyncs:>8} {bytes_per_sec:>12.0f}".format(**r))
+        sys.exit(0)
+
+    radar = VirtualRadar(
+        fps=_arg("--fps", 20.0),
+        capture=_arg("--capture", None, str),
+        autostart="--autostart" in sys.argv,
+        points=_arg("--points", 0, int),
+        range_bins=_arg("--range-bins", 0, int),
+        **impairments
+    ).start()
+    print("Virtual radar running")
+    print("  USER (CLI) port : {}".format(radar.user_port))
+    print("  DATA port       : {}".format(radar.data_port))
+    print("Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(10)
+            print(radar.stats())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        radar.stop()
+        print("Final:", radar.stats())
@@ -1,12 +1,23 @@
 # vitalsigns.py
 """
 Usage:
-    python vitalsigns.py <user_email> <config_type>
+    python vitalsigns.py <user_email> <config_type> [--raw-capture] [--keep-streaming] [--headless] [--durable]
+                                                  [--no-archive]
 
 - user_email: string (will be saved into CSV)
 - config_type: 0 for front, 1 for back
-
-This script:
+- --raw-capture: also record every raw frame to CAPTURE_DIR (replay with raw_capture.py)
+- --keep-streaming: leave the sensor running at the end so the next run skips reconfiguration
+- --headless (or VITALS_HEADLESS=1): no matplotlib GUI import, no live plot and no blocking
+  windows; the session trend and TI combined graph are written as PNGs to FIGURE_DIR by
+  a background worker while the ML script runs. The summary prints start-up and CPU time
+  so GUI and headless runs can be compared.
+- --durable: fsync every CSV group commit (rows are committed every 250 ms / 100 rows)
+- --no-archive: skip the lossless full-rate waveform archive normally written to
+  ARCHIVE_DIR (every vitals frame, not just the rows saved to the CSV; see waveform_archive.py)
+
+This script is the CLI + live plot on top of acquisition.py (the same in-process
+API the Flask apps call). It:
 - loads the appropriate radar config file (front/back)
 - connects to USER and DATA serial ports
 - sends commands from CFG file and starts recording for DURATION seconds
@@ -18,21 +29,20 @@ This script:
 - optionally calls an external ML script (predict_with_model.py) and prints its output
 """
 
-import serial
 import time
-import struct
-import csv
-import datetime
-import matplotlib
-import pandas as pd
-matplotlib.use("TkAgg")
-import matplotlib.pyplot as plt
-import statistics
+T_START = time.perf_counter()
 import os
 import sys
 import subprocess
 import json
 import traceback
+from collections import deque
+
+from acquisition import (Acquisition, open_radar, cfg_for, USER_PORT, DATA_PORT,
+                         CSV_DIR, MASTER_CSV, DURATION)
+from acquisition_pipeline import DROP_OLDEST
+from figure_worker import FigureWorker, render_trends, render_combined, combined_waveform
+from streaming_stats import RollingMinMax
 
 # -----------------------------
 # Read args: user_email and config
@@ -46,51 +56,29 @@ except:
 
 CONFIG_STR = "front" if CONFIG_TYPE == 0 else "back"
 
-# -----------------------------
-# Select CFG file automatically
-# Update these paths if yours are in a different location
-# -----------------------------
-FRONT_CFG = r"C:\ti\mmwave_industrial_toolbox_4_12_1\labs\Vital_Signs\68xx_vital_signs\gui\profiles\xwr68xx_profile_VitalSigns_20fps_Front.cfg"
-BACK_CFG  = r"C:\ti\mmwave_industrial_toolbox_4_12_1\labs\Vital_Signs\68xx_vital_signs\gui\profiles\xwr68xx_profile_VitalSigns_20fps_Front.cfg"
-CFG_FILE = FRONT_CFG if CONFIG_TYPE == 0 else BACK_CFG
-
-# -----------------------------
-# Serial / user config
-# -----------------------------
-USER_PORT = 'COM5'
-DATA_PORT = 'COM6'
-USER_BAUD = 115200
-DATA_BAUD = 921600
+# CFG paths, serial ports (VITALS_USER_PORT / VITALS_DATA_PORT / VITALS_CFG_FILE),
+# thresholds and the CSV location live in acquisition.py
+CFG_FILE = cfg_for(CONFIG_TYPE)
 
-DURATION = 30  # seconds - adjust as needed
-CSV_DIR = r"C:\Users\Nikhil\Downloads\SSN\College Files\Grand Project\RespirationHealth\gpp-project\backend"
+KEEP_STREAMING = "--keep-streaming" in sys.argv[3:]
 
-MASTER_CSV = os.path.join(CSV_DIR, "vital_signs_data_new.csv")
+# CSV rows are group-committed (see csv_sink.py); --durable also fsyncs each commit
+DURABLE = "--durable" in sys.argv[3:]
 
-# Model script (will be called at the end). Adjust path if needed.
-MODEL_SCRIPT = os.path.normpath(os.path.join(os.path.dirname(CSV_DIR), "data_analysis", "predict_with_model.py"))
+# Raw frame capture (every frame, header + TLVs) for offline re-processing
+RAW_CAPTURE = "--raw-capture" in sys.argv[3:]
 
-# Thresholds
-HR_CHANGE_THRESHOLD = 2.0  # BPM
-RR_CHANGE_THRESHOLD = 1.0  # BPM
-RANGE_CHANGE_THRESHOLD = 0.05  # meters (5 cm)
+# Full-rate waveform archive (every vitals frame, columnar + compressed); on by default
+ARCHIVE = "--no-archive" not in sys.argv[3:]
 
-# -----------------------------
-# CSV setup
-# -----------------------------
-os.makedirs(CSV_DIR, exist_ok=True)
-file_exists = os.path.exists(MASTER_CSV)
+# Headless: no GUI backend, figures go to PNG files instead of windows
+HEADLESS = "--headless" in sys.argv[3:] or os.environ.get("VITALS_HEADLESS") == "1"
+FIGURE_DIR = os.path.join(CSV_DIR, "figures")
 
-csv_file = open(MASTER_CSV, "a", newline="")
-csv_writer = csv.writer(csv_file)
+# Model script (will be called at the end). Adjust path if needed.
+MODEL_SCRIPT = os.path.normpath(os.path.join(os.path.dirname(CSV_DIR), "data_analysis", "predict_with_model.py"))
 
-if not file_exists:
-    csv_writer.writerow([
-        "Timestamp", "User", "Configuration", "SessionTime",
-        "HeartRate_BPM", "RespirationRate_BPM", "Range_m",
-        "HeartWaveform", "BreathWaveform", "HeartRate_FFT", "BreathRate_FFT"
-    ])
-    csv_file.flush()
+PLOT_REFRESH_SEC = 0.5  # live plot redraw interval (main thread)
 
 # -----------------------------
 # Print header (ASCII safe)
@@ -103,72 +91,43 @@ print("Model script (post-run): {}".format(MODEL_SCRIPT))
 print("=" * 60)
 
 # -----------------------------
-# Connect to serial ports
+# Connect to serial ports + configure (skipped when the same CFG is still loaded)
 # -----------------------------
 print("\nConnecting to radar...")
+session = open_radar(USER_PORT, DATA_PORT)
 try:
-    user_ser = serial.Serial(USER_PORT, USER_BAUD, timeout=2)
-    data_ser = serial.Serial(DATA_PORT, DATA_BAUD, timeout=2)
+    session.open()
 except Exception as e:
     print("ERROR: Could not open serial ports.")
     print("Details:", e)
-    csv_file.close()
-    sys.exit(1)
-
-time.sleep(1)
-user_ser.reset_input_buffer()
-data_ser.reset_input_buffer()
-
-# Stop previous and send config
-print("Stopping previous session...")
-try:
-    user_ser.write(b'sensorStop\n')
-    time.sleep(1)
-    # try to read any initial response
-    _ = user_ser.read(user_ser.in_waiting or 1)
-except Exception as e:
-    print("Warning: sensorStop may have failed:", e)
-
-print("Sending configuration file...")
-try:
-    with open(CFG_FILE, "r") as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith('%'):
-                user_ser.write((line + '\n').encode())
-                # small delay to allow radar to respond
-                time.sleep(0.05)
-                # if it's sensorStart, allow more time
-                if 'sensorStart' in line:
-                    time.sleep(2)
-except Exception as e:
-    print("ERROR: Could not read or send CFG file:", e)
-    try:
-        user_ser.write(b'sensorStop\n')
-    except:
-        pass
-    csv_file.close()
-    user_ser.close()
-    data_ser.close()
     sys.exit(1)
 
-print("Configuration sent. Starting collection...\n")
+acq = Acquisition(session, USER_EMAIL, CONFIG_TYPE, cfg_file=CFG_FILE, master_csv=MASTER_CSV,
+                  duration=DURATION, raw_capture=RAW_CAPTURE, keep_streaming=KEEP_STREAMING,
+                  archive=ARCHIVE, durable=DURABLE)
 
 # -----------------------------
-# Plot setup (non-blocking)
+# Plot setup (non-blocking, GUI mode only; matplotlib loads only now that the ports are open)
 # -----------------------------
-plt.ion()
-fig, axes = plt.subplots(3, 1, figsize=(10, 8))
-ax1, ax2, ax3 = axes
-
-times, hr_values, rr_values, range_values = [], [], [], []
-hr_line, = ax1.plot([], [], '-', linewidth=2)
-rr_line, = ax2.plot([], [], '-', linewidth=2)
-range_line, = ax3.plot([], [], '-', linewidth=2)
-ax1.set_ylabel("Heart Rate (BPM)"); ax1.set_ylim(40, 120); ax1.grid(True, alpha=0.3)
-ax2.set_ylabel("Respiration Rate (BPM)"); ax2.set_ylim(5, 30); ax2.grid(True, alpha=0.3)
-ax3.set_xlabel("Time (s)"); ax3.set_ylabel("Range (m)"); ax3.set_ylim(0.3, 1.5); ax3.grid(True, alpha=0.3)
-plt.tight_layout(); plt.pause(0.001)
+PLOT_POINTS = None if HEADLESS else 100     # live plot window; headless keeps the session for the PNG
+times, hr_values, rr_values, range_values = (deque(maxlen=PLOT_POINTS) for _ in range(4))
+range_extent = RollingMinMax(20)   # range y-limits follow the last 20 points
+if not HEADLESS:
+    import matplotlib
+    matplotlib.use("TkAgg")
+    import matplotlib.pyplot as plt
+
+    plt.ion()
+    fig, axes = plt.subplots(3, 1, figsize=(10, 8))
+    ax1, ax2, ax3 = axes
+
+    hr_line, = ax1.plot([], [], '-', linewidth=2)
+    rr_line, = ax2.plot([], [], '-', linewidth=2)
+    range_line, = ax3.plot([], [], '-', linewidth=2)
+    ax1.set_ylabel("Heart Rate (BPM)"); ax1.set_ylim(40, 120); ax1.grid(True, alpha=0.3)
+    ax2.set_ylabel("Respiration Rate (BPM)"); ax2.set_ylim(5, 30); ax2.grid(True, alpha=0.3)
+    ax3.set_xlabel("Time (s)"); ax3.set_ylabel("Range (m)"); ax3.set_ylim(0.3, 1.5); ax3.grid(True, alpha=0.3)
+    plt.tight_layout(); plt.pause(0.001)
 
 def show_ti_combined_graph(csv_path, user_email, config_type):
     import pandas as pd
@@ -193,28 +152,8 @@ def show_ti_combined_graph(csv_path, user_email, config_type):
         hr_fft = df["HeartRate_FFT"].astype(float).values
         rr_fft = df["BreathRate_FFT"].astype(float).values
 
-        # Normalization logic (same as your repl script)
-        def normalize(arr):
-            amin, amax = min(arr), max(arr)
-            if abs(amax - amin) < 1e-6:
-                return [0.0] * len(arr)
-            return [((v - amin) / (amax - amin)) * 2.0 - 1.0 for v in arr]
-
-        nh = normalize(heart_wf)
-        nb = normalize(breath_wf)
-        nhf = normalize(hr_fft)
-        nrf = normalize(rr_fft)
-
-        # Combined weighted waveform
-        combined = []
-        for i in range(len(nh)):
-            h = nh[i]
-            b = nb[i] if i < len(nb) else 0
-            hf = nhf[i] if i < len(nhf) else 0
-            rf = nrf[i] if i < len(nrf) else 0
-            combined.append(0.45*h + 0.35*b + 0.10*hf + 0.10*rf)
-
-        combined = normalize(combined)
+        # Normalised + weighted mix (shared with the headless renderer)
+        combined = combined_waveform(heart_wf, breath_wf, hr_fft, rr_fft)
 
         # ========================
         # PLOT EXACT TI-STYLE GUI
@@ -265,318 +204,132 @@ def show_ti_combined_graph(csv_path, user_email, config_type):
 
 
 # -----------------------------
-# Variables for processing & stats
+# Plot stage: GUI mode drains it on the main thread (matplotlib is not thread-safe)
+# into ring buffers of PLOT_POINTS; headless mode runs it threaded and keeps the whole
+# session for the trend PNG. Session averages come from acq.aggregate, not these buffers.
 # -----------------------------
-start_time = time.time()
-packet_count = 0
-data_saved = 0
-data_skipped = 0
-bytes_read = 0
-sync_attempts = 0
-
-last_valid_hr = None
-last_valid_rr = None
-
-last_saved_hr = None
-last_saved_rr = None
-last_saved_range = None
-
-range_history = []
-range_method_scores = {}
-debug_sample_count = 0
-best_range_method = None
-
-# helper: extract possible range floats from TLV payload
-def extract_range_multi_method(tlv_data):
-    candidates = []
-    # scan offsets for floats in reasonable range
-    for offset in range(64, min(128, len(tlv_data)), 4):
-        try:
-            if offset + 4 <= len(tlv_data):
-                val = struct.unpack_from('<f', tlv_data, offset)[0]
-                if 0.2 < val < 2.5:
-                    candidates.append(('float_scan', offset, val))
-        except:
-            pass
-    # range-index fallback
-    try:
-        range_idx = struct.unpack_from('<I', tlv_data, 4)[0]
-        if 1 < range_idx < 100:
-            for bin_size in [0.044, 0.04, 0.048, 0.05]:
-                range_val = range_idx * bin_size
-                if 0.2 < range_val < 2.5:
-                    candidates.append(('range_idx', bin_size, range_val))
-    except:
-        pass
-    # specific offsets (TI docs)
-    specific_offsets = [64, 68, 72, 76, 80, 84, 88, 92, 96, 100, 104, 108]
-    for offset in specific_offsets:
-        try:
-            if offset + 4 <= len(tlv_data):
-                val = struct.unpack_from('<f', tlv_data, offset)[0]
-                if 0.2 < val < 2.5:
-                    candidates.append(('specific', offset, val))
-        except:
-            pass
-    return candidates
+def plot_sample(sample):
+    times.append(sample.ts); hr_values.append(sample.heart_rate); rr_values.append(sample.breath_rate); range_values.append(sample.range_m)
+    range_extent.add(sample.range_m)
+
+
+def redraw_plot():
+    hr_line.set_data(times, hr_values)
+    rr_line.set_data(times, rr_values)
+    range_line.set_data(times, range_values)
+    if len(times) > 1:
+        ax1.set_xlim(times[0], times[-1] + 1); ax2.set_xlim(times[0], times[-1] + 1); ax3.set_xlim(times[0], times[-1] + 1)
+        if len(range_values) > 5:
+            r_min = range_extent.min(); r_max = range_extent.max()
+            ax3.set_ylim(max(0.2, r_min - 0.1), min(2.5, r_max + 0.1))
+    plt.draw()
+
+
+plot_stage = acq.add_stage("plot", plot_sample, maxsize=256, policy=DROP_OLDEST, threaded=HEADLESS)
 
 # -----------------------------
-# Main read loop
+# Start (warm / restart / cold), then drive the live plot from the main thread
 # -----------------------------
 try:
-    while time.time() - start_time < DURATION:
-        byte = data_ser.read(1)
-        bytes_read += 1
-        if not byte:
-            continue
-        if byte[0] != 0x02:
-            sync_attempts += 1
-            continue
-
-        rest = data_ser.read(7)
-        bytes_read += len(rest)
-        if len(rest) < 7:
-            continue
-
-        sync = byte + rest
-        if sync != b'\x02\x01\x04\x03\x06\x05\x08\x07':
-            continue
-
-        # got sync
-        if packet_count == 0:
-            print("Found first valid packet sync word.")
-
-        header = data_ser.read(32)
-        bytes_read += len(header)
-        if len(header) < 32:
-            continue
+    startup_sec = time.perf_counter() - T_START
+    acq.start()
+    print("Radar start mode: {} ({:.0f} ms)".format(acq.start_mode, session.last_prepare_ms))
+except Exception as e:
+    print("ERROR: Could not read or send CFG file:", e)
+    session.shutdown()
+    sys.exit(1)
 
-        try:
-            total_len = struct.unpack('<I', header[4:8])[0]
-            frame_num = struct.unpack('<I', header[12:16])[0]
-            if total_len < 40 or total_len > 65536:
-                continue
-            payload_len = total_len - 40
-            payload = data_ser.read(payload_len)
-            bytes_read += len(payload)
-            if len(payload) < payload_len:
-                continue
-
-            packet_count += 1
-            ts = time.time() - start_time
-
-            offset = 0
-            while offset + 8 <= len(payload):
-                tlv_type, tlv_length = struct.unpack_from('<II', payload, offset)
-                offset += 8
-                if offset + tlv_length > len(payload):
-                    break
-
-                if tlv_type == 6 and tlv_length >= 128:
-                    try:
-                        tlv_data = payload[offset:offset+tlv_length]
-
-                        # Extract vital signs (positions from your code)
-                        # NOTE: if these byte offsets don't match your TLV format,
-                        # adjust indexes used below accordingly.
-                        breath_waveform = struct.unpack_from('<f', tlv_data, 28)[0]
-                        heart_waveform  = struct.unpack_from('<f', tlv_data, 32)[0]
-                        heart_rate_fft  = struct.unpack_from('<f', tlv_data, 36)[0]
-                        breath_rate_fft = struct.unpack_from('<f', tlv_data, 52)[0]
-
-                        # Range candidates
-                        range_candidates = extract_range_multi_method(tlv_data)
-
-                        # Debug prints (first 3)
-                        if debug_sample_count < 3:
-                            print("")
-                            print("DEBUG PACKET #{}".format(debug_sample_count + 1))
-                            print("Range candidates found:", len(range_candidates))
-                            for method, param, value in range_candidates[:5]:
-                                print("  {} (param={}): {:.3f} m".format(method, param, value))
-                            debug_sample_count += 1
-
-                        # Choose range
-                        range_m = None
-                        if best_range_method is None and len(range_history) > 20:
-                            method_variances = {}
-                            for key in range_method_scores:
-                                if len(range_method_scores[key]) > 15:
-                                    variance = statistics.variance(range_method_scores[key])
-                                    method_variances[key] = variance
-                            if method_variances:
-                                best_range_method = min(method_variances, key=method_variances.get)
-                                print("Selected range method:", best_range_method)
-
-                        if best_range_method:
-                            for method, param, value in range_candidates:
-                                method_key = "{}_{}".format(method, param)
-                                if method_key == best_range_method:
-                                    range_m = value
-                                    break
-
-                        if range_m is None and range_candidates:
-                            range_m = range_candidates[0][2]
-                            method_key = "{}_{}".format(range_candidates[0][0], range_candidates[0][1])
-                            if method_key not in range_method_scores:
-                                range_method_scores[method_key] = []
-                            range_method_scores[method_key].append(range_m)
-                            if len(range_method_scores[method_key]) > 30:
-                                range_method_scores[method_key].pop(0)
-
-                        if range_m is None or range_m < 0.1 or range_m > 3.0:
-                            range_m = 0.6
-
-                        # smooth range
-                        range_history.append(range_m)
-                        if len(range_history) > 9:
-                            range_history.pop(0)
-                        smoothed_range = statistics.median(range_history) if len(range_history) >= 5 else range_m
-
-                        # Validate HR/RR
-                        heart_rate = heart_rate_fft
-                        breath_rate = breath_rate_fft
-                        hr_valid = 30 <= heart_rate <= 200
-                        rr_valid = 5 <= breath_rate <= 50
-
-                        if not hr_valid and last_valid_hr is not None:
-                            heart_rate = last_valid_hr
-                            hr_valid = True
-                        if not rr_valid and last_valid_rr is not None:
-                            breath_rate = last_valid_rr
-                            rr_valid = True
-
-                        if hr_valid and rr_valid:
-                            last_valid_hr = heart_rate
-                            last_valid_rr = breath_rate
-
-                            # decide whether to save
-                            should_save = False
-                            if last_saved_hr is None:
-                                should_save = True
-                            else:
-                                if abs(heart_rate - last_saved_hr) >= HR_CHANGE_THRESHOLD:
-                                    should_save = True
-                                if abs(breath_rate - last_saved_rr) >= RR_CHANGE_THRESHOLD:
-                                    should_save = True
-                                if abs(smoothed_range - last_saved_range) >= RANGE_CHANGE_THRESHOLD:
-                                    should_save = True
-
-                            if should_save:
-                                now = datetime.datetime.now().replace(second=0, microsecond=0)
-                                current_timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
-
-                                # Write CSV row (with User + Configuration)
-                                csv_writer.writerow([
-                                    current_timestamp,
-                                    USER_EMAIL,
-                                    CONFIG_TYPE,
-                                    "{:.2f}".format(ts),
-                                    "{:.2f}".format(heart_rate),
-                                    "{:.2f}".format(breath_rate),
-                                    "{:.3f}".format(smoothed_range),
-                                    "{:.4f}".format(heart_waveform),
-                                    "{:.4f}".format(breath_waveform),
-                                    "{:.2f}".format(heart_rate_fft),
-                                    "{:.2f}".format(breath_rate_fft)
-                                ])
-                                csv_file.flush()
-                                data_saved += 1
-
-                                last_saved_hr = heart_rate
-                                last_saved_rr = breath_rate
-                                last_saved_range = smoothed_range
-
-                                print("[{:.1f}s] SAVED HR: {:.1f} | RR: {:.1f} | Range: {:.3f} m".format(ts, heart_rate, breath_rate, smoothed_range))
-                            else:
-                                data_skipped += 1
-
-                            # update plot arrays
-                            times.append(ts); hr_values.append(heart_rate); rr_values.append(breath_rate); range_values.append(smoothed_range)
-                            if len(times) > 100:
-                                times = times[-100:]; hr_values = hr_values[-100:]; rr_values = rr_values[-100:]; range_values = range_values[-100:]
-                            if (data_saved + data_skipped) % 10 == 0:
-                                hr_line.set_data(times, hr_values)
-                                rr_line.set_data(times, rr_values)
-                                range_line.set_data(times, range_values)
-                                if len(times) > 1:
-                                    ax1.set_xlim(times[0], times[-1] + 1); ax2.set_xlim(times[0], times[-1] + 1); ax3.set_xlim(times[0], times[-1] + 1)
-                                    if len(range_values) > 5:
-                                        r_min = min(range_values[-20:]); r_max = max(range_values[-20:])
-                                        ax3.set_ylim(max(0.2, r_min - 0.1), min(2.5, r_max + 0.1))
-                                plt.draw(); plt.pause(0.001)
-
-                    except Exception as e:
-                        if packet_count < 10:
-                            print("Error parsing TLV:", e)
-                offset += tlv_length
-
-        except Exception as e:
-            if packet_count < 5:
-                print("Error parsing packet:", e)
+print("Configuration sent. Starting collection...\n")
+if acq.capture is not None:
+    print("Raw capture:", acq.capture.path)
+if acq.archive_writer is not None:
+    print("Waveform archive:", acq.archive_writer.path)
+
+try:
+    last_redraw = 0.0
+    plot_pending = False
+    while HEADLESS and acq.running:
+        acq.wait(0.5)
+    while acq.running:
+        if plot_stage.drain():
+            plot_pending = True
+        if plot_pending and time.time() - last_redraw >= PLOT_REFRESH_SEC:
+            redraw_plot()
+            last_redraw = time.time()
+            plot_pending = False
+        plt.pause(0.05)
 
 # end main loop
 except KeyboardInterrupt:
     print("\nStopped by user")
 
 finally:
-    
+    # stop the reader, let storage finish everything it was handed, release the radar
+    stats = acq.stop()
+
     # -----------------------------
     # Session summary (ASCII safe)
     # -----------------------------
-    duration = time.time() - start_time
     print("\n" + "-" * 60)
     print("USER:", USER_EMAIL)
     print("CONFIGURATION:", CONFIG_STR, "({})".format(CONFIG_TYPE))
     print("\nSESSION SUMMARY")
     print("-" * 40)
-    print("Duration (sec)      : {:.1f}".format(duration))
-    print("Packets Received    : {}".format(packet_count))
-    print("Frames Saved        : {}".format(data_saved))
-    print("Frames Skipped      : {}".format(data_skipped))
-    total = data_saved + data_skipped
-    if total > 0:
-        save_ratio = data_saved / total * 100.0
-        print("Save Ratio (%)      : {:.1f}%".format(save_ratio))
+    print("Duration (sec)      : {:.1f}".format(stats.duration))
+    print("Packets Received    : {}".format(stats.packets))
+    print("Frames Saved        : {}".format(stats.frames_saved))
+    print("Frames Skipped      : {}".format(stats.frames_skipped))
+    if stats.save_ratio is not None:
+        print("Save Ratio (%)      : {:.1f}%".format(stats.save_ratio))
     else:
         print("Save Ratio (%)      : N/A")
-
-    # compute averages and std dev
-    if len(hr_values) > 0:
-        avg_hr = sum(hr_values)/len(hr_values)
-        avg_rr = sum(rr_values)/len(rr_values)
-        avg_range = sum(range_values)/len(range_values)
-
-        # Build full stats text EXACTLY like printed (ASCII)
-        stats_text = "\nVITAL SIGNS SUMMARY\n" \
-                    + ("-" * 40) + "\n" \
-                    + "Average Heart Rate  : {:.1f} bpm\n".format(avg_hr) \
-                    + "Average Resp Rate   : {:.1f} bpm\n".format(avg_rr) \
-                    + "Average Distance    : {:.3f} m ({:.0f} cm)\n".format(avg_range, avg_range * 100.0)
-
-        print("\nVITAL SIGNS SUMMARY")
-        print("-" * 40)
-        print("Average Heart Rate  : {:.1f} bpm".format(avg_hr))
-        print("Average Resp Rate   : {:.1f} bpm".format(avg_rr))
-        print("Average Distance    : {:.3f} m ({:.0f} cm)".format(avg_range, avg_range * 100.0))
-
-        if len(range_values) > 1:
-            range_std = statistics.stdev(range_values)
-            stats_text += "Distance Std Dev    : {:.3f} m ({:.0f} cm)\n".format(range_std, range_std * 100.0)
-            print("Distance Std Dev    : {:.3f} m ({:.0f} cm)".format(range_std, range_std * 100.0))
-    else:
-        stats_text = "No valid HR/RR frames were saved."
-        print("\nNo valid HR/RR frames were saved.")
-
-    # IMPORTANT: Send stats back to Flask
+    link = stats.link
+    print("Bytes Read          : {:,} ({:.0f} B/s)".format(link["bytes_read"], link["bytes_per_sec"]))
+    print("Resyncs             : {} ({} bytes discarded)".format(link["resyncs"], link["bytes_discarded"]))
+    timing = stats.timing
+    print("Frames Lost         : {lost} in {gaps} gaps, max gap {max_gap} ({loss_pct:.2f}%)".format(**timing))
+    print("Duplicate / Stale   : {duplicates} / {out_of_order}, restarts {restarts}".format(**timing))
+    print("Device Time (sec)   : {:.2f} ({} clock)".format(timing["device_sec"], timing["clock"]))
+    print("Stage Drops         : " + " ".join(
+        "{}={}".format(name, st["dropped"]) for name, st in stats.stages.items()))
+    if stats.storage:
+        print("CSV Commits         : {commits} ({rows_per_commit:.1f} rows/commit, max {max_commit_ms:.1f} ms)".format(**stats.storage))
+    for label, key in (("HR (BPM)", "hr"), ("RR (BPM)", "rr"), ("Range (m)", "range")):
+        sm = stats.summary[key]
+        if sm["count"]:
+            print("{:<20}: p5 {p5:.2f}  p50 {p50:.2f}  p95 {p95:.2f}  [{min:.2f} .. {max:.2f}]".format(label, **sm))
+    cpu = os.times()
+    print("Startup (sec)       : {:.2f} ({})".format(startup_sec, "headless" if HEADLESS else "GUI"))
+    print("CPU Time (sec)      : {:.2f}".format(cpu.user + cpu.system))
+
+    print(stats.stats_text.rstrip("\n"))
+
+    # kept for older callers that still scrape stdout (the Flask apps use acquisition.py directly)
     print("STATS_BEGIN")
-    print(json.dumps({"stats_text": stats_text}))
+    print(json.dumps({"stats_text": stats.stats_text}))
     print("STATS_END")
 
     print("\nCSV Saved To:")
-    print("  {}".format(MASTER_CSV))
+    print("  {}".format(stats.csv_path))
+    if stats.capture_path:
+        print("Raw Capture:")
+        print("  {} ({} frames)".format(stats.capture_path, stats.capture_frames))
+    if stats.archive_path:
+        print("Waveform Archive:")
+        print("  {} ({} frames)".format(stats.archive_path, stats.archive_frames))
     print("-" * 60)
-    
+
+    # headless: render the post-session figures off-screen while the ML script runs
+    figures = None
+    if HEADLESS:
+        os.makedirs(FIGURE_DIR, exist_ok=True)
+        stem = os.path.join(FIGURE_DIR, "{}_cfg{}_{}".format(
+            USER_EMAIL.replace("@", "_at_"), CONFIG_TYPE, time.strftime("%Y%m%d_%H%M%S")))
+        figures = FigureWorker()
+        if times:
+            figures.submit(render_trends, stem + "_trends.png", list(times), list(hr_values), list(rr_values), list(range_values),
+                           title="user: {} config: {}".format(USER_EMAIL, CONFIG_TYPE))
+        figures.submit(render_combined, stem + "_combined.png", MASTER_CSV, USER_EMAIL, CONFIG_TYPE)
 
     # -----------------------------
     # Run ML model script (if exists) and show HR/RR/Stress classes
@@ -627,28 +380,23 @@ finally:
         print("\nNo ML summary available (model script not run or returned unparsable output).")
 
     # -----------------------------
-    # Clean up serial / files / plots
+    # Clean up serial / plots (acq.stop() already closed the CSV and honoured --keep-streaming)
     # -----------------------------
-    try:
-        csv_file.close()
-    except:
-        pass
-    try:
-        user_ser.write(b'sensorStop\n')
-    except:
-        pass
-    time.sleep(0.5)
-    try:
-        user_ser.close()
-        data_ser.close()
-    except:
-        pass
-
-    plt.ioff()
-    try:
-        plt.show()
-    except:
-        pass
+    session.close()
+
+    if HEADLESS:
+        paths = figures.close()
+        print("\nFigures Saved To:")
+        for path in paths:
+            print("  {}".format(path))
+        for err in figures.errors:
+            print("  figure error:", err)
+    else:
+        plt.ioff()
+        try:
+            plt.show()
+        except:
+            pass
 
-    show_ti_combined_graph(MASTER_CSV, USER_EMAIL, CONFIG_TYPE)    
+        show_ti_combined_graph(MASTER_CSV, USER_EMAIL, CONFIG_TYPE)
     print("\nDone.")
@@ -0,0 +1,284 @@
+# waveform_archive.py
+"""
+Lossless, full-rate columnar archive of every vital-signs frame in a session.
+
+The master CSV only gets frames that pass change detection; this archive keeps
+every decoded type-6 record (all 32 words) plus frame_num / time_cpu / wall_time,
+so waveforms can be re-analysed later (spectra, other range methods, ...).
+
+File (.vsarc):
+    b"VSARC001" <I header_len> <header JSON: columns, block_rows, session info>
+    blocks:     <I n_rows> <I payload_len> zlib(payload)
+
+A block holds up to `block_rows` frames stored column by column. Each column is
+kept as its raw bit pattern (uint32 / uint64) XOR-ed with the previous value of
+the same column (delta coding that is exact for floats), which leaves mostly
+zero bytes for zlib to squeeze. Decoding undoes the XOR with a cumulative XOR.
+
+The writer only appends 144 bytes per frame on the reader thread; transposing,
+delta coding and compression happen on its own thread once per block.
+
+Reading (NumPy when installed, array.array otherwise):
+    arc = ArchiveReader("session.vsarc")
+    hw = arc.column("heart_waveform")          # float32 array, every frame
+    data = arc.to_arrays()                     # {name: array}
+    mm = arc.memmap("heart_waveform")          # np.memmap via a cached .npy
+
+Benchmark / round-trip check:
+    python waveform_archive.py [--hours 1]
+"""
+
+import array
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+import zlib
+
+FILE_MAGIC = b"VSARC001"
+BLOCK_HEADER = struct.Struct('<II')
+BLOCK_ROWS = 1200            # one minute at 20 fps
+ROW = struct.Struct('<IId2I30f')   # frame_num, time_cpu, wall_time, type-6 words
+ROW_BITS = struct.Struct('<IIQ32I')  # the same bytes seen as raw bit patterns
+
+# (name, storage typecode of the value, typecode of its bit pattern)
+COLUMNS = ([("frame_num", "I", "I"), ("time_cpu", "I", "I"), ("wall_time", "d", "Q"),
+            ("word0", "I", "I"), ("range_idx", "I", "I")]
+           + [("f{}".format(4 * i), "f", "I") for i in range(2, 32)])
+
+# friendly names for the offsets used by the acquisition scripts (see tlv_decoder.py)
+ALIASES = {
+    "breath_waveform": "f28",
+    "heart_waveform": "f32",
+    "heart_rate_fft": "f36",
+    "breath_rate_fft": "f52",
+}
+
+_STOP = object()
+_NP_DTYPES = {"I": "<u4", "Q": "<u8", "f": "<f4", "d": "<f8"}
+
+
+def _encode_block(rows, n):
+    """rows: bytes of n ROW records -> zlib(column-major XOR-delta payload)."""
+    bits = ROW_BITS.iter_unpack(rows)
+    columns = list(zip(*bits)) if n else []
+    parts = []
+    for (name, _, bit_code), col in zip(COLUMNS, columns):
+        prev = 0
+        out = array.array(bit_code)
+        for v in col:
+            out.append(v ^ prev)
+            prev = v
+        if sys.byteorder != "little":
+            out.byteswap()
+        parts.append(out.tobytes())
+    return zlib.compress(b"".join(parts), 6)
+
+
+class ArchiveWriter:
+    def __init__(self, path, block_rows=BLOCK_ROWS, info=None):
+        self.path = path
+        self.block_rows = block_rows
+        self.frames = 0
+        self.blocks = 0
+        self.bytes_written = 0
+        self.encode_ms = 0.0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._f = open(path, "wb")
+        header = json.dumps({
+            "columns": [[name, code] for name, code, _ in COLUMNS],
+            "aliases": ALIASES,
+            "block_rows": block_rows,
+            "created": time.time(),
+            "info": info or {},
+        }).encode()
+        self._f.write(FILE_MAGIC + struct.pack('<I', len(header)) + header)
+        self._buf = bytearray()
+        self._rows = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="waveform-archive", daemon=True)
+        self._thread.start()
+
+    def append(self, frame_num, time_cpu, wall_time, words):
+        """One decoded frame; `words` is VitalsRecord.words (2 uint32 + 30 float32)."""
+        self._buf += ROW.pack(frame_num, time_cpu, wall_time, *words)
+        self._rows += 1
+        self.frames += 1
+        if self._rows >= self.block_rows:
+            self._queue.put((bytes(self._buf), self._rows))
+            self._buf = bytearray()
+            self._rows = 0
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            rows, n = item
+            t0 = time.perf_counter()
+            payload = _encode_block(rows, n)
+            self._f.write(BLOCK_HEADER.pack(n, len(payload)))
+            self._f.write(payload)
+            self._f.flush()
+            self.encode_ms += (time.perf_counter() - t0) * 1000.0
+            self.blocks += 1
+            self.bytes_written += BLOCK_HEADER.size + len(payload)
+
+    def close(self):
+        if self._rows:
+            self._queue.put((bytes(self._buf), self._rows))
+            self._buf = bytearray()
+            self._rows = 0
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._f.close()
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "frames": self.frames,
+            "blocks": self.blocks,
+            "bytes": self.bytes_written,
+            "bytes_per_frame": self.bytes_written / self.frames if self.frames else 0.0,
+            "encode_ms": self.encode_ms,
+        }
+
+
+class ArchiveReader:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:len(FILE_MAGIC)] != FILE_MAGIC:
+            raise ValueError("Not a waveform archive: {}".format(path))
+        pos = len(FILE_MAGIC)
+        (header_len,) = struct.unpack_from('<I', data, pos)
+        pos += 4
+        self.header = json.loads(data[pos:pos + header_len].decode())
+        pos += header_len
+        self.info = self.header.get("info", {})
+        self.aliases = self.header.get("aliases", {})
+        self.names = [name for name, _ in self.header["columns"]]
+        self.blocks = []                      # (n_rows, compressed payload)
+        while pos + BLOCK_HEADER.size <= len(data):
+            n, size = BLOCK_HEADER.unpack_from(data, pos)
+            pos += BLOCK_HEADER.size
+            if pos + size > len(data):
+                break                         # truncated tail (session was cut off mid-block)
+            self.blocks.append((n, data[pos:pos + size]))
+            pos += size
+        self.frames = sum(n for n, _ in self.blocks)
+        self._decoded = {}
+
+    def __len__(self):
+        return self.frames
+
+    def _resolve(self, name):
+        name = self.aliases.get(name, name)
+        if name not in self.names:
+            raise KeyError(name)
+        return self.names.index(name)
+
+    def _block_columns(self, i):
+        """{column index: raw little-endian XOR-delta bytes} for block i."""
+        if i not in self._decoded:
+            n, payload = self.blocks[i]
+            raw = zlib.decompress(payload)
+            cols, pos = [], 0
+            for (_, code, bit_code) in COLUMNS:
+                size = n * array.array(bit_code).itemsize
+                cols.append(raw[pos:pos + size])
+                pos += size
+            self._decoded = {i: cols}         # keep one block around
+        return self._decoded[i]
+
+    def column(self, name):
+        """Every frame's value of one column, as a NumPy array (array.array without NumPy)."""
+        idx = self._resolve(name)
+        _, code, bit_code = COLUMNS[idx]
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+
+        if np is not None:
+            parts = []
+            for i in range(len(self.blocks)):
+                bits = np.frombuffer(self._block_columns(i)[idx], dtype=_NP_DTYPES[bit_code])
+                parts.append(np.bitwise_xor.accumulate(bits) if len(bits) else bits)
+            bits = np.concatenate(parts) if parts else np.zeros(0, dtype=_NP_DTYPES[bit_code])
+            return bits.view(_NP_DTYPES[code])
+
+        out = array.array(bit_code)
+        for i in range(len(self.blocks)):
+            deltas = array.array(bit_code, self._block_columns(i)[idx])
+            if sys.byteorder != "little":
+                deltas.byteswap()
+            prev = 0
+            for d in deltas:
+                prev ^= d
+                out.append(prev)
+        return array.array(code, out.tobytes())
+
+    def to_arrays(self, names=None):
+        return {name: self.column(name) for name in (names or self.names)}
+
+    def memmap(self, name, cache_dir=None):
+        """Decode one column once into <archive>.npy/<name>.npy and memory-map it (needs NumPy)."""
+        import numpy as np
+        name = self.aliases.get(name, name)
+        cache_dir = cache_dir or self.path + ".npy"
+        os.makedirs(cache_dir, exist_ok=True)
+        npy = os.path.join(cache_dir, name + ".npy")
+        if not os.path.exists(npy) or os.path.getmtime(npy) < os.path.getmtime(self.path):
+            np.save(npy, self.column(name))
+        return np.load(npy, mmap_mode="r")
+
+
+# -----------------------------
+# Benchmark + lossless round trip: python waveform_archive.py [--hours 1]
+# -----------------------------
+if __name__ == "__main__":
+    import math
+    import tempfile
+    from tlv_decoder import decode_frame, make_test_frame
+
+    hours = float(sys.argv[sys.argv.index("--hours") + 1]) if "--hours" in sys.argv else 1.0
+    fps = 20.0
+    n = int(hours * 3600 * fps)
+    path = os.path.join(tempfile.mkdtemp(), "bench.vsarc")
+
+    # a few distinct frames, with waveforms varying frame to frame like a real session
+    frames = []
+    for k in range(200):
+        t = k / fps
+        frames.append(decode_frame(make_test_frame(k, heart_rate=72 + 5 * math.sin(t / 3),
+                                                   breath_rate=14 + math.sin(t / 7),
+                                                   range_m=0.8 + 0.02 * math.sin(t)))[1].words)
+
+    writer = ArchiveWriter(path, info={"bench": True})
+    t0 = time.perf_counter()
+    for i in range(n):
+        writer.append(i, i * 50, 1.7e9 + i / fps, frames[i % len(frames)])
+    append_s = time.perf_counter() - t0
+    writer.close()
+    st = writer.stats()
+
+    reader = ArchiveReader(path)
+    t0 = time.perf_counter()
+    hw = reader.column("heart_waveform")
+    fn = reader.column("frame_num")
+    read_s = time.perf_counter() - t0
+    ok = (len(hw) == n and fn[-1] == n - 1
+          and all(struct.pack('<f', hw[i]) == struct.pack('<f', frames[i % len(frames)][8]) for i in range(0, n, 997)))
+
+    print("frames               : {} ({:.1f} h at {:.0f} fps)".format(n, hours, fps))
+    print("append (reader side) : {:.2f} us/frame".format(append_s / n * 1e6))
+    print("encode (own thread)  : {:.0f} ms total, {:.2f} us/frame".format(st["encode_ms"], st["encode_ms"] / n * 1000))
+    print("archive size         : {:,} bytes ({:.1f} B/frame vs {} B raw)".format(st["bytes"], st["bytes_per_frame"], ROW.size))
+    print("read heart_waveform  : {:.0f} ms".format(read_s * 1000))
+    print("lossless round trip  : {}".format(ok))
@@ -1,6 +1,3 @@
-import pandas as pd
-import numpy as np
-from scipy.signal import butter, filtfilt
 import os, json
 import re
 
@@ -13,8 +10,50 @@ COMPARISON_FILE = r"C:\Users\Nikhil\Downloads\SSN\College Files\Grand Project\Re
 OFFSET_FILE = r"C:\Users\Nikhil\Downloads\SSN\College Files\Grand Project\RespirationHealth\gpp-project\data_analysis\calibration_offsets.json"
 FINAL_STATS_FILE = r"C:\Users\Nikhil\Downloads\SSN\College Files\Grand Project\RespirationHealth\gpp-project\data_analysis\final_run_stats_new.csv"
 
+# size/mtime of the inputs and outputs as of the last completed run
+SOURCE_STAMP_FILE = CLEAN_FILE + ".stamp"
+
 os.makedirs(os.path.dirname(FINAL_STATS_FILE), exist_ok=True)
 
+# ==========================================================
+# FAST PATH: nothing changed since the last run -> exit before pandas/scipy load
+# ==========================================================
+def file_state(path):
+    try:
+        st = os.stat(path)
+        return [st.st_size, st.st_mtime_ns]
+    except OSError:
+        return None
+
+def output_state():
+    return {p: file_state(p) for p in (CLEAN_FILE, FINAL_STATS_FILE, OFFSET_FILE)}
+
+def load_stamp():
+    try:
+        with open(SOURCE_STAMP_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+raw_state = file_state(RAW_FILE)
+stamp = load_stamp()
+if raw_state is not None and stamp == {"raw": raw_state, "outputs": output_state()}:
+    print("✔ No NEW raw rows in vital_signs_data_new.csv (unchanged since last run)")
+    exit()
+
+def finish():
+    """Remember what this run saw, so an unchanged raw file takes the fast path next time."""
+    try:
+        with open(SOURCE_STAMP_FILE, "w") as f:
+            json.dump({"raw": raw_state, "outputs": output_state()}, f)
+    except OSError:
+        pass
+    exit()
+
+# heavy imports only once there is work to do
+import pandas as pd
+import numpy as np
+
 # ==========================================================
 # Robust timestamp parsing helper
 # ==========================================================
@@ -46,6 +85,7 @@ def parse_timestamps(series: pd.Series) -> pd.Series:
         "%d-%m-%Y %H:%M",        # no seconds (your main format)
         "%d-%m-%y %H:%M:%S",
         "%d-%m-%y %H:%M",
+        "%Y-%m-%d %H:%M:%S.%f",  # acquisition.py rows (millisecond wall clock)
         "%Y-%m-%d %H:%M:%S",
         "%Y-%m-%d %H:%M",
     ]
@@ -131,7 +171,7 @@ raw_new = raw_df[raw_df["Timestamp"] > last_clean_ts].copy()
 
 if raw_new.empty:
     print("✔ No NEW raw rows in vital_signs_data_new.csv")
-    exit()
+    finish()
 
 print("➡ New raw rows:", len(raw_new))
 
@@ -152,7 +192,7 @@ clean = raw_new[
 
 if clean.empty:
     print("⚠ All new rows invalid")
-    exit()
+    finish()
 
 # Detect stuck HR
 mode_hr = clean["HeartRate_BPM"].mode().iloc[0]
@@ -161,13 +201,14 @@ if clean["HeartRate_BPM"].value_counts().max() > 0.6 * len(clean) and mode_hr >
 
 if clean.empty:
     print("⚠ Stuck HR removed all rows.")
-    exit()
+    finish()
 
 # LPF
 def lowpass(arr, cutoff=0.3, fs=10):
     arr = arr.ffill().bfill()
     if len(arr) < 12:
         return arr.rolling(3, min_periods=1, center=True).mean()
+    from scipy.signal import butter, filtfilt
     b, a = butter(4, cutoff/(fs/2), btype='low')
     return filtfilt(b, a, arr)
 
@@ -197,13 +238,15 @@ print("✔ Cleaned new raw rows:", len(final_clean))
 # ==========================================================
 # RUN DETECTION PREPARATION
 # ==========================================================
-# concat previous cleaned (prev) + the newly cleaned rows for run detection
+# concat previous cleaned (prev) + the newly cleaned rows for run detection;
+# __new marks the rows cleaned in this pass (prev rows already belong to earlier runs)
 if prev is not None and not prev.empty:
     # ensure prev has the expected columns (if not, try to keep intersection)
     common_cols = [c for c in final_clean.columns if c in prev.columns]
-    df = pd.concat([prev[common_cols], final_clean[common_cols]], ignore_index=True)
+    df = pd.concat([prev[common_cols].assign(__new=False), final_clean[common_cols].assign(__new=True)],
+                   ignore_index=True)
 else:
-    df = final_clean.copy()
+    df = final_clean.assign(__new=True)
 
 # normalize timestamp column in df (parse robustly to be safe)
 df["Timestamp"] = parse_timestamps(df["Timestamp"].astype(str))
@@ -234,12 +277,18 @@ else:
     last_run = 0
     print("ℹ No previous final stats → fresh start")
 
-# Only NEW cleaned rows for run detection
-df_new = df[df["Timestamp"] > last_final_ts].copy()
+# Only NEW cleaned rows for run detection. Selected by row, not by "> last_final_ts":
+# run stats keep the start time to the minute while raw rows carry milliseconds, so
+# the last run's own rows would compare as newer and be added again as another run.
+# Without a stats file every cleaned row is re-detected (rebuild).
+if os.path.exists(FINAL_STATS_FILE):
+    df_new = df[df["__new"]].drop(columns="__new")
+else:
+    df_new = df.drop(columns="__new")
 
 if df_new.empty:
     print("✔ No new runs to add")
-    exit()
+    finish()
 
 # Reset index (avoids KeyError when using loc[i])
 df_new = df_new.reset_index(drop=True)
@@ -263,7 +312,7 @@ for i in range(1, len(df_new)):
 valid_runs = [(rn, g) for rn, g in df_new.groupby("Run") if len(g) >= 5]
 if not valid_runs:
     print("⚠ No valid runs detected")
-    exit()
+    finish()
 
 print("✔ Valid new runs:", [rn for rn, _ in valid_runs])
 
@@ -369,3 +418,5 @@ print("======================================")
 print("✔ ADDED NEW RUNS:", len(stats_df))
 print("✔ Saved in:", FINAL_STATS_FILE)
 print("======================================")
+
+finish()
@@ -0,0 +1,252 @@
+# compact_model.py
+"""
+Compact, NumPy-only form of the trained Pipeline(SimpleImputer -> StandardScaler -> XGBoost)
+models, for a fast cold start.
+
+Unpickling the .joblib pipelines imports all of sklearn and xgboost. export_pipeline()
+(called by train_hr_model.py / train_hr_classifier.py right after joblib.dump) writes
+a .npz next to each .joblib. The .npz holds only arrays, and CompactModel scores it
+with NumPy alone:
+
+    imputer     (F,)  medians that replace NaN
+    mean, scale (F,)  StandardScaler
+    left, right (M,)  child node ids over all trees, -1 at a leaf
+    feature     (M,)  split feature; threshold (M,) float32; default_left (M,) NaN branch
+    value       (M,)  float32 leaf value (learning rate already applied)
+    roots, group (T,) first node of each tree and the output column it adds to
+    base_score  (K,)  initial margin per output column
+    meta              JSON: kind, objective, num_class, n_classes, depth, features
+
+Trees are evaluated all at once: one (N, T) array of node ids advanced `depth` times.
+Leaves are summed per output column in tree order in float32, as xgboost does, so the
+predictions match the pipelines (classes exactly, regression to float32 rounding).
+
+Usage:
+    export_pipeline(pipeline, "hr_model.npz", FEATURES)        # training side
+    model = CompactModel.load("hr_model.npz")                  # inference side
+    model.predict(X); model.predict_proba(X)
+
+Parity with the joblib pipelines + cold-start timing:
+    python compact_model.py
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+
+FORMAT = "compact-xgb-1"
+
+
+# ==========================================================
+# EXPORT (training side: needs the fitted sklearn / xgboost objects)
+# ==========================================================
+def _flatten_trees(booster):
+    learner = json.loads(booster.save_raw("json"))["learner"]
+    model = learner["gradient_booster"]["model"]
+    if learner["gradient_booster"]["name"] != "gbtree":
+        raise ValueError("Only gbtree boosters can be exported, got " + learner["gradient_booster"]["name"])
+
+    left, right, feature, threshold, default_left, value = [], [], [], [], [], []
+    roots, depth = [], 0
+    for tree in model["trees"]:
+        if any(tree.get("split_type", [])):
+            raise ValueError("Categorical splits are not supported")
+        offset = len(left)
+        roots.append(offset)
+        lc, rc = tree["left_children"], tree["right_children"]
+        for lo, ro in zip(lc, rc):
+            left.append(lo + offset if lo != -1 else -1)
+            right.append(ro + offset if ro != -1 else -1)
+        feature.extend(tree["split_indices"])
+        # a leaf keeps its value in split_conditions
+        threshold.extend(tree["split_conditions"])
+        default_left.extend(tree["default_left"])
+        value.extend(c if lo == -1 else 0.0 for c, lo in zip(tree["split_conditions"], lc))
+
+        # deepest leaf, for the number of traversal steps
+        stack = [(0, 0)]
+        while stack:
+            node, d = stack.pop()
+            if lc[node] == -1:
+                depth = max(depth, d)
+            else:
+                stack.append((lc[node], d + 1))
+                stack.append((rc[node], d + 1))
+
+    base = learner["learner_model_param"]["base_score"].strip("[]").split(",")
+    return {
+        "left": np.array(left, dtype=np.int32),
+        "right": np.array(right, dtype=np.int32),
+        "feature": np.array(feature, dtype=np.int32),
+        "threshold": np.array(threshold, dtype=np.float32),
+        "default_left": np.array(default_left, dtype=bool),
+        "value": np.array(value, dtype=np.float32),
+        "roots": np.array(roots, dtype=np.int32),
+        "group": np.array(model["tree_info"], dtype=np.int32),
+        "base_score": np.array([float(b) for b in base], dtype=np.float32),
+    }, learner["objective"]["name"], int(learner["learner_model_param"]["num_class"]), depth
+
+
+def export_pipeline(pipeline, path, features):
+    """Write the fitted imputer -> scaler -> XGBoost pipeline as a .npz at path (atomically)."""
+    imputer, scaler, model = pipeline.steps[0][1], pipeline.steps[1][1], pipeline.steps[-1][1]
+    if getattr(imputer, "add_indicator", False) or np.isnan(imputer.statistics_).any():
+        raise ValueError("Imputer with indicator columns or all-missing features cannot be exported")
+
+    n = len(imputer.statistics_)
+    arrays, objective, num_class, depth = _flatten_trees(model.get_booster())
+    arrays["imputer"] = np.asarray(imputer.statistics_, dtype=np.float64)
+    arrays["mean"] = np.asarray(scaler.mean_ if scaler.with_mean else np.zeros(n), dtype=np.float64)
+    arrays["scale"] = np.asarray(scaler.scale_ if scaler.with_std else np.ones(n), dtype=np.float64)
+
+    classes = getattr(model, "classes_", None)
+    meta = {
+        "format": FORMAT,
+        "kind": "classifier" if classes is not None else "regressor",
+        "objective": objective,
+        "num_class": num_class,
+        "n_classes": len(classes) if classes is not None else 0,
+        "depth": depth,
+        "features": list(features),
+    }
+    arrays["meta"] = np.array(json.dumps(meta))
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+    return path
+
+
+# ==========================================================
+# EVALUATOR (inference side: NumPy only)
+# ==========================================================
+class CompactModel:
+    def __init__(self, arrays, meta):
+        self.meta = meta
+        self.kind = meta["kind"]
+        self.depth = meta["depth"]
+        self.features = meta["features"]
+        for name, arr in arrays.items():
+            setattr(self, name, arr)
+        self.n_outputs = len(self.base_score)
+        self._groups = [np.flatnonzero(self.group == g) for g in range(self.n_outputs)]
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files if name != "meta"}
+            meta = json.loads(str(data["meta"]))
+        if meta.get("format") != FORMAT:
+            raise ValueError(f"{path}: unknown model format {meta.get('format')}")
+        return cls(arrays, meta)
+
+    def transform(self, X):
+        """Imputer + scaler (float64, like sklearn), then float32 as xgboost reads it."""
+        X = np.array(X, dtype=np.float64).reshape(-1, len(self.imputer))
+        X = np.where(np.isnan(X), self.imputer, X)
+        return ((X - self.mean) / self.scale).astype(np.float32)
+
+    def decision_function(self, X):
+        """(N, K) raw margins."""
+        X = self.transform(X)
+        n = len(X)
+        rows = np.arange(n)[:, None]
+        node = np.broadcast_to(self.roots, (n, len(self.roots))).copy()
+        for _ in range(self.depth):
+            left = self.left[node]
+            x = X[rows, self.feature[node]]
+            go_left = np.where(np.isnan(x), self.default_left[node], x < self.threshold[node])
+            node = np.where(left == -1, node, np.where(go_left, left, self.right[node]))
+        leaves = self.value[node]
+
+        margins = np.empty((n, self.n_outputs), dtype=np.float32)
+        for g, cols in enumerate(self._groups):
+            # tree order, float32 accumulator (np.cumsum is sequential, np.sum is pairwise)
+            acc = np.concatenate([np.full((n, 1), self.base_score[g], dtype=np.float32), leaves[:, cols]], axis=1)
+            margins[:, g] = np.cumsum(acc, axis=1, dtype=np.float32)[:, -1]
+        return margins
+
+    def predict_proba(self, X):
+        margins = self.decision_function(X)
+        if self.meta["objective"] == "multi:softprob":
+            e = np.exp(margins - margins.max(axis=1, keepdims=True))
+            p = e / e.sum(axis=1, keepdims=True)
+        else:
+            p = 1.0 / (1.0 + np.exp(-margins))
+        if p.shape[1] == 1:
+            # XGBClassifier reads a single output column as P(class 1) of a binary split
+            p = np.column_stack([1.0 - p[:, 0], p[:, 0]])
+        return p
+
+    def predict(self, X):
+        if self.kind == "regressor":
+            return self.decision_function(X)[:, 0]
+        return self.predict_proba(X).argmax(axis=1)
+
+
+# ==========================================================
+# PARITY + COLD START: python compact_model.py
+# ==========================================================
+def parity_check(joblib_files, compact_files, stats_file, n_random=2000, seed=23):
+    """Max |difference| (regressors) / mismatched classes (classifiers) on stored + random rows."""
+    import joblib
+    from predict_with_model import read_runs, run_records
+
+    header, rows = read_runs(stats_file)
+    X = np.array([r[2] for r in run_records(header, rows)], dtype=float)
+    rng = np.random.default_rng(seed)
+    noise = X[rng.integers(0, len(X), n_random)] * rng.uniform(0.5, 1.5, (n_random, X.shape[1]))
+    noise[rng.random(noise.shape) < 0.05] = np.nan        # exercise the imputer
+    X = np.vstack([X, noise])
+
+    out = {}
+    for name, path in joblib_files.items():
+        pipe = joblib.load(path)
+        compact = CompactModel.load(compact_files[name])
+        ref, got = pipe.predict(X), compact.predict(X)
+        if compact.kind == "regressor":
+            out[name] = {"rows": len(X), "max_abs_diff": float(np.max(np.abs(ref - got)))}
+        else:
+            if ref.ndim == 2:
+                ref = ref.argmax(axis=1)        # see clean_pred in predict_with_model.py
+            out[name] = {"rows": len(X), "mismatches": int(np.sum(ref.astype(int) != got))}
+    return out
+
+
+def cold_start(files, repeat=3):
+    """Seconds for a fresh interpreter to import what it needs and load every model."""
+    import subprocess
+    import time
+
+    code = ("import sys; sys.path.insert(0, {here!r}); from predict_with_model import load_models; "
+            "load_models({files!r})").format(here=os.path.dirname(os.path.abspath(__file__)), files=files)
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-W", "ignore", "-c", code], check=True)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    from predict_with_model import MODEL_FILES, COMPACT_FILES, FINAL_STATS_FILE
+
+    if "--export" in sys.argv:
+        # one-off conversion of existing .joblib files (the training scripts do this themselves)
+        import joblib
+        for name, path in MODEL_FILES.items():
+            pipe = joblib.load(path)
+            export_pipeline(pipe, COMPACT_FILES[name], getattr(pipe, "feature_names_in_", []))
+            print("✔", COMPACT_FILES[name])
+
+    for name, result in parity_check(MODEL_FILES, COMPACT_FILES, FINAL_STATS_FILE).items():
+        print("{:20s} {}".format(name, result))
+
+    t_joblib = cold_start(MODEL_FILES)
+    t_compact = cold_start(COMPACT_FILES)
+    print("cold start, 4 models: joblib {:.2f} s -> compact {:.2f} s ({:.1f}x)".format(
+        t_joblib, t_compact, t_joblib / t_compact))
@@ -0,0 +1,284 @@
+"""
+Incremental model updates as cleaning_data.py appends runs to final_run_stats_new.csv.
+
+A full retrain (train_hr_model.py + train_hr_classifier.py) fits every model from
+scratch over the whole stats file. After a session usually only a few runs are new, so
+update() instead:
+
+  1. takes the runs after the watermark (highest Run already trained on, STATE_FILE)
+  2. scores the current models on them before touching anything (test-then-train):
+     MAE for the HR regressor, accuracy for the classifiers, kept in a rolling window
+  3. runs the full retrain instead when
+       - the rolling score drifted past DRIFT_MAE_RATIO / DRIFT_ACC_DROP from the
+         score of the last full retrain
+       - a new run has a class label the saved encodings do not know
+       - more than MAX_NEW_FRACTION new runs piled up since the last full retrain
+  4. otherwise continues boosting each saved model by INCREMENT_ROUNDS trees, fitted on
+     the new runs plus the REPLAY_RUNS runs before them (so a handful of runs does not
+     dominate and every class stays present); the saved imputer / scaler are kept
+
+The updated .joblib (and its .npz export) replaces the old one, so the API's inference
+service picks it up on the next request.
+
+Usage:
+    python incremental_training.py            # update, or full retrain when needed
+    python incremental_training.py --full     # force a full retrain
+    python incremental_training.py --status   # watermark and rolling scores
+"""
+
+import os
+import sys
+import json
+import time
+import warnings
+warnings.filterwarnings("ignore")
+
+import numpy as np
+import joblib
+
+import train_hr_model as reg
+import train_hr_classifier as clf
+from compact_model import export_pipeline
+
+# ==========================================================
+# PATHS + SETTINGS
+# ==========================================================
+BASE_DIR = reg.BASE_DIR
+
+STATE_FILE = os.path.join(BASE_DIR, "training_state.json")
+
+INCREMENT_ROUNDS = 25       # trees added per model per update
+REPLAY_RUNS = 40            # older runs trained on together with the new ones
+ROLLING_WINDOW = 10         # updates in the rolling validation score
+MAX_NEW_FRACTION = 0.5      # new runs since the last full retrain / its training rows
+
+DRIFT_MAE_RATIO = 1.5       # regressor: rolling MAE > ratio x baseline MAE
+DRIFT_ACC_DROP = 0.15       # classifiers: rolling accuracy < baseline - drop
+
+# name -> what the training scripts save for it
+MODELS = {
+    "hr_model": {"kind": "regressor", "target": reg.TARGET, "features": reg.FEATURES,
+                 "model": reg.MODEL_OUTPUT_PATH, "metrics": reg.METRICS_OUTPUT_PATH},
+    "HR_Class": {"kind": "classifier", "target": "HR_Class", "features": clf.FEATURES,
+                 "model": clf.MODEL_HR, "metrics": clf.METRIC_HR},
+    "RR_Class": {"kind": "classifier", "target": "RR_Class", "features": clf.FEATURES,
+                 "model": clf.MODEL_RR, "metrics": clf.METRIC_RR},
+    "Stress_Class": {"kind": "classifier", "target": "Stress_Class", "features": clf.FEATURES,
+                     "model": clf.MODEL_STRESS, "metrics": clf.METRIC_STRESS},
+}
+
+
+# ==========================================================
+# STATE (watermark + rolling validation)
+# ==========================================================
+def load_state():
+    try:
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_state(state):
+    tmp = STATE_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, STATE_FILE)
+
+
+def rolling_score(history):
+    """Run-weighted mean of the last ROLLING_WINDOW update scores (None if none yet)."""
+    n = sum(h["runs"] for h in history)
+    return sum(h["score"] * h["runs"] for h in history) / n if n else None
+
+
+def drifted(spec, entry):
+    rolling, baseline = rolling_score(entry["history"]), entry.get("baseline")
+    if rolling is None or baseline is None:
+        return False
+    if spec["kind"] == "regressor":
+        return rolling > baseline * DRIFT_MAE_RATIO
+    return rolling < baseline - DRIFT_ACC_DROP
+
+
+# ==========================================================
+# DATA
+# ==========================================================
+def load_data():
+    """{name: cleaned DataFrame} as each training script sees it, Run as a number."""
+    df_reg = reg.load_training_data()
+    df_clf = clf.load_and_clean()
+    out = {}
+    for name, spec in MODELS.items():
+        df = (df_reg if spec["kind"] == "regressor" else df_clf).copy()
+        df["Run"] = df["Run"].astype(float)
+        out[name] = df.sort_values("Run", kind="stable")
+    return out
+
+
+def encoded_targets(df, target, encoders):
+    """Class labels -> the saved integer codes (None if a label is new)."""
+    mapping = encoders[target]["mapping"]
+    if not set(df[target]).issubset(mapping):
+        return None
+    return df[target].map(mapping).to_numpy(dtype=int)
+
+
+def score(pipeline, spec, X, y):
+    pred = np.asarray(pipeline.predict(X))
+    if spec["kind"] == "regressor":
+        return float(np.mean(np.abs(pred.reshape(-1) - y)))
+    if pred.ndim == 2:
+        pred = pred.argmax(axis=1)          # see clean_pred in predict_with_model.py
+    return float(np.mean(pred.astype(int) == y))
+
+
+# ==========================================================
+# FULL RETRAIN
+# ==========================================================
+def baseline_score(spec):
+    with open(spec["metrics"]) as f:
+        metrics = json.load(f)
+    return metrics["MAE"] if spec["kind"] == "regressor" else metrics["accuracy"]
+
+
+def full_retrain(data, reason):
+    print(f"🔁 Full retrain ({reason})")
+    reg.train_hr_model()
+    clf.train_all()
+
+    state = {"watermark": max(float(df["Run"].max()) for df in data.values()),
+             "full_retrain": time.strftime("%Y-%m-%d %H:%M:%S"),
+             "reason": reason, "models": {}}
+    for name, spec in MODELS.items():
+        model = joblib.load(spec["model"]).steps[-1][1]
+        state["models"][name] = {
+            "baseline": baseline_score(spec),
+            "history": [],
+            "trained_rows": len(data[name]),
+            "new_rows": 0,
+            "increments": 0,
+            "trees": model.get_booster().num_boosted_rounds(),
+        }
+    save_state(state)
+    print(f"✔ Watermark → Run {state['watermark']:.0f}")
+    return state
+
+
+# ==========================================================
+# INCREMENTAL UPDATE
+# ==========================================================
+def continue_boosting(pipeline, X, y, rounds=INCREMENT_ROUNDS):
+    """Add `rounds` trees to the pipeline's booster, fitted on (X, y) through the saved imputer / scaler."""
+    imputer, scaler, model = pipeline.steps[0][1], pipeline.steps[1][1], pipeline.steps[-1][1]
+    Xt = scaler.transform(imputer.transform(X))
+    model.set_params(n_estimators=rounds)
+    model.fit(Xt, y, xgb_model=model.get_booster())
+    return model.get_booster().num_boosted_rounds()
+
+
+def replay_window(df, new_mask, y, n_classes):
+    """New rows + the REPLAY_RUNS rows before them, plus the latest row of any class still missing."""
+    old_idx = np.flatnonzero(~new_mask)
+    keep = np.zeros(len(df), dtype=bool)
+    keep[new_mask] = True
+    keep[old_idx[-REPLAY_RUNS:]] = True
+    if n_classes:
+        for c in set(range(n_classes)) - set(y[keep]):
+            rows = old_idx[y[old_idx] == c]
+            if len(rows) == 0:
+                return None
+            keep[rows[-1]] = True
+    return keep
+
+
+def save_pipeline(pipeline, spec):
+    tmp = spec["model"] + ".tmp"
+    joblib.dump(pipeline, tmp)
+    os.replace(tmp, spec["model"])
+    export_pipeline(pipeline, os.path.splitext(spec["model"])[0] + ".npz", spec["features"])
+
+
+def update(force_full=False):
+    data = load_data()
+    state = load_state()
+
+    missing = [name for name, spec in MODELS.items() if not os.path.exists(spec["model"])]
+    if force_full or state is None or missing:
+        return full_retrain(data, "forced" if force_full else
+                            "no training state" if state is None else "missing " + ", ".join(missing))
+
+    watermark = state["watermark"]
+    new_runs = {name: df["Run"].to_numpy() > watermark for name, df in data.items()}
+    if not any(mask.any() for mask in new_runs.values()):
+        print(f"✔ Models up to date (watermark Run {watermark:.0f})")
+        return state
+
+    with open(clf.ENCODER_FILE) as f:
+        encoders = json.load(f)
+
+    # ---- test-then-train: score the current models on the runs they have not seen ----
+    pipelines, targets, reasons = {}, {}, []
+    for name, spec in MODELS.items():
+        df, mask, entry = data[name], new_runs[name], state["models"][name]
+        if spec["kind"] == "regressor":
+            y = df[spec["target"]].to_numpy(dtype=float)
+        else:
+            y = encoded_targets(df, spec["target"], encoders)
+            if y is None:
+                reasons.append(f"new {spec['target']} label")
+                continue
+        targets[name] = y
+        if not mask.any():
+            continue
+        pipelines[name] = joblib.load(spec["model"])
+        X = df[spec["features"]].to_numpy(dtype=float)
+        s = score(pipelines[name], spec, X[mask], y[mask])
+        entry["history"] = (entry["history"] + [{"runs": int(mask.sum()), "score": s}])[-ROLLING_WINDOW:]
+        entry["new_rows"] += int(mask.sum())
+        print(f"📊 {name}: {'MAE' if spec['kind'] == 'regressor' else 'accuracy'} on {int(mask.sum())} new runs "
+              f"{s:.3f} (rolling {rolling_score(entry['history']):.3f}, baseline {entry['baseline']:.3f})")
+        if drifted(spec, entry):
+            reasons.append(f"{name} drift")
+        if entry["new_rows"] > MAX_NEW_FRACTION * entry["trained_rows"]:
+            reasons.append(f"{name}: {entry['new_rows']} runs since the last full retrain")
+
+    if reasons:
+        return full_retrain(data, "; ".join(reasons))
+
+    # ---- continue boosting on new + replayed runs ----
+    for name, pipeline in pipelines.items():
+        spec, df, entry = MODELS[name], data[name], state["models"][name]
+        model = pipeline.steps[-1][1]
+        n_classes = len(model.classes_) if spec["kind"] == "classifier" else 0
+        keep = replay_window(df, new_runs[name], targets[name], n_classes)
+        if keep is None:
+            return full_retrain(data, f"{name}: a class has no runs to replay")
+        X = df[spec["features"]].to_numpy(dtype=float)
+        t0 = time.perf_counter()
+        entry["trees"] = continue_boosting(pipeline, X[keep], targets[name][keep])
+        save_pipeline(pipeline, spec)
+        entry["increments"] += 1
+        print(f"✔ {name}: +{INCREMENT_ROUNDS} trees on {int(keep.sum())} runs "
+              f"({int(new_runs[name].sum())} new) → {entry['trees']} trees, {time.perf_counter() - t0:.2f} s")
+
+    state["watermark"] = max(float(df["Run"].max()) for df in data.values())
+    save_state(state)
+    print(f"✔ Watermark → Run {state['watermark']:.0f}")
+    return state
+
+
+# ==========================================================
+# MAIN
+# ==========================================================
+if __name__ == "__main__":
+    if "--status" in sys.argv:
+        state = load_state()
+        if state is None:
+            print("No training state yet (next update is a full retrain)")
+        else:
+            for name, entry in state["models"].items():
+                entry["rolling"] = rolling_score(entry["history"])
+            print(json.dumps(state, indent=2))
+    else:
+        update(force_full="--full" in sys.argv)
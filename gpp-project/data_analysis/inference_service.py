@@ -0,0 +1,231 @@
+# inference_service.py
+"""
+Resident inference for a long-running process (the pipeline API).
+
+predict_with_model.py pays for the xgboost / sklearn imports, four joblib loads, the
+label encodings and a full parse of final_run_stats_new.csv on every launch. An
+InferenceService keeps all of that loaded and only redoes a piece when its file
+changes on disk (size / mtime), so:
+    - a retrain (train_hr_model.py / train_hr_classifier.py) is picked up by the next
+      request without restarting the API; the compact .npz exports are preferred over
+      the .joblib pipelines when they are fresh (predict_with_model.model_files)
+    - a cleaning run that appends to final_run_stats_new.csv re-indexes the runs once
+    - everything else answers from memory in about a millisecond
+
+A model file that fails to load (e.g. caught half-written by a training run) keeps
+the previously loaded model in service and is retried on the next request.
+
+Usage:
+    service = get_service()
+    service.predict_latest()               # same dict predict_with_model.py prints
+    service.predict_run(42)                # by the Run column
+    service.predict([...10 values...])     # FEATURES order, or a {feature: value} dict
+    service.predict_batch(since=120)       # many runs, one call per model (see predict_with_model.py)
+    service.status()                       # load times, reload counts, errors
+
+Cold vs warm latency:
+    python inference_service.py [--repeat 200]
+"""
+
+import os
+import sys
+import threading
+import time
+
+from predict_with_model import (FEATURES, FINAL_STATS_FILE, ENCODER_FILE, PREDICTIONS_FILE,
+                                model_files, load_model, load_encoders, predict_features, read_runs, latest_row,
+                                row_features, run_records, select_runs, score_runs,
+                                prediction_watermark, write_predictions)
+
+
+def file_state(path):
+    try:
+        st = os.stat(path)
+        return (st.st_size, st.st_mtime_ns)
+    except OSError:
+        return None
+
+
+class InferenceService:
+    def __init__(self, model_files=None, encoder_file=ENCODER_FILE, stats_file=FINAL_STATS_FILE):
+        """model_files: {name: path}; None picks compact / joblib per model on every refresh."""
+        self.model_files = dict(model_files) if model_files else None
+        self.encoder_file = encoder_file
+        self.stats_file = stats_file
+
+        self.models = {}            # name -> loaded pipeline / CompactModel
+        self._paths = {}            # name -> file it is loaded from
+        self.encoders = None
+        self._runs = None           # {"records": [(run, ts, features)], "run": {run: features}, "latest": features}
+        self._stamps = {}           # path -> file_state() of what is loaded
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()     # predictions file: read-merge-replace
+
+        self.loads = 0              # file (re)loads, models + encoders + stats
+        self.load_sec = 0.0
+        self.errors = {}            # path -> last load error
+        self.requests = 0
+
+    # -----------------------------
+    # Hot reload
+    # -----------------------------
+    def _changed(self, path):
+        state = file_state(path)
+        return state is not None and state != self._stamps.get(path), state
+
+    def _load(self, path, state, loader):
+        t0 = time.perf_counter()
+        try:
+            value = loader(path)
+        except Exception as e:
+            self.errors[path] = str(e)
+            return None
+        self.load_sec += time.perf_counter() - t0
+        self.loads += 1
+        self._stamps[path] = state
+        self.errors.pop(path, None)
+        return value
+
+    def refresh(self):
+        """(Re)load whatever changed on disk since it was loaded. Cheap when nothing did."""
+        with self._lock:
+            models = None
+            self._paths = self.model_files or model_files()
+            for name, path in self._paths.items():
+                changed, state = self._changed(path)
+                if not changed:
+                    continue
+                model = self._load(path, state, load_model)
+                if model is not None:
+                    models = models or dict(self.models)
+                    models[name] = model
+            if models is not None:
+                self.models = models            # swapped whole: readers never see a mix
+
+            changed, state = self._changed(self.encoder_file)
+            if changed:
+                enc = self._load(self.encoder_file, state, load_encoders)
+                if enc is not None:
+                    self.encoders = enc
+
+            changed, state = self._changed(self.stats_file)
+            if changed:
+                runs = self._load(self.stats_file, state, self._index_runs)
+                if runs is not None:
+                    self._runs = runs
+
+        missing = [name for name in self._paths if name not in self.models]
+        if missing or self.encoders is None:
+            raise RuntimeError("Models not loaded: {} {}".format(
+                missing or "", "encoders" if self.encoders is None else "").strip()
+                + "".join(" ({}: {})".format(os.path.basename(p), e) for p, e in self.errors.items()))
+
+    @staticmethod
+    def _index_runs(path):
+        header, rows = read_runs(path)
+        records = run_records(header, rows)
+        return {"records": records, "run": {run: features for run, _, features in records},
+                "latest": row_features(header, latest_row(header, rows))}
+
+    # -----------------------------
+    # Predictions
+    # -----------------------------
+    def predict(self, features):
+        """features: FEATURES values in order, or a dict keyed by feature name (missing -> NaN)."""
+        if isinstance(features, dict):
+            features = [features.get(name, float("nan")) for name in FEATURES]
+        features = [float("nan") if v is None else float(v) for v in features]
+        if len(features) != len(FEATURES):
+            raise ValueError("Expected {} features ({}), got {}".format(
+                len(FEATURES), ", ".join(FEATURES), len(features)))
+        self.refresh()
+        self.requests += 1
+        return predict_features(self.models, self.encoders, features)
+
+    def run_features(self, run=None):
+        """FEATURES of one run (None = latest, as predict_with_model.py picks it)."""
+        self.refresh()
+        if self._runs is None:
+            raise ValueError("No runs in {} ({})".format(self.stats_file, self.errors.get(self.stats_file, "missing")))
+        if run is None:
+            return self._runs["latest"]
+        try:
+            return self._runs["run"][int(run)]
+        except KeyError:
+            raise KeyError("No run {} in {}".format(run, os.path.basename(self.stats_file)))
+
+    def predict_run(self, run):
+        return self.predict(self.run_features(run))
+
+    def predict_latest(self):
+        return self.predict(self.run_features())
+
+    def predict_batch(self, runs=None, since=None, new_only=True, write=True, out=PREDICTIONS_FILE):
+        """
+        Score many runs with one call per model. runs / since pick them; with neither,
+        new_only scores the runs after the predictions file's watermark. write merges
+        the rows into PREDICTIONS_FILE. Returns {"scored", "since", "predictions": [...]}.
+        """
+        self.refresh()
+        if self._runs is None:
+            raise ValueError("No runs in {} ({})".format(self.stats_file, self.errors.get(self.stats_file, "missing")))
+        with self._write_lock:
+            if runs is None and since is None and new_only:
+                since = prediction_watermark(out)
+            records = select_runs(self._runs["records"], runs, since)
+            scored = score_runs(self.models, self.encoders, records)
+            if write and scored:
+                write_predictions(scored, out)
+        self.requests += 1
+        return {"scored": len(scored), "since": since, "predictions": scored}
+
+    def status(self):
+        return {
+            "models": {name: os.path.basename(path) for name, path in sorted(self._paths.items())},
+            "encoders": self.encoders is not None,
+            "runs": len(self._runs["run"]) if self._runs else 0,
+            "loads": self.loads,
+            "load_sec": round(self.load_sec, 3),
+            "requests": self.requests,
+            "errors": {os.path.basename(p): e for p, e in self.errors.items()},
+        }
+
+
+# -----------------------------
+# One service per process
+# -----------------------------
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_service(**kwargs):
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = InferenceService(**kwargs)
+        return _service
+
+
+# -----------------------------
+# Cold vs warm latency: python inference_service.py [--repeat N]
+# -----------------------------
+if __name__ == "__main__":
+    import json
+
+    repeat = int(sys.argv[sys.argv.index("--repeat") + 1]) if "--repeat" in sys.argv else 200
+
+    t0 = time.perf_counter()
+    service = InferenceService()
+    first = service.predict_latest()
+    cold = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        out = service.predict_latest()
+    warm = (time.perf_counter() - t0) / repeat
+    assert out == first
+
+    print(json.dumps(first))
+    print("cold (imports + load + predict): {:8.1f} ms".format(cold * 1e3))
+    print("warm (stat check + predict)    : {:8.2f} ms  ({} requests)".format(warm * 1e3, repeat))
+    print(json.dumps(service.status()))
@@ -1,10 +1,17 @@
 import os
-import pandas as pd
-import numpy as np
-import joblib
+import csv
 import json
 import sys
 
+# numpy / joblib (and the sklearn / xgboost they pull in) are imported inside the
+# functions that need them; pandas is not needed at all, even for batch scoring
+#
+#   python predict_with_model.py                    latest run -> JSON on stdout
+#   python predict_with_model.py --batch            every run not yet in PREDICTIONS_FILE
+#   python predict_with_model.py --batch --all      re-score every run
+#   python predict_with_model.py --batch --since 120 | --runs 3 4 5
+#   --joblib                                        ignore the compact .npz exports
+
 BASE_DIR = r"C:\Users\Nikhil\Downloads\SSN\College Files\Grand Project\RespirationHealth\gpp-project\data_analysis"
 
 FINAL_STATS_FILE = os.path.join(BASE_DIR, "final_run_stats_new.csv")
@@ -16,6 +23,23 @@ MODEL_ST = os.path.join(BASE_DIR, "stress_class_model.joblib")
 
 ENCODER_FILE = os.path.join(BASE_DIR, "class_label_encodings.json")
 
+# batch predictions, one row per Run, kept next to the stats file (which cleaning_data.py
+# appends to, so its columns cannot change)
+PREDICTIONS_FILE = os.path.join(BASE_DIR, "final_run_stats_predictions.csv")
+PREDICTION_COLUMNS = ["Run", "Timestamp", "Predicted_HR", "Pred_HR_Class", "Pred_RR_Class", "Pred_Stress_Class"]
+
+# name -> joblib file, in the order the models are applied
+MODEL_FILES = {
+    "hr_model": HR_MODEL_FILE,
+    "hr_class_model": MODEL_HR,
+    "rr_class_model": MODEL_RR,
+    "stress_class_model": MODEL_ST,
+}
+
+# NumPy-only exports written by the training scripts (compact_model.py); used instead of
+# the .joblib when at least as new, so a cold start skips the sklearn / xgboost imports
+COMPACT_FILES = {name: os.path.splitext(path)[0] + ".npz" for name, path in MODEL_FILES.items()}
+
 FEATURES = [
     "Avg_HR_clean", "Avg_RR_clean", "Avg_Range",
     "Range_SD", "HR_SD", "RR_SD",
@@ -39,6 +63,8 @@ def clean_pred(v):
       - list of probas
     """
 
+    import numpy as np
+
     # 1️⃣ Direct integer
     if isinstance(v, (int, np.integer)):
         return int(v)
@@ -71,12 +97,82 @@ def clean_pred(v):
     raise ValueError(f"Unknown prediction type: {type(v)}, value={v}")
 
 
+# --------------------------------------------------------
+# LATEST RUN (csv module: first-occurrence dedupe + stable sort on Timestamp)
+# --------------------------------------------------------
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def read_runs(path=FINAL_STATS_FILE):
+    """(header, rows) with exact duplicate rows dropped, file order kept."""
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        seen = set()
+        rows = []
+        for row in reader:
+            key = tuple(row)
+            if key not in seen:
+                seen.add(key)
+                rows.append(row)
+    if not rows:
+        raise ValueError(f"No runs in {path}")
+    return header, rows
+
+
+def latest_row(header, rows):
+    ts_col = header.index("Timestamp")
+    return sorted(rows, key=lambda r: r[ts_col])[-1]
+
+
+def row_features(header, row):
+    return [_to_float(row[header.index(name)]) for name in FEATURES]
+
+
+def latest_run_features(path=FINAL_STATS_FILE):
+    header, rows = read_runs(path)
+    return row_features(header, latest_row(header, rows))
+
+
+def run_records(header, rows):
+    """[(run id, timestamp, features)] in file order; rows without a numeric Run are skipped."""
+    run_col = header.index("Run")
+    ts_col = header.index("Timestamp")
+    cols = [header.index(name) for name in FEATURES]
+    out = []
+    for row in rows:
+        try:
+            run = int(float(row[run_col]))
+        except ValueError:
+            continue
+        out.append((run, row[ts_col], [_to_float(row[c]) for c in cols]))
+    return out
+
+
+def select_runs(records, runs=None, since=None):
+    """Records with Run in runs (that order), or Run > since, or all of them."""
+    if runs is not None:
+        by_id = {r[0]: r for r in records}
+        missing = [run for run in runs if run not in by_id]
+        if missing:
+            raise KeyError(f"No run {', '.join(map(str, missing))} in {os.path.basename(FINAL_STATS_FILE)}")
+        return [by_id[run] for run in runs]
+    if since is not None:
+        return [r for r in records if r[0] > since]
+    return list(records)
+
+
 
 # --------------------------------------------------------
 # LOAD LABEL ENCODERS
 # --------------------------------------------------------
-def load_encoders():
-    enc = json.load(open(ENCODER_FILE))
+def load_encoders(path=ENCODER_FILE):
+    with open(path) as f:
+        enc = json.load(f)
 
     fixed = {}
 
@@ -100,29 +196,45 @@ def load_encoders():
 # --------------------------------------------------------
 # MAIN INFERENCE
 # --------------------------------------------------------
-def inference_from_latest_run():
-    df = pd.read_csv(FINAL_STATS_FILE).drop_duplicates()
-    df = df.sort_values("Timestamp")
-    latest = df.iloc[-1]
+def model_files(prefer_compact=True):
+    """Per model: the compact export if it is at least as new as its .joblib, else the .joblib."""
+    files = {}
+    for name, path in MODEL_FILES.items():
+        compact = COMPACT_FILES[name]
+        try:
+            fresh = prefer_compact and os.path.getmtime(compact) >= os.path.getmtime(path)
+        except OSError:
+            fresh = prefer_compact and os.path.exists(compact) and not os.path.exists(path)
+        files[name] = compact if fresh else path
+    return files
 
-    X = latest[FEATURES].astype(float).values.reshape(1, -1)
 
-    # Regression
-    reg_model = joblib.load(HR_MODEL_FILE)
-    hr_pred = float(reg_model.predict(X)[0])
+def load_model(path):
+    if path.endswith(".npz"):
+        from compact_model import CompactModel
+        return CompactModel.load(path)
+    import joblib
+    return joblib.load(path)
+
+
+def load_models(files=None):
+    files = files or model_files("--joblib" not in sys.argv)
+    return {name: load_model(path) for name, path in files.items()}
+
+
+def predict_features(models, enc, features):
+    """One run's FEATURES values -> the result dict printed by this script."""
+    import numpy as np
 
-    # Encoders
-    enc = load_encoders()
+    X = np.array(features, dtype=float).reshape(1, -1)
 
-    # Classifier models
-    hr_model = joblib.load(MODEL_HR)
-    rr_model = joblib.load(MODEL_RR)
-    st_model = joblib.load(MODEL_ST)
+    # Regression
+    hr_pred = float(models["hr_model"].predict(X)[0])
 
     # Clean predictions
-    hr_code = clean_pred(hr_model.predict(X))
-    rr_code = clean_pred(rr_model.predict(X))
-    st_code = clean_pred(st_model.predict(X))
+    hr_code = clean_pred(models["hr_class_model"].predict(X))
+    rr_code = clean_pred(models["rr_class_model"].predict(X))
+    st_code = clean_pred(models["stress_class_model"].predict(X))
 
     # Decode
     hr_label = enc["HR_Class"].get(hr_code, "Unknown")
@@ -137,12 +249,127 @@ def inference_from_latest_run():
     }
 
 
+def clean_codes(v, n):
+    """Vector clean_pred: (n,) int codes from labels, (n, 1) labels or (n, k) probabilities."""
+    import numpy as np
+
+    arr = np.asarray(v)
+    if arr.ndim == 2 and arr.shape[1] > 1 and arr.dtype.kind == "f":
+        return arr.argmax(axis=1)
+    arr = arr.reshape(-1)
+    if len(arr) != n:
+        raise ValueError(f"Expected {n} predictions, got {len(arr)}")
+    return arr.astype(int)
+
+
+def decode_codes(codes, inv):
+    """Encoded ints -> labels in one lookup (unknown codes -> "Unknown")."""
+    import numpy as np
+
+    size = max(inv) + 1 if inv else 0
+    table = np.array([inv.get(i, "Unknown") for i in range(size)] + ["Unknown"], dtype=object)
+    return table[np.where((codes >= 0) & (codes < size), codes, size)]
+
+
+def predict_matrix(models, enc, X):
+    """(N, len(FEATURES)) matrix -> {key: (N,) array}; every model is called once."""
+    import numpy as np
+
+    X = np.asarray(X, dtype=float).reshape(-1, len(FEATURES))
+    n = len(X)
+    return {
+        "Predicted_HR": np.round(np.asarray(models["hr_model"].predict(X), dtype=float).reshape(-1), 2),
+        "HR_Class": decode_codes(clean_codes(models["hr_class_model"].predict(X), n), enc["HR_Class"]),
+        "RR_Class": decode_codes(clean_codes(models["rr_class_model"].predict(X), n), enc["RR_Class"]),
+        "Stress_Class": decode_codes(clean_codes(models["stress_class_model"].predict(X), n), enc["Stress_Class"]),
+    }
+
+
+def score_runs(models, enc, records):
+    """[(run, timestamp, features)] -> prediction rows (PREDICTION_COLUMNS)."""
+    if not records:
+        return []
+    pred = predict_matrix(models, enc, [r[2] for r in records])
+    return [
+        {"Run": run, "Timestamp": ts, "Predicted_HR": float(pred["Predicted_HR"][i]),
+         "Pred_HR_Class": pred["HR_Class"][i], "Pred_RR_Class": pred["RR_Class"][i],
+         "Pred_Stress_Class": pred["Stress_Class"][i]}
+        for i, (run, ts, _) in enumerate(records)
+    ]
+
+
+# --------------------------------------------------------
+# PREDICTIONS FILE (merged by Run, rewritten atomically)
+# --------------------------------------------------------
+def read_predictions(path=PREDICTIONS_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, newline="") as f:
+        return {int(row["Run"]): row for row in csv.DictReader(f)}
+
+
+def prediction_watermark(path=PREDICTIONS_FILE):
+    """Highest Run already scored (None if nothing was)."""
+    existing = read_predictions(path)
+    return max(existing) if existing else None
+
+
+def write_predictions(scored, path=PREDICTIONS_FILE):
+    """Insert / replace the scored runs; returns the number of rows in the file."""
+    merged = read_predictions(path)
+    for row in scored:
+        merged[int(row["Run"])] = row
+    tmp = path + ".tmp"
+    with open(tmp, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=PREDICTION_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        for run in sorted(merged):
+            writer.writerow(merged[run])
+    os.replace(tmp, path)
+    return len(merged)
+
+
+def batch_inference(runs=None, since=None, new_only=True, path=FINAL_STATS_FILE, out=PREDICTIONS_FILE):
+    """
+    Score several runs in one call per model and merge them into the predictions file.
+    runs / since pick the runs; with neither, new_only scores the runs after the
+    predictions file's watermark and new_only=False re-scores everything.
+    """
+    if runs is None and since is None and new_only:
+        since = prediction_watermark(out)
+    header, rows = read_runs(path)
+    records = select_runs(run_records(header, rows), runs, since)
+    scored = score_runs(load_models(), load_encoders(), records) if records else []
+    total = write_predictions(scored, out) if scored else len(read_predictions(out))
+    return {"scored": len(scored), "runs": [r["Run"] for r in scored], "since": since,
+            "total": total, "file": out}
+
+
+def inference_from_latest_run():
+    # one-shot: the API keeps these loaded instead (inference_service.py)
+    return predict_features(load_models(), load_encoders(), latest_run_features())
+
+
 # --------------------------------------------------------
 # RUN
 # --------------------------------------------------------
+def _int_list(flag):
+    values = []
+    for a in sys.argv[sys.argv.index(flag) + 1:]:
+        if a.startswith("--"):
+            break
+        values.append(int(a))
+    return values
+
+
 if __name__ == "__main__":
     try:
-        out = inference_from_latest_run()
+        if "--batch" in sys.argv:
+            out = batch_inference(runs=_int_list("--runs") if "--runs" in sys.argv else None,
+                                  since=int(sys.argv[sys.argv.index("--since") + 1]) if "--since" in sys.argv else None,
+                                  new_only="--all" not in sys.argv)
+        else:
+            out = inference_from_latest_run()
         print(json.dumps(out))
     except Exception as e:
         print("FATAL_ERROR:", str(e))
@@ -1,5 +1,7 @@
 import os
+import sys
 import json
+import time
 import warnings
 warnings.filterwarnings("ignore")
 
@@ -14,6 +16,9 @@ from sklearn.pipeline import Pipeline
 
 from xgboost import XGBClassifier
 import joblib
+from concurrent.futures import ProcessPoolExecutor
+
+from compact_model import export_pipeline
 
 # ==========================================================
 # PATHS
@@ -31,6 +36,9 @@ METRIC_HR = os.path.join(BASE_DIR, "hr_class_metrics.json")
 METRIC_RR = os.path.join(BASE_DIR, "rr_class_metrics.json")
 METRIC_STRESS = os.path.join(BASE_DIR, "stress_class_metrics.json")
 
+# wall / fit time per target of the last train_all()
+TIMING_FILE = os.path.join(BASE_DIR, "class_training_timing.json")
+
 # ==========================================================
 # FEATURES & TARGETS
 # ==========================================================
@@ -42,6 +50,13 @@ FEATURES = [
 
 TARGETS = ["HR_Class", "RR_Class", "Stress_Class"]
 
+# target -> (model file, metrics file)
+TRAIN_JOBS = {
+    "HR_Class": (MODEL_HR, METRIC_HR),
+    "RR_Class": (MODEL_RR, METRIC_RR),
+    "Stress_Class": (MODEL_STRESS, METRIC_STRESS),
+}
+
 
 # ==========================================================
 # LOAD + CLEAN
@@ -61,7 +76,9 @@ def load_and_clean():
 # ==========================================================
 # TRAIN SINGLE CLASSIFIER
 # ==========================================================
-def train_single_classifier(df, target, save_model, save_metrics, encoders):
+def train_single_classifier(df, target, save_model, save_metrics, encoders, n_jobs=None):
+    """Train + save one target; n_jobs = xgboost threads (None = all cores). Returns timings."""
+    t0 = time.perf_counter()
 
     print("\n================================")
     print(f"🚀 Training model for {target}")
@@ -100,12 +117,15 @@ def train_single_classifier(df, target, save_model, save_metrics, encoders):
             objective="multi:softprob",
             num_class=len(le.classes_),
             eval_metric="mlogloss",
-            random_state=42
+            random_state=42,
+            n_jobs=n_jobs
         ))
     ])
 
     # Train model
+    t_fit = time.perf_counter()
     model.fit(X_train, y_train)
+    fit_sec = time.perf_counter() - t_fit
 
     # ==========================================
     # CORRECT PREDICT_PROBA EXTRACTION
@@ -129,32 +149,95 @@ def train_single_classifier(df, target, save_model, save_metrics, encoders):
     joblib.dump(model, save_model)
     print(f"✔ Saved model → {save_model}")
 
+    # NumPy-only copy for inference (predict_with_model.py prefers it when fresh)
+    compact_path = os.path.splitext(save_model)[0] + ".npz"
+    export_pipeline(model, compact_path, FEATURES)
+    print(f"✔ Saved compact model → {compact_path}")
+
     # Save metrics
     with open(save_metrics, "w") as f:
         json.dump(rep, f, indent=2)
     print(f"✔ Saved metrics → {save_metrics}")
 
+    return {
+        "fit_sec": round(fit_sec, 3),
+        "total_sec": round(time.perf_counter() - t0, 3),
+        "n_train": len(X_train),
+        "n_jobs": n_jobs,
+    }
+
 
 # ==========================================================
-# TRAIN ALL THREE MODELS
+# TRAIN ALL THREE MODELS (one process each, sharing the cleaned data)
 # ==========================================================
-def train_all():
-
-    df = load_and_clean()
+def _train_worker(df, target, save_model, save_metrics, n_jobs):
     encoders = {}
-
-    train_single_classifier(df, "HR_Class", MODEL_HR, METRIC_HR, encoders)
-    train_single_classifier(df, "RR_Class", MODEL_RR, METRIC_RR, encoders)
-    train_single_classifier(df, "Stress_Class", MODEL_STRESS, METRIC_STRESS, encoders)
-
+    timing = train_single_classifier(df, target, save_model, save_metrics, encoders, n_jobs)
+    timing["pid"] = os.getpid()
+    return encoders[target], timing
+
+
+def train_all(workers=None):
+    """
+    Load + clean final_run_stats_new.csv once, then train the targets in up to
+    `workers` processes (default: one per target, capped at the core count). Each
+    model gets cores // workers xgboost threads so they do not oversubscribe.
+    workers=1 trains in this process, one after another, on all cores.
+    """
+    t0 = time.perf_counter()
+    df = load_and_clean()
+    load_sec = time.perf_counter() - t0
+
+    cores = os.cpu_count() or 1
+    workers = max(1, min(workers or len(TRAIN_JOBS), len(TRAIN_JOBS), cores))
+    n_jobs = max(1, cores // workers)
+
+    results = {}
+    if workers == 1:
+        for target, (save_model, save_metrics) in TRAIN_JOBS.items():
+            results[target] = _train_worker(df, target, save_model, save_metrics, n_jobs)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                target: pool.submit(_train_worker, df[FEATURES + [target]], target,
+                                    save_model, save_metrics, n_jobs)
+                for target, (save_model, save_metrics) in TRAIN_JOBS.items()
+            }
+            results = {target: f.result() for target, f in futures.items()}
+
+    encoders = {target: enc for target, (enc, _) in results.items()}
     with open(ENCODER_FILE, "w") as f:
         json.dump(encoders, f, indent=2)
 
     print(f"\n✔ Saved encoders → {ENCODER_FILE}")
 
+    wall = time.perf_counter() - t0
+    fit_total = sum(timing["total_sec"] for _, timing in results.values())
+    report = {
+        "workers": workers,
+        "threads_per_model": n_jobs,
+        "cpu_count": cores,
+        "rows": len(df),
+        "load_sec": round(load_sec, 3),
+        "wall_sec": round(wall, 3),
+        "sum_model_sec": round(fit_total, 3),
+        # model seconds per wall second: ~workers when the pool overlaps well
+        "concurrency": round(fit_total / max(wall - load_sec, 1e-9), 2),
+        "models": {target: timing for target, (_, timing) in results.items()},
+    }
+    with open(TIMING_FILE, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"✔ Saved timing → {TIMING_FILE}")
+    print(f"⏱ {wall:.1f} s wall ({workers} workers x {n_jobs} threads), "
+          f"{fit_total:.1f} s of model training")
+    return report
+
 
 # ==========================================================
 # MAIN
 # ==========================================================
 if __name__ == "__main__":
-    train_all()
+    # python train_hr_classifier.py [--workers N]   (--workers 1 = sequential)
+    workers = int(sys.argv[sys.argv.index("--workers") + 1]) if "--workers" in sys.argv else None
+    train_all(workers)
@@ -14,6 +14,8 @@ from sklearn.impute import SimpleImputer
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import joblib
 import json
+
+from compact_model import export_pipeline
 import warnings
 
 warnings.filterwarnings("ignore")
@@ -25,6 +27,7 @@ BASE_DIR = r"C:\Users\Nikhil\Downloads\SSN\College Files\Grand Project\Respirati
 
 FINAL_STATS_FILE = os.path.join(BASE_DIR, "final_run_stats_new.csv")
 MODEL_OUTPUT_PATH = os.path.join(BASE_DIR, "hr_model.joblib")
+COMPACT_OUTPUT_PATH = os.path.join(BASE_DIR, "hr_model.npz")      # NumPy-only copy for inference
 METRICS_OUTPUT_PATH = os.path.join(BASE_DIR, "hr_model_metrics.json")
 
 # ORDER MUST MATCH calibration.py
@@ -39,9 +42,9 @@ TARGET = "Final_Accurate_HR"
 RANDOM_STATE = 42
 
 # ----------------------------------------------------
-# TRAINING FUNCTION
+# LOAD + CLEAN
 # ----------------------------------------------------
-def train_hr_model():
+def load_training_data():
     print("📌 Loading dataset:", FINAL_STATS_FILE)
     df = pd.read_csv(FINAL_STATS_FILE)
 
@@ -56,6 +59,14 @@ def train_hr_model():
     # Remove missing target rows
     df = df.dropna(subset=[TARGET])
     df = df.dropna(subset=FEATURES)
+    return df
+
+
+# ----------------------------------------------------
+# TRAINING FUNCTION
+# ----------------------------------------------------
+def train_hr_model():
+    df = load_training_data()
 
     X = df[FEATURES]
     y = df[TARGET]
@@ -124,6 +135,8 @@ def train_hr_model():
     # Save model
     joblib.dump(pipeline, MODEL_OUTPUT_PATH)
     print("✔ Model saved at:", MODEL_OUTPUT_PATH)
+    export_pipeline(pipeline, COMPACT_OUTPUT_PATH, FEATURES)
+    print("✔ Compact model saved at:", COMPACT_OUTPUT_PATH)
 
     # Save metrics
     with open(METRICS_OUTPUT_PATH, "w") as f:
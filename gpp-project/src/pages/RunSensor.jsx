@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 
 function ErrorPopup({ message, onClose, title = "Message" }) {
   if (!message) return null;
@@ -56,6 +56,12 @@ function RunSensor() {
   const [rrClass, setRrClass] = useState(null);
   const [stressClass, setStressClass] = useState(null);
 
+  // LIVE READINGS (server-sent events while the sensor is acquiring)
+  const liveLine = useRef("");
+  const liveSource = useRef(null);
+
+  useEffect(() => () => liveSource.current && liveSource.current.close(), []);
+
   const userEmail = localStorage.getItem("loggedUser");
 
 const handleRunSensor = () => {
@@ -85,22 +91,9 @@ const handleRunSensor = () => {
   })
     .then((res) => res.json())
     .then((data) => {
-      if (data.success) {
-
-        // ---- SHOW SUMMARY POPUP ----
-        setPopupTitle("Vital Signs Summary");
-        setPopupMessage(data.stats_text);
-
-        // ---- SHOW ML RESULTS ON SCREEN ----
-        if (data.ml_results) {
-          const r = data.ml_results;
-
-          setPredictedHR(r.Predicted_HR);
-          setHrClass(r.HR_Class);
-          setRrClass(r.RR_Class);
-          setStressClass(r.Stress_Class);
-        }
-
+      if (data.success && data.job_id) {
+        openLiveStream(data.job_id);
+        pollJob(data.job_id);
       } else {
         setPopupTitle("Sensor Error!");
         setPopupMessage(data.error || "Unknown error occurred while running sensor.");
@@ -112,6 +105,73 @@ const handleRunSensor = () => {
     });
 };
 
+// Live HR / RR / range while acquiring (rate-limited server side)
+const openLiveStream = (jobId) => {
+  if (liveSource.current) liveSource.current.close();
+  liveLine.current = "";
+  const source = new EventSource(`http://localhost:5002/jobs/${jobId}/live?max_rate=2`);
+  source.onmessage = (e) => {
+    const s = JSON.parse(e.data);
+    liveLine.current =
+      `HR ${s.hr.toFixed(1)} bpm | RR ${s.rr.toFixed(1)} bpm | ` +
+      `Range ${s.range.toFixed(2)} m` + (s.sqi != null ? ` | SQI ${s.sqi.toFixed(0)}` : "");
+  };
+  source.addEventListener("end", () => source.close());
+  source.onerror = () => source.close();
+  liveSource.current = source;
+};
+
+// The sensor runs as a background job: poll its phase until the result is ready
+const pollJob = (jobId) => {
+  fetch(`http://localhost:5002/jobs/${jobId}`)
+    .then((res) => res.json())
+    .then((job) => {
+      if (job.phase === "done" || job.phase === "failed") {
+        liveLine.current = "";
+        return fetch(`http://localhost:5002/jobs/${jobId}/result`)
+          .then((res) => res.json())
+          .then(showSensorResult);
+      }
+      if (!job.phase) {
+        showSensorResult(job);
+        return;
+      }
+      setPopupTitle("Processing...");
+      setPopupMessage(
+        `${job.message || job.phase}\n${Math.round(job.percent)}% complete` +
+        (liveLine.current ? `\n\n${liveLine.current}` : "")
+      );
+      setTimeout(() => pollJob(jobId), 1000);
+    })
+    .catch(() => {
+      setPopupTitle("Connection Error!");
+      setPopupMessage("Lost connection to backend while the sensor was running.");
+    });
+};
+
+const showSensorResult = (data) => {
+  if (data.success) {
+
+    // ---- SHOW SUMMARY POPUP ----
+    setPopupTitle("Vital Signs Summary");
+    setPopupMessage(data.stats_text);
+
+    // ---- SHOW ML RESULTS ON SCREEN ----
+    if (data.ml_results) {
+      const r = data.ml_results;
+
+      setPredictedHR(r.Predicted_HR);
+      setHrClass(r.HR_Class);
+      setRrClass(r.RR_Class);
+      setStressClass(r.Stress_Class);
+    }
+
+  } else {
+    setPopupTitle("Sensor Error!");
+    setPopupMessage(data.error || "Unknown error occurred while running sensor.");
+  }
+};
+
 
 
   // COLOR FUNCTION ------------------------
@@ -1,11 +1,27 @@
 import serial
 import time
+T_START = time.perf_counter()
 import struct
 import csv
 import datetime
-import matplotlib
-matplotlib.use("TkAgg")
-import matplotlib.pyplot as plt
+import os
+import sys
+from collections import deque
+
+# --headless (or VITALS_HEADLESS=1): no GUI import, no redraws, trend plot saved as PNG at the end
+HEADLESS = "--headless" in sys.argv[1:] or os.environ.get("VITALS_HEADLESS") == "1"
+if not HEADLESS:
+    import matplotlib
+    matplotlib.use("TkAgg")
+    import matplotlib.pyplot as plt
+
+# shared acquisition helpers live in gpp-project/backend
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "gpp-project", "backend"))
+from frame_reader import FrameReader
+from tlv_decoder import decode_frame, VITALS_STRUCT
+from figure_worker import FigureWorker, render_trends
+from frame_clock import FrameClock
+from streaming_stats import RollingMean, RollingMinMax, SessionAggregator
 
 # -----------------------------
 # User Configurations
@@ -73,32 +89,35 @@ print("Configuration sent. Starting collection...\n")
 # -----------------------------
 # Prepare plotting
 # -----------------------------
-plt.ion()
-fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8))
+# plot ring buffers: last 200 points in the GUI, the whole session headless (for the PNG)
+PLOT_POINTS = None if HEADLESS else 200
+times, hr_values, rr_values = (deque(maxlen=PLOT_POINTS) for _ in range(3))
+session_stats = SessionAggregator(("hr", "rr"))
+if not HEADLESS:
+    plt.ion()
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8))
 
-# Heart rate plot
-times, hr_values = [], []
-hr_line, = ax1.plot([], [], 'r-', label="Heart Rate (BPM)", linewidth=2, marker='o', markersize=4)
-ax1.set_xlabel("Time (s)", fontsize=11)
-ax1.set_ylabel("Heart Rate (BPM)", fontsize=11)
-ax1.set_title("Heart Rate", fontsize=12, fontweight='bold')
-ax1.legend(fontsize=9)
-ax1.set_ylim(40, 120)
-ax1.grid(True, alpha=0.3)
+    # Heart rate plot
+    hr_line, = ax1.plot([], [], 'r-', label="Heart Rate (BPM)", linewidth=2, marker='o', markersize=4)
+    ax1.set_xlabel("Time (s)", fontsize=11)
+    ax1.set_ylabel("Heart Rate (BPM)", fontsize=11)
+    ax1.set_title("Heart Rate", fontsize=12, fontweight='bold')
+    ax1.legend(fontsize=9)
+    ax1.set_ylim(40, 120)
+    ax1.grid(True, alpha=0.3)
 
-# Respiration rate plot
-rr_values = []
-rr_line, = ax2.plot([], [], 'b-', label="Respiration Rate (BPM)", linewidth=2, marker='s', markersize=4)
-ax2.set_xlabel("Time (s)", fontsize=11)
-ax2.set_ylabel("Respiration Rate (BPM)", fontsize=11)
-ax2.set_title("Respiration Rate", fontsize=12, fontweight='bold')
-ax2.legend(fontsize=9)
-ax2.set_ylim(5, 30)
-ax2.grid(True, alpha=0.3)
+    # Respiration rate plot
+    rr_line, = ax2.plot([], [], 'b-', label="Respiration Rate (BPM)", linewidth=2, marker='s', markersize=4)
+    ax2.set_xlabel("Time (s)", fontsize=11)
+    ax2.set_ylabel("Respiration Rate (BPM)", fontsize=11)
+    ax2.set_title("Respiration Rate", fontsize=12, fontweight='bold')
+    ax2.legend(fontsize=9)
+    ax2.set_ylim(5, 30)
+    ax2.grid(True, alpha=0.3)
 
-fig.tight_layout()
-fig.canvas.draw()
-fig.canvas.flush_events()
+    fig.tight_layout()
+    fig.canvas.draw()
+    fig.canvas.flush_events()
 
 # -----------------------------
 # Main loop
@@ -108,215 +127,167 @@ packet_count = 0
 data_saved = 0
 last_valid_hr = None
 last_valid_rr = None
-range_history = []  # For smoothing range
+range_history = RollingMean(15)  # For smoothing range (average of the last 15 readings)
+hr_extent = RollingMinMax(50)    # y-axis limits follow the last 50 points
+rr_extent = RollingMinMax(50)
 debug_printed = False
+reader = FrameReader(data_ser)  # bulk-buffered DATA port reader
+clock = FrameClock()            # device time + lost / duplicate frame counters
+startup_sec = time.perf_counter() - T_START
 
 try:
     while time.time() - start_time < DURATION:
-        # Look for magic word
-        byte = data_ser.read(1)
-        if not byte or byte[0] != 0x02:
-            continue
-        
-        rest = data_ser.read(7)
-        if len(rest) < 7:
-            continue
-        
-        sync = byte + rest
-        if sync != b'\x02\x01\x04\x03\x06\x05\x08\x07':
-            continue
-        
-        # Read header
-        header = data_ser.read(32)
-        if len(header) < 32:
+        # Next complete frame (magic word + header + payload)
+        frame = reader.read_frame()
+        if frame is None:
             continue
         
         try:
-            version = struct.unpack('<I', header[0:4])[0]
-            total_len = struct.unpack('<I', header[4:8])[0]
-            platform = struct.unpack('<I', header[8:12])[0]
-            frame_num = struct.unpack('<I', header[12:16])[0]
-            time_cpu = struct.unpack('<I', header[16:20])[0]
-            num_objs = struct.unpack('<I', header[20:24])[0]
-            num_tlvs = struct.unpack('<I', header[24:28])[0]
-            subframe = struct.unpack('<I', header[28:32])[0]
-            
-            if total_len < 40 or total_len > 65536:
-                continue
-            
-            payload_len = total_len - 40
-            payload = data_ser.read(payload_len)
-            if len(payload) < payload_len:
-                continue
+            # Header + TLV type 6 (Vital Signs Statistics) in two precompiled unpacks
+            header, vitals = decode_frame(frame)
+            frame_num = header.frame_num
             
             packet_count += 1
-            ts = time.time() - start_time
+            ts = clock.update(frame_num, header.time_cpu)   # device time since the first frame
             
-            # Parse TLVs
-            offset = 0
-            
-            while offset + 8 <= len(payload):
-                tlv_type, tlv_length = struct.unpack_from('<II', payload, offset)
-                offset += 8
-                
-                if offset + tlv_length > len(payload):
-                    break
-                
-                # TLV Type 6 = Vital Signs Statistics
-                if tlv_type == 6 and tlv_length >= 128:
-                    try:
-                        tlv_data = payload[offset:offset+tlv_length]
-                        
-                        # Debug: Print structure once
-                        if not debug_printed:
-                            print("\n" + "="*60)
-                            print("DEBUG: Scanning TLV for range field...")
-                            print("="*60)
-                            print(f"Offset  uint32      float       Status")
-                            print("-"*60)
-                            for i in [0, 4, 8, 12, 16, 20, 24, 88, 92, 96, 100, 104, 108, 112, 116, 120, 124]:
-                                if i + 4 <= len(tlv_data):
-                                    try:
-                                        u = struct.unpack_from('<I', tlv_data, i)[0]
-                                        f = struct.unpack_from('<f', tlv_data, i)[0]
-                                        status = ""
-                                        if 0.2 < f < 5.0:
-                                            status = " <- LIKELY RANGE"
-                                        print(f"{i:<6}  {u:<10}  {f:<10.4f}  {status}")
-                                    except:
-                                        pass
-                            print("="*60 + "\n")
-                            debug_printed = True
-                        
-                        # Extract vital signs
-                        heart_waveform = struct.unpack_from('<f', tlv_data, 32)[0]
-                        breath_waveform = struct.unpack_from('<f', tlv_data, 28)[0]
-                        
-                        heart_rate_fft = struct.unpack_from('<f', tlv_data, 36)[0]
-                        breath_rate_fft = struct.unpack_from('<f', tlv_data, 52)[0]
-                        
-                        # Find range - Use offset 16 which shows stable range value
-                        raw_range = None
-                        
-                        # Primary: Check offset 16 (breathDeviation field shows range pattern)
-                        if 16 + 4 <= len(tlv_data):
-                            try:
-                                val = struct.unpack_from('<f', tlv_data, 16)[0]
-                                if 0.5 < val < 10.0:  # Reasonable range
-                                    raw_range = val
-                            except:
-                                pass
-                        
-                        # Fallback: Check other offsets if offset 16 fails
-                        if raw_range is None:
-                            for check_offset in [12, 8, 20, 24]:
-                                if check_offset + 4 <= len(tlv_data):
-                                    try:
-                                        val = struct.unpack_from('<f', tlv_data, check_offset)[0]
-                                        if 0.5 < val < 10.0:
-                                            raw_range = val
-                                            break
-                                    except:
-                                        pass
-                        
-                        # Last resort: try range_idx
-                        if raw_range is None:
-                            range_idx = struct.unpack_from('<I', tlv_data, 4)[0]
-                            if 5 < range_idx < 200:
-                                raw_range = range_idx * 0.044
-                        
-                        # Still no range? Use default
-                        if raw_range is None:
-                            raw_range = 1.0
-                        
-                        # Smooth the range
-                        range_history.append(raw_range)
-                        if len(range_history) > 15:  # Average last 15 readings
-                            range_history.pop(0)
-                        
-                        smoothed_range = sum(range_history) / len(range_history)
-                        
-                        # Apply calibration: scale and offset
-                        range_m = (smoothed_range * RANGE_SCALE) + RANGE_OFFSET
-                        
-                        # Ensure range stays positive
-                        if range_m < 0.1:
-                            range_m = 0.1
-                        
-                        # Use the most reliable estimate (FFT is usually most reliable)
-                        heart_rate = heart_rate_fft
-                        breath_rate = breath_rate_fft
-                        
-                        # Validate and filter
-                        hr_valid = 30 <= heart_rate <= 200
-                        rr_valid = 5 <= breath_rate <= 50
+            if ts is not None and vitals is not None:
+                try:
+                    # Debug: Print structure once
+                    if not debug_printed:
+                        tlv_data = VITALS_STRUCT.pack(*vitals.words)
+                        print("\n" + "="*60)
+                        print("DEBUG: Scanning TLV for range field...")
+                        print("="*60)
+                        print(f"Offset  uint32      float       Status")
+                        print("-"*60)
+                        for i in [0, 4, 8, 12, 16, 20, 24, 88, 92, 96, 100, 104, 108, 112, 116, 120, 124]:
+                            if i + 4 <= len(tlv_data):
+                                try:
+                                    u = struct.unpack_from('<I', tlv_data, i)[0]
+                                    f = struct.unpack_from('<f', tlv_data, i)[0]
+                                    status = ""
+                                    if 0.2 < f < 5.0:
+                                        status = " <- LIKELY RANGE"
+                                    print(f"{i:<6}  {u:<10}  {f:<10.4f}  {status}")
+                                except:
+                                    pass
+                        print("="*60 + "\n")
+                        debug_printed = True
+                    
+                    # Extract vital signs
+                    heart_waveform = vitals.heart_waveform
+                    breath_waveform = vitals.breath_waveform
+                    
+                    heart_rate_fft = vitals.heart_rate_fft
+                    breath_rate_fft = vitals.breath_rate_fft
+                    
+                    # Find range - Use offset 16 which shows stable range value
+                    raw_range = None
+                    
+                    # Primary: Check offset 16 (breathDeviation field shows range pattern)
+                    val = vitals.float_at(16)
+                    if 0.5 < val < 10.0:  # Reasonable range
+                        raw_range = val
+                    
+                    # Fallback: Check other offsets if offset 16 fails
+                    if raw_range is None:
+                        for check_offset in [12, 8, 20, 24]:
+                            val = vitals.float_at(check_offset)
+                            if 0.5 < val < 10.0:
+                                raw_range = val
+                                break
+                    
+                    # Last resort: try range_idx
+                    if raw_range is None:
+                        range_idx = vitals.range_idx
+                        if 5 < range_idx < 200:
+                            raw_range = range_idx * 0.044
+                    
+                    # Still no range? Use default
+                    if raw_range is None:
+                        raw_range = 1.0
+                    
+                    # Smooth the range
+                    range_history.add(raw_range)
+                    smoothed_range = range_history.mean()
+                    
+                    # Apply calibration: scale and offset
+                    range_m = (smoothed_range * RANGE_SCALE) + RANGE_OFFSET
+                    
+                    # Ensure range stays positive
+                    if range_m < 0.1:
+                        range_m = 0.1
+                    
+                    # Use the most reliable estimate (FFT is usually most reliable)
+                    heart_rate = heart_rate_fft
+                    breath_rate = breath_rate_fft
+                    
+                    # Validate and filter
+                    hr_valid = 30 <= heart_rate <= 200
+                    rr_valid = 5 <= breath_rate <= 50
+                    
+                    # Use last valid value if current is invalid
+                    if not hr_valid and last_valid_hr is not None:
+                        heart_rate = last_valid_hr
+                        hr_valid = True
+                    
+                    if not rr_valid and last_valid_rr is not None:
+                        breath_rate = last_valid_rr
+                        rr_valid = True
+                    
+                    if hr_valid and rr_valid:
+                        last_valid_hr = heart_rate
+                        last_valid_rr = breath_rate
                         
-                        # Use last valid value if current is invalid
-                        if not hr_valid and last_valid_hr is not None:
-                            heart_rate = last_valid_hr
-                            hr_valid = True
+                        # Save to CSV
+                        csv_writer.writerow([
+                            f"{ts:.2f}",
+                            f"{heart_rate:.2f}",
+                            f"{breath_rate:.2f}",
+                            f"{range_m:.3f}",
+                            f"{heart_waveform:.4f}",
+                            f"{breath_waveform:.4f}",
+                            f"{heart_rate_fft:.2f}",
+                            f"{breath_rate_fft:.2f}"
+                        ])
+                        csv_file.flush()
+                        data_saved += 1
                         
-                        if not rr_valid and last_valid_rr is not None:
-                            breath_rate = last_valid_rr
-                            rr_valid = True
+                        # Update plot
+                        times.append(ts)
+                        hr_values.append(heart_rate)
+                        rr_values.append(breath_rate)
+                        hr_extent.add(heart_rate)
+                        rr_extent.add(breath_rate)
+                        session_stats.add(heart_rate, breath_rate)
                         
-                        if hr_valid and rr_valid:
-                            last_valid_hr = heart_rate
-                            last_valid_rr = breath_rate
-                            
-                            # Save to CSV
-                            csv_writer.writerow([
-                                f"{ts:.2f}",
-                                f"{heart_rate:.2f}",
-                                f"{breath_rate:.2f}",
-                                f"{range_m:.3f}",
-                                f"{heart_waveform:.4f}",
-                                f"{breath_waveform:.4f}",
-                                f"{heart_rate_fft:.2f}",
-                                f"{breath_rate_fft:.2f}"
-                            ])
-                            csv_file.flush()
-                            data_saved += 1
-                            
-                            # Update plot
-                            times.append(ts)
-                            hr_values.append(heart_rate)
-                            rr_values.append(breath_rate)
-                            
-                            # Keep last 200 points
-                            if len(times) > 200:
-                                times = times[-200:]
-                                hr_values = hr_values[-200:]
-                                rr_values = rr_values[-200:]
-                            
+                        if not HEADLESS:
                             hr_line.set_data(times, hr_values)
                             rr_line.set_data(times, rr_values)
-                            
+                        
                             # Update x-axis limits
                             ax1.set_xlim(max(0, ts-30), ts+2)
                             ax2.set_xlim(max(0, ts-30), ts+2)
-                            
+                        
                             # Auto-scale y-axis if needed
                             if len(hr_values) > 10:
-                                hr_min, hr_max = min(hr_values[-50:]), max(hr_values[-50:])
+                                hr_min, hr_max = hr_extent.min(), hr_extent.max()
                                 ax1.set_ylim(max(30, hr_min-10), min(200, hr_max+10))
-                            
+                        
                             if len(rr_values) > 10:
-                                rr_min, rr_max = min(rr_values[-50:]), max(rr_values[-50:])
+                                rr_min, rr_max = rr_extent.min(), rr_extent.max()
                                 ax2.set_ylim(max(5, rr_min-3), min(50, rr_max+3))
-                            
+                        
                             fig.canvas.draw()
                             fig.canvas.flush_events()
-                            
-                            # Print every 5th valid reading
-                            if data_saved % 5 == 0:
-                                print(f"[{ts:6.2f}s] Frame {frame_num:5d} | HR: {heart_rate:5.1f} bpm | RR: {breath_rate:4.1f} bpm | Range: {range_m:4.2f} m (raw: {raw_range:.2f}m, offset: {RANGE_OFFSET:+.2f}m)")
-                    
-                    except Exception as e:
-                        if packet_count < 10:
-                            print(f"Parse error: {e}")
+                        
+                        # Print every 5th valid reading
+                        if data_saved % 5 == 0:
+                            print(f"[{ts:6.2f}s] Frame {frame_num:5d} | HR: {heart_rate:5.1f} bpm | RR: {breath_rate:4.1f} bpm | Range: {range_m:4.2f} m (raw: {raw_range:.2f}m, offset: {RANGE_OFFSET:+.2f}m)")
                 
-                offset += tlv_length
+                except Exception as e:
+                    if packet_count < 10:
+                        print(f"Parse error: {e}")
             
             # Print stats every 100 packets
             if packet_count % 100 == 0:
@@ -335,15 +306,24 @@ finally:
     print("="*60)
     print(f"Duration: {time.time() - start_time:.1f} seconds")
     print(f"Total packets received: {packet_count}")
+    link = reader.stats()
+    print(f"Bytes read: {link['bytes_read']:,} ({link['bytes_per_sec']:.0f} B/s), resyncs: {link['resyncs']}")
+    timing = clock.stats()
+    print(f"Frames lost: {timing['lost']} in {timing['gaps']} gaps ({timing['loss_pct']:.2f}%), "
+          f"duplicate/stale: {timing['duplicates']}/{timing['out_of_order']}, "
+          f"device time: {timing['device_sec']:.1f} s ({timing['clock']} clock)")
     print(f"Valid data points saved: {data_saved}")
+    cpu = os.times()
+    print(f"Startup: {startup_sec:.2f} s ({'headless' if HEADLESS else 'GUI'}), CPU time: {cpu.user + cpu.system:.2f} s")
     
     if data_saved > 0:
-        avg_hr = sum(hr_values) / len(hr_values) if hr_values else 0
-        avg_rr = sum(rr_values) / len(rr_values) if rr_values else 0
-        print(f"\nAverage Heart Rate: {avg_hr:.1f} bpm")
-        print(f"Average Respiration Rate: {avg_rr:.1f} bpm")
-        if range_history:
-            avg_range_raw = sum(range_history) / len(range_history)
+        # whole session, from the running aggregates
+        summary = session_stats.summary()
+        hr, rr = summary["hr"], summary["rr"]
+        print(f"\nAverage Heart Rate: {hr['mean']:.1f} bpm (p5 {hr['p5']:.1f}, p50 {hr['p50']:.1f}, p95 {hr['p95']:.1f})")
+        print(f"Average Respiration Rate: {rr['mean']:.1f} bpm (p5 {rr['p5']:.1f}, p50 {rr['p50']:.1f}, p95 {rr['p95']:.1f})")
+        if len(range_history):
+            avg_range_raw = range_history.mean()
             avg_range_calibrated = avg_range_raw + RANGE_OFFSET
             print(f"Average Range: {avg_range_calibrated:.3f} m ({avg_range_calibrated*100:.1f} cm)")
             print(f"  (Raw: {avg_range_raw:.3f}m, Offset: {RANGE_OFFSET:+.2f}m)")
@@ -360,5 +340,16 @@ finally:
     user_ser.close()
     data_ser.close()
     
-    plt.ioff()
-    plt.show()
\ No newline at end of file
+    if HEADLESS:
+        # off-screen trend plot instead of a blocking window
+        figures = FigureWorker()
+        if times:
+            figures.submit(render_trends, os.path.splitext(csv_filename)[0] + "_trends.png",
+                           list(times), list(hr_values), list(rr_values))
+        for path in figures.close():
+            print(f"Plot saved to: {path}")
+        for err in figures.errors:
+            print(f"Plot error: {err}")
+    else:
+        plt.ioff()
+        plt.show()
\ No newline at end of file